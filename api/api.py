@@ -1,101 +1,107 @@
 #!/usr/bin/env python
 #
 # This is an entry point for deploying a FastAPI application with Uvicorn.
-# The script defines three endpoints for submitting Spark jobs,
-# each corresponding to a different job defined in the ``jobs`` directory of the project.
+# The script defines endpoint for submitting each Spark job
+# declared in ``spark.jobs`` section of config.
 # The endpoints accept an object of``ArgsKeeper`` instance as an argument,
 # which contains the arguments needed to submiting Spark job.
 #
+# Datamarts with keys in ``spark.outputs.layout`` section of config are
+# looked up by the first key with ``/lookup/<datamart>/<value>`` endpoint,
+# see ``DatamartReader``.
+#
 
 from __future__ import annotations
 
 import os
 import subprocess
 import sys
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
-import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 
 # package
 sys.path.append(str(Path(__file__).parent.parent))
-from src.config import Config
+from src.context import get_context
 from src.environ import EnvironManager
+from src.helper import S3ServiceError
 from src.keeper import ArgsKeeper
-from src.logger import SparkLogger
+from src.reader import DatamartNotFound, DatamartReader
+from src.registry import JobRegistry
 
 REQUIRED_VARS = ("PROJECT_PATH", "SPARK_SUBMIT_BIN")
 
-environ = EnvironManager()
-environ.check_environ(var=REQUIRED_VARS)
-environ.load_environ()
+context = get_context()
+EnvironManager().check_environ(var=REQUIRED_VARS)
 
 PROJECT_PATH, SPARK_SUBMIT_BIN = map(os.getenv, REQUIRED_VARS)
 
-JOBS = (
-    "collect_users_demographic_dm_job",
-    "collect_events_total_cnt_agg_wk_mnth_dm_job",
-    "collect_add_to_friends_recommendations_dm_job",
-)
-
-config = Config(config_path=Path(PROJECT_PATH, "config/config.yaml"))  # type: ignore
-logger = SparkLogger(level=config.get_logging_level["python"]).get_logger(name=__name__)
+logger = context.get_logger(name=__name__)
 
 app = FastAPI()
 
 
-@app.post(f"/submit_{JOBS[0]}")
-def submit_collect_users_demographic_dm_job(keeper: ArgsKeeper):
-    CMD = [
-        SPARK_SUBMIT_BIN,
-        f"{PROJECT_PATH}/jobs/{JOBS[0]}.py",
-        keeper.date,
-        str(keeper.depth),
-        keeper.src_path,
-        keeper.tgt_path,
-        keeper.coords_path,
-        keeper.processed_dttm,
-    ]
-    output = subprocess.run(args=CMD, capture_output=True, text=True, encoding="utf-8")
-
-    return output
-
-
-@app.post(f"/submit_{JOBS[1]}")
-def submit_collect_events_total_cnt_agg_wk_mnth_dm_job(keeper: ArgsKeeper):
-    CMD = [
-        SPARK_SUBMIT_BIN,
-        f"{PROJECT_PATH}/jobs/{JOBS[1]}.py",
-        keeper.date,
-        str(keeper.depth),
-        keeper.src_path,
-        keeper.tgt_path,
-        keeper.coords_path,
-        keeper.processed_dttm,
-    ]
-    output = subprocess.run(args=CMD, capture_output=True, text=True, encoding="utf-8")
-
-    return output
-
-
-@app.post(f"/submit_{JOBS[2]}")
-def submit_collect_add_to_friends_recommendations_dm_job(keeper: ArgsKeeper):
-    CMD = [
-        SPARK_SUBMIT_BIN,
-        f"{PROJECT_PATH}/jobs/{JOBS[2]}.py",
-        keeper.date,
-        str(keeper.depth),
-        keeper.src_path,
-        keeper.tgt_path,
-        keeper.coords_path,
-        keeper.processed_dttm,
-    ]
-    output = subprocess.run(args=CMD, capture_output=True, text=True, encoding="utf-8")
-
-    return output
+def _make_endpoint(job: str):
+    def submit_job(keeper: ArgsKeeper):
+        CMD = [
+            SPARK_SUBMIT_BIN,
+            f"{PROJECT_PATH}/jobs/datamart_job.py",
+            job,
+            keeper.date,
+            str(keeper.depth),
+            keeper.src_path,
+            keeper.tgt_path,
+            keeper.coords_path,
+            keeper.processed_dttm,
+        ]
+        if keeper.end_date:
+            CMD.append(keeper.end_date)
+
+        output = subprocess.run(
+            args=CMD, capture_output=True, text=True, encoding="utf-8"
+        )
+
+        return output
+
+    submit_job.__name__ = f"submit_{job}"
+
+    return submit_job
+
+
+for spec in JobRegistry(config=context.config):
+    app.post(f"/submit_{spec.name}")(_make_endpoint(job=spec.name))
+
+
+@lru_cache(maxsize=None)
+def get_reader() -> DatamartReader:
+    "One reader for all requests, so its caches are shared"
+    return DatamartReader()
+
+
+@app.get("/lookup/{datamart}/{value}")
+def lookup(datamart: str, value: int, date: Optional[str] = None):
+    keys = context.config.get_outputs_config["layout"].get(datamart)
+    if not keys:
+        raise HTTPException(
+            status_code=404, detail=f"Lookups of '{datamart}' datamart not supported"
+        )
+
+    try:
+        return get_reader().lookup(
+            datamart=datamart, filters={keys[0]: value}, date=date
+        )
+    except DatamartNotFound as err:
+        raise HTTPException(status_code=404, detail=str(err))
+    except S3ServiceError as err:
+        logger.error(err)
+        raise HTTPException(status_code=502, detail=str(err))
 
 
 def main() -> ...:
+    import uvicorn
+
     config = uvicorn.Config(
         "api:app", host="0.0.0.0", port=8000, log_level="info", reload=True
     )
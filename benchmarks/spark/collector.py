@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+#
+# Runs every job declared in config on synthetic data in `local[*]` mode
+# across a matrix of `depth` and number of users. Each run gets a fresh
+# Spark session. Reports wall time, shuffled and spilled bytes and peak
+# JVM memory taken from Spark monitoring Rest API.
+#
+# Data is generated once per number of users by `generator.py` and kept
+# in `--data-path` for next runs.
+#
+# Usage:
+#   python benchmarks/spark/collector.py [--users 1000 10000] [--depth 7 28] [--jobs <job> ...] [--repeat 1] [--json]
+#
+# Driver memory and other JVM options are passed as usual with
+# `PYSPARK_SUBMIT_ARGS` environ variable.
+#
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List
+
+    import pyspark.sql  # type: ignore
+
+PROJECT_PATH = Path(__file__).resolve().parent.parent.parent
+
+# executor metrics are sent with heartbeats, frequent ones give more precise peaks
+os.environ.setdefault(
+    "PYSPARK_SUBMIT_ARGS",
+    "--conf spark.executor.heartbeatInterval=1s "
+    "--conf spark.executor.metrics.pollingInterval=100ms pyspark-shell",
+)
+
+sys.path.append(str(PROJECT_PATH))
+from benchmarks.spark.generator import END_DATE, generate
+from benchmarks.spark.local import LocalDatamartCollector, get_local_keeper
+from src.keeper import SparkConfigKeeper
+from src.registry import JobRegistry
+
+
+def _get_app_metrics(spark: pyspark.sql.SparkSession) -> Dict[str, Any]:
+    """Sums metrics of all stages of Spark application and takes peak JVM memory of its executors"""
+    sc = spark.sparkContext
+    url = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}"
+
+    def _get(endpoint: str) -> List[Dict[str, Any]]:
+        with urllib.request.urlopen(f"{url}/{endpoint}", timeout=10) as response:
+            return json.load(response)
+
+    stages = _get("stages")
+    executors = _get("allexecutors")
+
+    return dict(
+        shuffle_bytes=sum(
+            _.get("shuffleReadBytes", 0) + _.get("shuffleWriteBytes", 0) for _ in stages
+        ),
+        spilled_bytes=sum(
+            _.get("memoryBytesSpilled", 0) + _.get("diskBytesSpilled", 0)
+            for _ in stages
+        ),
+        peak_memory_bytes=max(
+            (
+                _.get("peakMemoryMetrics", {}).get("JVMHeapMemory", 0)
+                + _.get("peakMemoryMetrics", {}).get("JVMOffHeapMemory", 0)
+                for _ in executors
+            ),
+            default=0,
+        ),
+    )
+
+
+def prepare_data(path: Path, users: int, days: int, seed: int) -> Dict[str, str]:
+    """Generates data if it was not generated before with the same parameters"""
+    path = Path(path, f"users={users}-days={days}-seed={seed}")
+    paths = {_: str(Path(path, _)) for _ in ("raw", "events", "cities")}
+
+    if Path(path, "_SUCCESS").exists():
+        return paths
+
+    from pyspark.sql import SparkSession  # type: ignore
+
+    spark = SparkSession.builder.master("local[*]").appName("generator").getOrCreate()
+
+    try:
+        return generate(spark=spark, path=path, users=users, days=days, seed=seed)
+    finally:
+        spark.stop()
+
+
+def run(
+    job: str,
+    depth: int,
+    paths: Dict[str, str],
+    tgt_path: Path,
+    spark_conf: SparkConfigKeeper,
+) -> Dict[str, Any]:
+    """Collects datamart of `job` once in a fresh local session and returns its measurements"""
+    spec = JobRegistry().get(name=job)
+    collector = LocalDatamartCollector()
+
+    keeper = get_local_keeper(
+        paths=paths, tgt_path=str(tgt_path), date=str(END_DATE), depth=depth
+    )
+
+    collector.init_session(
+        app_name=f"benchmark-{job}",
+        spark_conf=spark_conf,
+        log4j_level="ERROR",
+        profile=spec.profile,
+        master="local[*]",
+    )
+    try:
+        _start = time.perf_counter()
+        getattr(collector, spec.method)(keeper=keeper)
+        secs = time.perf_counter() - _start
+
+        return dict(secs=secs, **_get_app_metrics(spark=collector.spark))
+    finally:
+        collector.stop_session()
+        shutil.rmtree(tgt_path, ignore_errors=True)
+
+
+def _format_bytes(value: float) -> str:
+    return f"{value / 1024**2:10.1f}"
+
+
+def main() -> ...:
+    parser = argparse.ArgumentParser(
+        description="Runs datamart jobs on synthetic data in local mode"
+    )
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--depth", type=int, nargs="+", default=[7, 28])
+    parser.add_argument("--jobs", nargs="+", help="Jobs to run, all jobs by default")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per combination")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of generated data")
+    parser.add_argument("--shuffle-partitions", type=int, default=None)
+    parser.add_argument(
+        "--data-path",
+        type=Path,
+        default=PROJECT_PATH / ".cache/benchmarks/spark",
+        help="Directory of generated data and job outputs",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    jobs = args.jobs or JobRegistry().names
+    spark_conf = SparkConfigKeeper(
+        executor_memory="2g",
+        executor_cores=1,
+        max_executors_num=1,
+        shuffle_partitions=args.shuffle_partitions,
+    )
+
+    results = []
+
+    for users in args.users:
+        paths = prepare_data(
+            path=Path(args.data_path, "data"),
+            users=users,
+            days=max(args.depth),
+            seed=args.seed,
+        )
+
+        for depth in args.depth:
+            for job in jobs:
+                runs = [
+                    run(
+                        job=job,
+                        depth=depth,
+                        paths=paths,
+                        tgt_path=Path(args.data_path, "output"),
+                        spark_conf=spark_conf,
+                    )
+                    for _ in range(args.repeat)
+                ]
+                results.append(
+                    dict(
+                        job=job,
+                        users=users,
+                        depth=depth,
+                        **{
+                            key: statistics.median(_[key] for _ in runs)
+                            for key in runs[0]
+                        },
+                    )
+                )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(
+        f"{'job':<50}{'users':>8}{'depth':>6}{'secs':>9}"
+        f"{'shuffle MB':>11}{'spill MB':>11}{'peak MB':>11}"
+    )
+    for result in results:
+        print(
+            f"{result['job']:<50}{result['users']:>8}{result['depth']:>6}"
+            f"{result['secs']:9.1f} {_format_bytes(result['shuffle_bytes'])}"
+            f" {_format_bytes(result['spilled_bytes'])}"
+            f" {_format_bytes(result['peak_memory_bytes'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+#
+# Generates synthetic events and cities dictionary in the layout read by
+# Spark jobs, so `DatamartCollector` may be run on local machine:
+#
+#   <path>/raw/event_type=<type>/date=<day>     raw events with `event` struct
+#   <path>/events/event_type=<type>/date=<day>  events flattened by `DataMover`
+#   <path>/cities                               cities coordinates
+#
+# Users mostly send events from their home city and sometimes travel to
+# another one, so every datamart has non-trivial results.
+#
+# Usage:
+#   python benchmarks/spark/generator.py --users 10000 --days 14 [--path .cache/benchmarks/spark/data]
+#
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict
+
+    import pyspark.sql  # type: ignore
+
+PROJECT_PATH = Path(__file__).resolve().parent.parent.parent
+
+sys.path.append(str(PROJECT_PATH))
+from src.spark.mover import DataMover
+
+# city_id, city_name, city_lat, city_lon, timezone
+CITIES = (
+    (1, "Sydney", -33.865, 151.2094, "Australia/Sydney"),
+    (2, "Melbourne", -37.8136, 144.9631, "Australia/Melbourne"),
+    (3, "Brisbane", -27.4678, 153.0281, "Australia/Brisbane"),
+    (4, "Perth", -31.9522, 115.8589, "Australia/Perth"),
+    (5, "Adelaide", -34.9289, 138.6011, "Australia/Adelaide"),
+    (6, "Gold Coast", -28.0167, 153.4, "Australia/Brisbane"),
+    (7, "Cranbourne", -38.0996, 145.2834, "Australia/Melbourne"),
+    (8, "Canberra", -35.2931, 149.1269, "Australia/Canberra"),
+    (9, "Newcastle", -32.9167, 151.75, "Australia/Sydney"),
+    (10, "Wollongong", -34.4331, 150.8831, "Australia/Sydney"),
+    (11, "Geelong", -38.15, 144.35, "Australia/Melbourne"),
+    (12, "Hobart", -42.8806, 147.325, "Australia/Hobart"),
+    (13, "Townsville", -19.2564, 146.8183, "Australia/Brisbane"),
+    (14, "Ipswich", -27.6167, 152.7667, "Australia/Brisbane"),
+    (15, "Cairns", -16.9303, 145.7703, "Australia/Brisbane"),
+    (16, "Toowoomba", -27.5667, 151.95, "Australia/Brisbane"),
+    (17, "Darwin", -12.4381, 130.8411, "Australia/Darwin"),
+    (18, "Ballarat", -37.55, 143.85, "Australia/Melbourne"),
+    (19, "Bendigo", -36.75, 144.2667, "Australia/Melbourne"),
+    (20, "Launceston", -41.4419, 147.145, "Australia/Hobart"),
+    (21, "Mackay", -21.1411, 149.1861, "Australia/Brisbane"),
+    (22, "Rockhampton", -23.375, 150.5117, "Australia/Brisbane"),
+    (23, "Maitland", -32.7167, 151.55, "Australia/Sydney"),
+    (24, "Bunbury", -33.3333, 115.6333, "Australia/Perth"),
+)
+
+# events of each type sent by one user per day
+EVENTS_PER_USER = dict(message=5, reaction=3, subscription=1)
+
+# share of events sent outside of user home city
+TRAVEL_RATE = 0.2
+
+END_DATE = date(2022, 4, 26)
+
+# random values depend on partitioning, fixed number of partitions gives
+# the same data with the same seed on any machine
+PARTITIONS = 8
+
+
+def write_cities(spark: pyspark.sql.SparkSession, path: str) -> ...:
+    """Writes cities dictionary read by `DatamartCollector._get_cities_coords_df`"""
+    from pyspark.sql.types import (  # type: ignore
+        DoubleType,
+        IntegerType,
+        StringType,
+        StructField,
+        StructType,
+    )
+
+    schema = StructType(
+        [
+            StructField("city_id", IntegerType(), nullable=False),
+            StructField("city_name", StringType(), nullable=False),
+            StructField("city_lat", DoubleType(), nullable=False),
+            StructField("city_lon", DoubleType(), nullable=False),
+            StructField("timezone", StringType(), nullable=False),
+        ]
+    )
+    sdf = spark.createDataFrame(data=list(CITIES), schema=schema)
+    sdf.repartition(1).write.parquet(path=path, mode="overwrite")
+
+
+def _get_raw_events_df(
+    spark: pyspark.sql.SparkSession,
+    event_type: str,
+    users: int,
+    days: int,
+    end_date: date,
+    seed: int,
+) -> pyspark.sql.DataFrame:
+    """Generates raw events of one type with the same schema as source data of `DataMover`"""
+    import pyspark.sql.functions as F  # type: ignore
+
+    rows = users * EVENTS_PER_USER[event_type] * days
+    messages = users * EVENTS_PER_USER["message"] * days
+    channels = max(users // 20, 1)
+
+    def _rand(i: int):
+        return F.rand(seed=seed * 100 + i)
+
+    def _rand_user(i: int):
+        return (_rand(i) * users).cast("long") + 1
+
+    def _nullable(value, event_types, type_):
+        return value if event_type in event_types else F.lit(None).cast(type_)
+
+    sdf = (
+        spark.range(rows, numPartitions=PARTITIONS)
+        .withColumn("user_id", _rand_user(1))
+        .withColumn(
+            "city",
+            F.when(_rand(2) >= TRAVEL_RATE, F.col("user_id") % len(CITIES)).otherwise(
+                (_rand(3) * len(CITIES)).cast("int")
+            ),
+        )
+        .withColumn(
+            "datetime",
+            F.from_unixtime(
+                F.unix_timestamp(
+                    F.expr(f"date_sub('{end_date}', CAST(id % {days} AS INT))")
+                )
+                + (_rand(4) * 86399).cast("long")
+            ),
+        )
+    )
+
+    # coordinates around city center
+    lats, lons = (F.array(*[F.lit(_[i]) for _ in CITIES]) for i in (2, 3))
+    city = F.col("city") + 1
+
+    event = F.struct(
+        F.lit(None).cast("array<long>").alias("admins"),
+        F.lit(None).cast("long").alias("channel_id"),
+        F.col("datetime").alias("datetime"),
+        F.struct(
+            F.lit(None).cast("string").alias("media_type"),
+            F.lit(None).cast("string").alias("src"),
+        ).alias("media"),
+        _nullable(F.lit("hello"), ("message",), "string").alias("message"),
+        F.lit(None).cast("long").alias("message_channel_to"),
+        _nullable(F.col("user_id"), ("message",), "long").alias("message_from"),
+        F.lit(None).cast("long").alias("message_group"),
+        _nullable(
+            (
+                F.col("id")
+                if event_type == "message"
+                else (_rand(5) * messages).cast("long")
+            ),
+            ("message", "reaction"),
+            "long",
+        ).alias("message_id"),
+        _nullable(F.when(_rand(6) < 0.7, _rand_user(7)), ("message",), "long").alias(
+            "message_to"
+        ),
+        _nullable(
+            F.concat(F.col("datetime"), F.lit(".000000")), ("message",), "string"
+        ).alias("message_ts"),
+        _nullable(F.col("user_id"), ("reaction",), "long").alias("reaction_from"),
+        _nullable(F.lit("like"), ("reaction",), "string").alias("reaction_type"),
+        _nullable(
+            (_rand(8) * channels).cast("long") + 1, ("subscription",), "long"
+        ).alias("subscription_channel"),
+        F.lit(None).cast("long").alias("subscription_user"),
+        F.lit(None).cast("array<string>").alias("tags"),
+        _nullable(F.col("user_id").cast("string"), ("subscription",), "string").alias(
+            "user"
+        ),
+    )
+
+    return (
+        sdf.withColumn("event", event)
+        .withColumn("event_type", F.lit(event_type))
+        .withColumn("lat", F.element_at(lats, city) + (_rand(9) - 0.5) * 0.1)
+        .withColumn("lon", F.element_at(lons, city) + (_rand(10) - 0.5) * 0.1)
+        .withColumn("date", F.substring(F.col("datetime"), 1, 10))
+        .select("event", "event_type", "lat", "lon", "date")
+    )
+
+
+def generate(
+    spark: pyspark.sql.SparkSession,
+    path: Path,
+    users: int,
+    days: int,
+    end_date: date = END_DATE,
+    seed: int = 0,
+) -> Dict[str, str]:
+    """Generates events of `users` for `days` days up to `end_date` and cities dictionary.
+
+    ## Parameters
+    `spark` : Active Spark session\n
+    `path` : Directory to write data to\n
+    `users` : Number of users\n
+    `days` : Number of daily partitions of each event type\n
+    `end_date` : Last day of generated data\n
+    `seed` : Seed of random values, the same seed gives the same data
+
+    ## Returns
+    `Dict[str, str]` : Paths of `raw`, `events` and `cities` datasets
+    """
+    paths = {_: str(Path(path, _)) for _ in ("raw", "events", "cities")}
+
+    shutil.rmtree(path, ignore_errors=True)
+
+    write_cities(spark=spark, path=paths["cities"])
+
+    for event_type in EVENTS_PER_USER:
+        _get_raw_events_df(
+            spark=spark,
+            event_type=event_type,
+            users=users,
+            days=days,
+            end_date=end_date,
+            seed=seed,
+        ).write.parquet(
+            path=paths["raw"],
+            mode="append",
+            partitionBy=["event_type", "date"],
+        )
+
+    DataMover._flatten_events(df=spark.read.parquet(paths["raw"])).write.parquet(
+        path=paths["events"],
+        mode="overwrite",
+        partitionBy=["event_type", "date"],
+    )
+
+    Path(path, "_SUCCESS").touch()
+
+    return paths
+
+
+def main() -> ...:
+    parser = argparse.ArgumentParser(
+        description="Generates synthetic events and cities for Spark jobs"
+    )
+    parser.add_argument("--users", type=int, default=10_000, help="Number of users")
+    parser.add_argument("--days", type=int, default=14, help="Number of days")
+    parser.add_argument(
+        "--end-date", type=date.fromisoformat, default=END_DATE, help="Last day"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of random values")
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=PROJECT_PATH / ".cache/benchmarks/spark/data",
+        help="Directory to write data to",
+    )
+    args = parser.parse_args()
+
+    from pyspark.sql import SparkSession  # type: ignore
+
+    spark = SparkSession.builder.master("local[*]").appName("generator").getOrCreate()
+
+    try:
+        for name, path in generate(
+            spark=spark,
+            path=args.path,
+            users=args.users,
+            days=args.days,
+            end_date=args.end_date,
+            seed=args.seed,
+        ).items():
+            print(f"{name:<8}{path}")
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
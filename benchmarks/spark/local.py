@@ -0,0 +1,83 @@
+#
+# Runs `DatamartCollector` on local files instead of S3. Shared by Spark
+# benchmarks and golden-output tests.
+#
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict
+
+    import pyspark.sql  # type: ignore
+
+PROJECT_PATH = Path(__file__).resolve().parent.parent.parent
+
+# `DatamartCollector` requires them, nothing is requested from S3 locally
+os.environ.setdefault("PROJECT_PATH", str(PROJECT_PATH))
+for _var in ("AWS_ENDPOINT_URL", "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+    os.environ.setdefault(_var, "local")
+
+sys.path.append(str(PROJECT_PATH))
+from src.keeper import ArgsKeeper
+from src.spark import DatamartCollector
+
+
+class LocalDatamartCollector(DatamartCollector):
+    """`DatamartCollector` reading and writing local files.
+
+    Checkpoints are disabled, so only collecting itself is run.
+    """
+
+    __slots__ = ()
+
+    def check_s3_object_existence(self, key: str, type: str) -> bool:
+        return type == "bucket" or Path(key).exists()
+
+    def get_s3_etag(self, key: str) -> str:
+        return str(sorted((str(_), _.stat().st_mtime_ns) for _ in Path(key).rglob("*")))
+
+    def _delete_s3_objects(self, key: str) -> int:
+        files = [_ for _ in Path(key).rglob("*") if _.is_file()]
+        shutil.rmtree(key, ignore_errors=True)
+
+        return len(files)
+
+    def _put_s3_object(self, key: str, body: bytes) -> ...:
+        Path(key).parent.mkdir(parents=True, exist_ok=True)
+        Path(key).write_bytes(body)
+
+    def _checkpoint(
+        self,
+        build: Callable[[], pyspark.sql.DataFrame],
+        datamart: str,
+        stage: str,
+        keeper: ArgsKeeper,
+    ) -> pyspark.sql.DataFrame:
+        return build()
+
+    def _clear_checkpoints(self, datamart: str, keeper: ArgsKeeper) -> ...:
+        return
+
+
+def get_local_keeper(
+    paths: Dict[str, str], tgt_path: str, date: str, depth: int
+) -> ArgsKeeper:
+    """Returns job arguments for data generated by `generator.py`.
+
+    Local paths do not pass validation of S3 ones, so validation is skipped.
+    """
+    return ArgsKeeper.construct(
+        date=date,
+        depth=depth,
+        src_path=paths["events"],
+        tgt_path=tgt_path,
+        coords_path=paths["cities"],
+        processed_dttm=f"{date}T00:00:00",
+        end_date=None,
+    )
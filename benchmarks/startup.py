@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+#
+# Measures startup cost of the project entry points: Spark jobs, API and DAGs.
+# Each entry point is imported in a fresh interpreter, so nothing is cached
+# between runs. Reports median import time, time to build project context
+# and heavy third-party modules which were loaded by the import.
+#
+# Usage:
+#   python benchmarks/startup.py [--repeat 5] [entry_point ...]
+#
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List
+
+PROJECT_PATH = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = (
+    *sorted(PROJECT_PATH.glob("jobs/*_job.py")),
+    PROJECT_PATH / "api/api.py",
+    *sorted(PROJECT_PATH.glob("dags/*.py")),
+)
+
+HEAVY_MODULES = (
+    "boto3",
+    "pyspark",
+    "coloredlogs",
+    "requests",
+    "fastapi",
+    "airflow",
+)
+
+# Runs inside child interpreter. Entry point is executed with non-main
+# `run_name`, so `if __name__ == "__main__"` blocks are skipped.
+_PROBE = """
+import json, runpy, sys, time
+
+sys.path.insert(0, {project_path!r})
+
+result = dict(error=None, import_secs=None, context_secs=None)
+
+_start = time.perf_counter()
+try:
+    runpy.run_path({path!r}, run_name="__startup_benchmark__")
+except BaseException as err:
+    result["error"] = f"{{type(err).__name__}}: {{err}}"
+result["import_secs"] = time.perf_counter() - _start
+
+if result["error"] is None:
+    _start = time.perf_counter()
+    try:
+        from src.context import get_context
+
+        get_context()
+        result["context_secs"] = time.perf_counter() - _start
+    except BaseException as err:
+        result["error"] = f"{{type(err).__name__}}: {{err}}"
+
+result["heavy_modules"] = sorted(
+    _ for _ in {heavy_modules!r} if _ in sys.modules
+)
+print(json.dumps(result))
+"""
+
+
+def probe(path: Path) -> Dict[str, Any]:
+    """Imports entry point in a fresh interpreter and returns measurements"""
+    code = _PROBE.format(
+        project_path=str(PROJECT_PATH),
+        path=str(path),
+        heavy_modules=HEAVY_MODULES,
+    )
+    output = subprocess.run(
+        args=[sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        cwd=PROJECT_PATH,
+    )
+
+    try:
+        return json.loads(output.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return dict(
+            error=(output.stderr.strip().splitlines() or ["No output"])[-1],
+            import_secs=None,
+            context_secs=None,
+            heavy_modules=[],
+        )
+
+
+def measure(path: Path, repeat: int) -> Dict[str, Any]:
+    """Returns median measurements of `repeat` runs"""
+    runs: List[Dict[str, Any]] = [probe(path=path) for _ in range(repeat)]
+    errors = [_["error"] for _ in runs if _["error"]]
+
+    def _median(key: str) -> float | None:
+        values = [_[key] for _ in runs if _[key] is not None]
+        return statistics.median(values) if values else None
+
+    return dict(
+        entry_point=str(path.relative_to(PROJECT_PATH)),
+        import_secs=_median("import_secs"),
+        context_secs=_median("context_secs"),
+        heavy_modules=runs[-1]["heavy_modules"],
+        error=errors[-1] if errors else None,
+    )
+
+
+def _format(value: float | None) -> str:
+    return f"{value * 1000:9.1f}" if value is not None else f"{'-':>9}"
+
+
+def main() -> ...:
+    parser = argparse.ArgumentParser(
+        description="Measures startup cost of the project entry points"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per entry point")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("paths", nargs="*", type=Path, help="Entry points to measure")
+    args = parser.parse_args()
+
+    paths = [_.resolve() for _ in args.paths] or ENTRY_POINTS
+    results = [measure(path=path, repeat=args.repeat) for path in paths]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'entry point':<60}{'import ms':>10}{'context ms':>11}  heavy modules")
+    for result in results:
+        print(
+            f"{result['entry_point']:<60}{_format(result['import_secs'])} "
+            f"{_format(result['context_secs'])}  "
+            f"{', '.join(result['heavy_modules']) or '-'}"
+        )
+        if result["error"]:
+            print(f"{'':<4}error: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import sys
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# airflow
+from airflow.decorators import dag, task  # type: ignore
+from airflow.models.baseoperator import chain as chain_tasks  # type: ignore
+from airflow.models.param import Param  # type: ignore
+from airflow.operators.empty import EmptyOperator  # type: ignore
+from airflow.operators.python import get_current_context  # type: ignore
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List
+
+# package
+sys.path.append(str(Path(__file__).parent.parent))
+from src.backfill import BackfillPlanner
+from src.cluster import ClusterHandle, DataProcCluster, YandexAPIError
+from src.cluster.trigger import ClusterStatusSensor
+from src.config import Config, UnableToGetConfig
+from src.environ import DotEnvError, EnvironNotSet
+from src.keeper import ArgsKeeper
+from src.notifyer import notify_on_task_failure
+from src.registry import JobRegistry, UnknownJob
+from src.submitter import (
+    SparkSubmitter,
+    UnableToGetResponse,
+    UnableToSendRequest,
+    UnableToSubmitJob,
+)
+
+# Recomputes datamarts for a range of dates. Triggered manually with params:
+#   start_date, end_date : range of dates to backfill
+#   jobs : names of jobs to backfill, all jobs from config if empty
+#   chunk_days : days collected by one Spark job submission, from config if empty
+#
+# Range is split into chunks and chunks run in parallel on one Cluster,
+# which is stopped only after all of them finished.
+
+logger = getLogger("aiflow.task")
+
+DEFAULT_ARGS = dict(
+    retries=1,
+    retry_delay=timedelta(seconds=30),
+    on_failure_callback=notify_on_task_failure,
+)
+
+config = Config(config_path=Path(Path(__file__).parent.parent, "config/config.yaml"))
+
+
+@task(default_args=DEFAULT_ARGS)
+def start_cluster(handle: Dict[str, Any]) -> ...:
+    "Starts DataProc Cluster"
+    try:
+        cluster = DataProcCluster(cluster_id=ClusterHandle(**handle).id)
+        cluster.exec_command(command="start")
+    except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
+        logger.exception(err)
+        sys.exit(1)
+
+
+@task(default_args=DEFAULT_ARGS, trigger_rule="none_failed")
+def plan_backfill(jobs: List[str]) -> List[Dict[str, Any]]:
+    "Splits range of dates from DAG run params into runs of given jobs"
+    params = get_current_context()["params"]
+    selected = params.get("jobs") or jobs
+
+    try:
+        runs = BackfillPlanner(chunk_days=params.get("chunk_days")).plan(
+            start=date.fromisoformat(params["start_date"]),
+            end=date.fromisoformat(params["end_date"]),
+            jobs=[_ for _ in jobs if _ in selected],
+        )
+    except (ValueError, UnknownJob, UnableToGetConfig) as err:
+        logger.exception(err)
+        sys.exit(1)
+
+    for run in runs:
+        logger.info(
+            f"'{run.job}' from {run.date} to {run.end_date}. Days: {run.days}, partitions to read: {run.scanned_days}"
+        )
+
+    return [asdict(_) for _ in runs]
+
+
+@task(default_args=DEFAULT_ARGS, trigger_rule="none_failed")
+def submit_backfill_run(run: Dict[str, Any]) -> ...:
+    "Submits Spark job which collects datamart for each day of the run"
+    try:
+        job_args = JobRegistry().get(name=run["job"]).args
+        keeper = ArgsKeeper(
+            date=run["date"],
+            end_date=run["end_date"],
+            depth=job_args["depth"],  # type: ignore
+            src_path=job_args["src_path"],  # type: ignore
+            tgt_path=job_args["tgt_path"],  # type: ignore
+            coords_path=job_args["coords_path"],  # type: ignore
+            # the same for every retry, so retry resumes from checkpoints of failed attempt.
+            # Checkpoints are scoped by day, so parallel runs don't share them
+            processed_dttm=get_current_context()["dag_run"].start_date.strftime(
+                r"%Y-%m-%dT%H:%M:%S"
+            ),
+        )
+    except (ValueError, UnknownJob) as err:
+        logger.error(err)
+        sys.exit(1)
+    except UserWarning as err:
+        logger.warning(err)
+        pass
+
+    try:
+        SparkSubmitter().submit_job(job=run["job"], keeper=keeper)
+    except (
+        UnableToGetResponse,
+        UnableToSendRequest,
+        UnableToSubmitJob,
+        UnableToGetConfig,
+        DotEnvError,
+        EnvironNotSet,
+    ) as err:
+        logger.exception(err)
+        sys.exit(1)
+
+
+@task(default_args=DEFAULT_ARGS, trigger_rule="all_done")
+def stop_cluster(handle: Dict[str, Any]) -> ...:
+    "Stops Cluster after all backfill runs finished"
+    try:
+        cluster = DataProcCluster(cluster_id=ClusterHandle(**handle).id)
+        cluster.exec_command(command="stop")
+    except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
+        logger.exception(err)
+        sys.exit(1)
+
+
+@dag(
+    dag_id="datamart-backfill-dag",
+    schedule=None,
+    start_date=datetime(2023, 4, 3),
+    catchup=False,
+    is_paused_upon_creation=True,
+    tags=["spark", "de-dataproc-06", "backfill"],
+    default_args={
+        "owner": "@leonidgrishenkov",
+    },
+    params={
+        "start_date": Param(type="string", format="date"),
+        "end_date": Param(type="string", format="date"),
+        "jobs": Param([], type="array"),
+        "chunk_days": Param(None, type=["null", "integer"], minimum=1),
+    },
+    default_view="grid",
+)
+def taskflow() -> ...:
+    handle = asdict(ClusterHandle())
+    registry = JobRegistry(config=config)
+
+    begin = EmptyOperator(task_id="begining")
+
+    start = start_cluster(handle=handle)
+    is_running = ClusterStatusSensor(
+        task_id="wait_until_cluster_running",
+        target_status="running",
+        default_args=DEFAULT_ARGS,
+    )
+
+    chain_tasks(begin, start, is_running)
+
+    # jobs of the next stage depend on jobs of the previous one
+    upstream = is_running
+    for i, stage in enumerate(registry.get_stages()):
+        runs = submit_backfill_run.override(
+            task_id=f"backfill_stage_{i}",
+            max_active_tis_per_dag=config.get_backfill_config["max_parallel_runs"],
+        ).expand(
+            run=plan_backfill.override(task_id=f"plan_stage_{i}")(jobs=list(stage))
+        )
+
+        chain_tasks(upstream, runs)
+        upstream = runs
+
+    is_stopped = ClusterStatusSensor(
+        task_id="wait_until_cluster_stopped",
+        target_status="stopped",
+        trigger_rule="all_done",
+        default_args=DEFAULT_ARGS,
+    )
+
+    end = EmptyOperator(task_id="ending")
+
+    chain_tasks(upstream, stop_cluster(handle=handle), is_stopped, end)
+
+
+taskflow()
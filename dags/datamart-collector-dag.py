@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sys
+from dataclasses import asdict
 from datetime import date, datetime, timedelta
 from logging import getLogger
 from pathlib import Path
@@ -8,136 +9,115 @@ from typing import TYPE_CHECKING
 
 # airflow
 from airflow.decorators import dag, task  # type: ignore
+from airflow.exceptions import AirflowSkipException  # type: ignore
 from airflow.models.baseoperator import chain as chain_tasks  # type: ignore
+from airflow.models.baseoperator import cross_downstream  # type: ignore
 from airflow.operators.empty import EmptyOperator  # type: ignore
+from airflow.operators.python import get_current_context  # type: ignore
 
 if TYPE_CHECKING:
-    from typing import Dict
+    from typing import Any, Dict, List
 
 # package
 sys.path.append(str(Path(__file__).parent.parent))
-from src.cluster import DataProcCluster, YandexAPIError
+from src.cluster import ClusterHandle, DataProcCluster, YandexAPIError
+from src.cluster.trigger import ClusterStatusSensor
 from src.config import Config, UnableToGetConfig
 from src.environ import DotEnvError, EnvironNotSet
+from src.helper import S3ServiceError, SparkHelper
 from src.keeper import ArgsKeeper
-from src.notifyer import TelegramNotifyer
+from src.notifyer import notify_on_task_failure
+from src.pool import ClusterPool, NoClusterAvailable
+from src.registry import JobRegistry, UnknownJob
 from src.submitter import (
-    SparkSubmitter,
     UnableToGetResponse,
     UnableToSendRequest,
     UnableToSubmitJob,
 )
 
-notifyer = TelegramNotifyer()
+# Clients are created only inside running tasks. DAG parsing must not send
+# requests or read anything except config.
 logger = getLogger("aiflow.task")
 
 DEFAULT_ARGS = dict(
     retries=1,
     retry_delay=timedelta(seconds=30),
-    on_failure_callback=notifyer.notify_on_task_failure,
+    on_failure_callback=notify_on_task_failure,
 )
 
 
-@task(default_args=DEFAULT_ARGS)
-def start_cluster(cluster: DataProcCluster) -> ...:
-    "Starts DataProc Cluster"
-    try:
-        cluster.exec_command(command="start")
-    except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
-        logger.exception(err)
-        sys.exit(1)
+def _get_keeper(
+    job_args: Dict[str, str | int | date], processed_dttm: datetime
+) -> ArgsKeeper:
+    "Builds arguments of nightly run of job from its config section"
+    return ArgsKeeper(
+        date=str(job_args["date"]),
+        depth=job_args["depth"],  # type:ignore
+        src_path=job_args["src_path"],  # type:ignore
+        tgt_path=job_args["tgt_path"],  # type:ignore
+        coords_path=job_args["coords_path"],  # type:ignore
+        processed_dttm=processed_dttm.strftime(r"%Y-%m-%dT%H:%M:%S"),
+    )
 
 
-@task(default_args=DEFAULT_ARGS)
-def wait_until_cluster_running(cluster: DataProcCluster) -> ...:
-    "Waits until Cluster will be ready to use"
-    try:
-        cluster.check_status(target_status="running")
-    except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
-        logger.exception(err)
-        sys.exit(1)
+@task.short_circuit(default_args=DEFAULT_ARGS)
+def check_inputs_changed() -> List[str]:
+    "Returns jobs which inputs changed since their last run. If none, every downstream task is skipped and Cluster is not started"
+    registry = JobRegistry()
 
-
-@task(default_args=DEFAULT_ARGS)
-def collect_users_demographic_dm_job(
-    spark_submitter: SparkSubmitter, job_args: Dict[str, str | int | date]
-) -> ...:
     try:
-        keeper = ArgsKeeper(
-            date=str(job_args["date"]),
-            depth=job_args["depth"],  # type:ignore
-            src_path=job_args["src_path"],  # type:ignore
-            tgt_path=job_args["tgt_path"],  # type:ignore
-            coords_path=job_args["coords_path"],  # type:ignore
-            processed_dttm=datetime.now().strftime(r"%Y-%m-%d %H:%M:%S").replace(" ", "T"),  # type: ignore
-        )
-    except ValueError as err:
-        logger.error(err)
-        sys.exit(1)
-    except UserWarning as err:
+        helper = SparkHelper()
+        changed = set()
+
+        for stage in registry.get_stages():
+            for name in stage:
+                spec = registry.get(name=name)
+
+                # datamart is recollected if any of the datamarts it depends on is
+                if changed.intersection(spec.depends_on):
+                    changed.add(name)
+                    continue
+
+                keeper = _get_keeper(job_args=spec.args, processed_dttm=datetime.now())
+                fingerprint = helper.get_input_fingerprint(
+                    event_types=spec.event_types, keeper=keeper  # type: ignore
+                )
+                if fingerprint != helper.read_fingerprint(job=name, keeper=keeper):
+                    changed.add(name)
+                else:
+                    logger.info(f"Inputs of '{name}' job not changed since the last run")
+
+    except (S3ServiceError, UnknownJob, ValueError, DotEnvError, EnvironNotSet) as err:
+        # unable to compare, so every job runs as usual
         logger.warning(err)
-        pass
+        return registry.names
 
-    try:
-        spark_submitter.submit_job(job="collect_users_demographic_dm_job", keeper=keeper)  # type: ignore
-    except (
-        UnableToGetResponse,
-        UnableToSendRequest,
-        UnableToSubmitJob,
-        UnableToGetConfig,
-        DotEnvError,
-        EnvironNotSet,
-    ) as err:
-        logger.exception(err)
-        sys.exit(1)
+    return [_ for _ in registry.names if _ in changed]
 
 
 @task(default_args=DEFAULT_ARGS)
-def collect_events_total_cnt_agg_wk_mnth_dm_job(
-    spark_submitter: SparkSubmitter, job_args: Dict[str, str | int | date]
-) -> ...:
-    try:
-        keeper = ArgsKeeper(
-            date=str(job_args["date"]),
-            depth=job_args["depth"],  # type:ignore
-            src_path=job_args["src_path"],  # type:ignore
-            tgt_path=job_args["tgt_path"],  # type:ignore
-            coords_path=job_args["coords_path"],  # type:ignore
-            processed_dttm=datetime.now().strftime(r"%Y-%m-%d %H:%M:%S").replace(" ", "T"),  # type: ignore
-        )
-    except ValueError as err:
-        logger.error(err)
-        sys.exit(1)
-    except UserWarning as err:
-        logger.warning(err)
-        pass
-
+def start_cluster(handle: Dict[str, Any]) -> ...:
+    "Starts DataProc Cluster"
     try:
-        spark_submitter.submit_job(job="collect_events_total_cnt_agg_wk_mnth_dm_job", keeper=keeper)  # type: ignore
-    except (
-        UnableToGetResponse,
-        UnableToSendRequest,
-        UnableToSubmitJob,
-        UnableToGetConfig,
-        DotEnvError,
-        EnvironNotSet,
-    ) as err:
+        cluster = DataProcCluster(cluster_id=ClusterHandle(**handle).id)
+        cluster.exec_command(command="start")
+    except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
         logger.exception(err)
         sys.exit(1)
 
 
-@task(default_args=DEFAULT_ARGS)
-def collect_add_to_friends_recommendations_dm_job(
-    spark_submitter: SparkSubmitter, job_args: Dict[str, str | int | date]
+@task(default_args=DEFAULT_ARGS, trigger_rule="none_failed")
+def submit_datamart_job(
+    job: str, job_args: Dict[str, str | int | date], changed: List[str]
 ) -> ...:
+    "Submits Spark job declared in config on the least loaded Cluster of the pool, skipped if job inputs not changed"
+    if job not in changed:
+        raise AirflowSkipException(f"Inputs of '{job}' job not changed since the last run")
+
     try:
-        keeper = ArgsKeeper(
-            date=str(job_args["date"]),
-            depth=job_args["depth"],  # type:ignore
-            src_path=job_args["src_path"],  # type:ignore
-            tgt_path=job_args["tgt_path"],  # type:ignore
-            coords_path=job_args["coords_path"],  # type:ignore
-            processed_dttm=datetime.now().strftime(r"%Y-%m-%d %H:%M:%S").replace(" ", "T"),  # type: ignore
+        # the same for every retry of the task, so retry resumes from checkpoints of failed attempt
+        keeper = _get_keeper(
+            job_args=job_args, processed_dttm=get_current_context()["dag_run"].start_date
         )
     except ValueError as err:
         logger.error(err)
@@ -147,8 +127,10 @@ def collect_add_to_friends_recommendations_dm_job(
         pass
 
     try:
-        spark_submitter.submit_job(job="collect_add_to_friends_recommendations_dm_job", keeper=keeper)  # type: ignore
+        ClusterPool().submit_job(job=job, keeper=keeper)
     except (
+        NoClusterAvailable,
+        YandexAPIError,
         UnableToGetResponse,
         UnableToSendRequest,
         UnableToSubmitJob,
@@ -162,11 +144,12 @@ def collect_add_to_friends_recommendations_dm_job(
 
 @task(
     default_args=DEFAULT_ARGS,
-    trigger_rule="all_success",
+    trigger_rule="none_failed",
 )
-def stop_cluster_success_way(cluster: DataProcCluster) -> ...:
-    "Stops Cluster if every of upstream tasks successfully executed, if not - skipped"
+def stop_cluster_success_way(handle: Dict[str, Any]) -> ...:
+    "Stops Cluster if none of upstream tasks failed, if not - skipped"
     try:
+        cluster = DataProcCluster(cluster_id=ClusterHandle(**handle).id)
         cluster.exec_command(command="stop")
     except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
         logger.exception(err)
@@ -177,9 +160,10 @@ def stop_cluster_success_way(cluster: DataProcCluster) -> ...:
     default_args=DEFAULT_ARGS,
     trigger_rule="one_failed",
 )
-def stop_cluster_failed_way(cluster: DataProcCluster) -> ...:
+def stop_cluster_failed_way(handle: Dict[str, Any]) -> ...:
     "Stops Cluster if one of the upstream tasks failed, if not - skipped"
     try:
+        cluster = DataProcCluster(cluster_id=ClusterHandle(**handle).id)
         cluster.exec_command(command="stop")
     except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
         logger.exception(err)
@@ -190,10 +174,10 @@ def stop_cluster_failed_way(cluster: DataProcCluster) -> ...:
     default_args=DEFAULT_ARGS,
     trigger_rule="all_done",
 )
-def wait_until_cluster_stopped(cluster: DataProcCluster) -> ...:
-    "Waits until Cluster will be stopped"
+def stop_pool_clusters() -> ...:
+    "Stops Clusters which were started on demand by the pool"
     try:
-        cluster.check_status(target_status="stopped")
+        ClusterPool().stop_started()
     except (YandexAPIError, UnableToGetConfig, DotEnvError, EnvironNotSet) as err:
         logger.exception(err)
         sys.exit(1)
@@ -212,46 +196,60 @@ def wait_until_cluster_stopped(cluster: DataProcCluster) -> ...:
     default_view="grid",
 )
 def taskflow() -> ...:
-    cluster = DataProcCluster()
-    submitter = SparkSubmitter()
-    config = Config(config_path=Path("/opt/airflow/config/config.yaml"))
+    handle = asdict(ClusterHandle())
+    registry = JobRegistry(
+        config=Config(config_path=Path(Path(__file__).parent.parent, "config/config.yaml"))
+    )
 
     begin = EmptyOperator(task_id="begining")
 
-    start = start_cluster(cluster=cluster)
-    is_running = wait_until_cluster_running(cluster=cluster)
+    changed = check_inputs_changed()
 
-    users_demographic_dm = collect_users_demographic_dm_job(
-        spark_submitter=submitter,
-        job_args=config.get_job_config["collect_users_demographic_dm_job"],
-    )
-    events_total_cnt_agg_wk_mnth_dm = collect_events_total_cnt_agg_wk_mnth_dm_job(
-        spark_submitter=submitter,
-        job_args=config.get_job_config["collect_events_total_cnt_agg_wk_mnth_dm_job"],
-    )
-    add_to_friends_recommendations_dm = collect_add_to_friends_recommendations_dm_job(
-        spark_submitter=submitter,
-        job_args=config.get_job_config["collect_add_to_friends_recommendations_dm_job"],
+    start = start_cluster(handle=handle)
+    # deferrable, waits in triggerer without holding worker slot
+    is_running = ClusterStatusSensor(
+        task_id="wait_until_cluster_running",
+        target_status="running",
+        default_args=DEFAULT_ARGS,
     )
 
-    stop_cluster_failed = stop_cluster_failed_way(cluster=cluster)
-    stop_cluster_success = stop_cluster_success_way(cluster=cluster)
+    # one task per job declared in config
+    datamarts = {
+        spec.name: submit_datamart_job.override(task_id=spec.name)(
+            job=spec.name, job_args=spec.args, changed=changed
+        )
+        for spec in registry
+    }
+
+    stop_cluster_failed = stop_cluster_failed_way(handle=handle)
+    stop_cluster_success = stop_cluster_success_way(handle=handle)
 
-    is_stopped = wait_until_cluster_stopped(cluster=cluster)
+    is_stopped = ClusterStatusSensor(
+        task_id="wait_until_cluster_stopped",
+        target_status="stopped",
+        trigger_rule="all_done",
+        default_args=DEFAULT_ARGS,
+    )
 
     end = EmptyOperator(task_id="ending")
 
+    is_pool_stopped = stop_pool_clusters()
+
+    # independent datamarts run in parallel and are sharded across Clusters of the pool
+    chain_tasks(begin, changed, start, is_running)
+    for spec in registry:
+        upstream = [datamarts[_] for _ in spec.depends_on] or [is_running]
+        chain_tasks(upstream, datamarts[spec.name])
+
+    cross_downstream(
+        list(datamarts.values()),
+        [stop_cluster_failed, stop_cluster_success, is_pool_stopped],
+    )
     chain_tasks(
-        begin,
-        start,
-        is_running,
-        users_demographic_dm,
-        events_total_cnt_agg_wk_mnth_dm,
-        add_to_friends_recommendations_dm,
         [stop_cluster_failed, stop_cluster_success],
         is_stopped,
         end,
     )
-
+    chain_tasks(is_pool_stopped, end)
 
 taskflow()
@@ -0,0 +1,176 @@
+#
+# Entry point of every datamart Spark job declared in ``spark.jobs``
+# section of config. Name of job is the first argument:
+#
+#   spark-submit jobs/datamart_job.py <job> <date> <depth> <src_path> <tgt_path> <coords_path> <processed_dttm> [<end_date>]
+#
+# With ``end_date`` datamart is collected for each day from ``date`` to ``end_date``
+# and results of each day are saved to ``date=<day>`` partition.
+#
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+# package
+sys.path.append(str(Path(__file__).parent.parent))
+from src.config import UnableToGetConfig
+from src.context import get_context
+from src.environ import DotEnvError, EnvironNotSet
+from src.helper import S3ServiceError
+from src.keeper import ArgsKeeper
+from src.registry import JobRegistry, UnknownJob
+from src.sizer import ResourceSizer, RunMetrics
+from src.spark import DatamartCollector
+
+
+def main(job: str, argv: List[str]) -> ...:
+    context = get_context()
+    config = context.config
+    logger = context.get_logger(name=__name__)
+
+    try:
+        spec = JobRegistry(config=config).get(name=job)
+    except UnknownJob as err:
+        logger.error(err)
+        sys.exit(1)
+
+    try:
+        if len(argv) > 7:
+            raise IndexError("Too many arguments for job submitting! Expected 6 or 7")
+
+        keeper = ArgsKeeper(
+            date=str(argv[0]),
+            depth=int(argv[1]),
+            src_path=str(argv[2]),
+            tgt_path=str(argv[3]),
+            coords_path=str(argv[4]),
+            processed_dttm=str(argv[5]),
+            end_date=str(argv[6]) if len(argv) == 7 else None,
+        )
+        if not keeper.coords_path:
+            raise S3ServiceError(
+                "We need 'coords_path' for this job! Please specify one in given 'ArgsKeeper' instance"
+            )
+
+    except (IndexError, S3ServiceError) as err:
+        logger.error(err)
+        sys.exit(1)
+
+    try:
+        collector = DatamartCollector()
+    except (DotEnvError, EnvironNotSet, UnableToGetConfig) as err:
+        logger.error(err)
+        sys.exit(1)
+
+    try:
+        for bucket in (keeper.src_path, keeper.tgt_path, keeper.coords_path):
+            collector.check_s3_object_existence(key=bucket.split(sep="/")[2], type="bucket")  # type: ignore
+    except S3ServiceError as err:
+        logger.error(err)
+        sys.exit(1)
+
+    # job is not collected again while its inputs are the same as on the last run.
+    # Backfill always recollects given range
+    fingerprint = None
+    if not keeper.end_date:
+        try:
+            fingerprint = collector.get_input_fingerprint(
+                event_types=spec.event_types, keeper=keeper  # type: ignore
+            )
+            if fingerprint == collector.read_fingerprint(job=spec.name, keeper=keeper):
+                logger.info(
+                    f"Inputs of '{spec.name}' job not changed since the last run. Skipping"
+                )
+                sys.exit(2)
+        except S3ServiceError as err:
+            logger.error(err)
+            sys.exit(1)
+
+    # one keeper per collected day and one covering input window of all of them
+    days = [keeper]
+    if keeper.end_date:
+        first = datetime.strptime(keeper.date, r"%Y-%m-%d").date()
+        last = datetime.strptime(keeper.end_date, r"%Y-%m-%d").date()
+
+        days = [
+            # processed_dttm of submission is kept for column value and checkpoints
+            keeper.copy(update=dict(date=str(day), end_date=None))
+            for day in (
+                first + timedelta(days=i) for i in range((last - first).days + 1)
+            )
+        ]
+        keeper = keeper.copy(
+            update=dict(date=keeper.end_date, depth=keeper.depth + len(days) - 1)
+        )
+
+    try:
+        sizer = ResourceSizer()
+        input_bytes = collector._get_src_size(
+            event_types=spec.event_types, keeper=keeper  # type: ignore
+        )
+        spark_conf = sizer.estimate(job=spec.name, input_bytes=input_bytes)
+    except (S3ServiceError, UnableToGetConfig) as err:
+        logger.error(err)
+        sys.exit(1)
+
+    from pyspark.sql.utils import CapturedException  # type: ignore
+
+    try:
+        collector.init_session(
+            app_name=config.get_spark_app_name,
+            spark_conf=spark_conf,
+            log4j_level=config.get_logging_level["java"],  # type: ignore
+            profile=spec.profile,
+        )
+
+        _start = time.time()
+        if len(days) > 1:
+            collector.cache_events(event_types=spec.event_types, keeper=keeper)  # type: ignore
+
+        # days of backfill share processed_dttm, so each one is written to its own partition
+        for day in days:
+            getattr(collector, spec.method)(
+                keeper=day, partition_date=day.date if keeper.end_date else None
+            )
+
+        sizer.record(
+            job=spec.name,
+            metrics=RunMetrics(
+                input_bytes=input_bytes,
+                duration=time.time() - _start,
+                # allowed max if monitoring API is unavailable
+                executors=collector.get_peak_executors()
+                or spark_conf.max_executors_num,
+                executor_cores=spark_conf.executor_cores,
+                spilled_bytes=collector.get_spilled_bytes(),
+            ),
+        )
+
+        if fingerprint:
+            try:
+                collector.write_fingerprint(
+                    job=spec.name, keeper=keeper, fingerprint=fingerprint
+                )
+            except S3ServiceError as err:
+                # datamart is collected, next run just will not be skipped
+                logger.warning(err)
+
+    except (CapturedException, S3ServiceError) as err:
+        logger.error(err)
+        sys.exit(1)
+
+    finally:
+        collector.stop_session()  # type: ignore
+
+    # job is successful only if nothing failed above, so failed one is retried by Airflow
+    sys.exit(2)
+
+
+if __name__ == "__main__":
+    try:
+        main(job=sys.argv[1], argv=sys.argv[2:])
+    except Exception as err:
+        get_context().get_logger(name=__name__).exception(err)
+        sys.exit(1)
@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+from src.backfill.datamodel import BackfillRun
+from src.backfill.planner import BackfillPlanner
+
+__all__ = ["BackfillPlanner", "BackfillRun"]
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class BackfillRun:
+    """Single Spark job submission of backfill.
+
+    Collects datamart for each day from `date` to `end_date` inside one Spark application, so input partitions shared by adjacent days are read once.
+
+    ## Parameters
+    `job` : Name of job\n
+    `date` : First day of run. Format: `%Y-%m-%d`\n
+    `end_date` : Last day of run. Format: `%Y-%m-%d`\n
+    `days` : Number of days collected by run\n
+    `scanned_days` : Number of input partitions read by run for each event type
+    """
+
+    job: str
+    date: str
+    end_date: str
+    days: int
+    scanned_days: int
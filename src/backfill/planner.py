@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Iterable, List
+
+    from src.config import Config
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.backfill.datamodel import BackfillRun
+from src.registry import JobRegistry
+
+
+class BackfillPlanner:
+    """Plans recomputing of datamarts for a range of dates.
+
+    ## Notes
+    Range is split into chunks of `chunk_days` adjacent days. Each chunk of each job is one Spark job submission which reads input window of the whole chunk once and collects datamart for each day of the chunk from it. With `depth` of 10 days, 7 separate runs read 70 daily partitions while one chunk reads 16.
+
+    Chunks are independent and may run in parallel. Configured in `spark.backfill` section of `config.yaml`.
+
+    ## Examples
+    >>> planner = BackfillPlanner()
+    >>> runs = planner.plan(start=date(2022, 4, 1), end=date(2022, 4, 10), jobs=["collect_users_demographic_dm_job"])
+    >>> [(_.date, _.end_date) for _ in runs]
+    [('2022-04-01', '2022-04-07'), ('2022-04-08', '2022-04-10')]
+    """
+
+    __slots__ = ("_chunk_days", "_registry")
+
+    def __init__(
+        self, chunk_days: int | None = None, config: Config | None = None
+    ) -> None:
+        """
+
+        ## Parameters
+        `chunk_days` : Max number of days collected by one Spark job submission, by default `spark.backfill.chunk_days` from config\n
+        `config` : Project config, by default taken from project context
+        """
+        if config is None:
+            from src.context import get_context
+
+            config = get_context().config
+
+        self._registry = JobRegistry(config=config)
+        self._chunk_days = chunk_days or config.get_backfill_config["chunk_days"]
+
+        if self._chunk_days < 1:
+            raise ValueError("'chunk_days' must be positive")
+
+    def plan(
+        self, start: date, end: date, jobs: Iterable[str] | None = None
+    ) -> List[BackfillRun]:
+        """Splits range of dates into runs of each job.
+
+        ## Parameters
+        `start` : First day of range\n
+        `end` : Last day of range\n
+        `jobs` : Names of jobs to backfill, by default all jobs from config. Nothing is planned if empty
+
+        ## Returns
+        `List[BackfillRun]` : Runs ordered by job and date
+
+        ## Raises
+        `ValueError` : If `end` is earlier than `start`\n
+        `UnknownJob` : If job not declared in config
+        """
+        if end < start:
+            raise ValueError("'end' must not be earlier than 'start'")
+
+        runs = []
+
+        for job in jobs if jobs is not None else self._registry.names:
+            depth = int(self._registry.get(name=job).args["depth"])  # type: ignore
+            chunk_start = start
+
+            while chunk_start <= end:
+                chunk_end = min(chunk_start + timedelta(days=self._chunk_days - 1), end)
+                days = (chunk_end - chunk_start).days + 1
+
+                runs.append(
+                    BackfillRun(
+                        job=job,
+                        date=str(chunk_start),
+                        end_date=str(chunk_end),
+                        days=days,
+                        scanned_days=depth + days - 1,
+                    )
+                )
+                chunk_start = chunk_end + timedelta(days=1)
+
+        return runs
@@ -31,6 +31,8 @@ class BaseRequestHandler:
         max_retries: int = 10,
         retry_delay: int = 60,
         session_timeout: int = 60 * 2,
+        cluster_id: str | None = None,
+        cluster_api_base_url: str | None = None,
     ) -> None:
         self._MAX_RETRIES = max_retries
         self._DELAY = retry_delay
@@ -39,26 +41,23 @@ class BaseRequestHandler:
         env_man = EnvironManager()
         env_man.load_environ()
 
+        # Cluster specific variables are required only if not passed explicitly
         _REQUIRED_VARS = (
-            "YC_DATAPROC_CLUSTER_ID",
-            "YC_DATAPROC_BASE_URL",
-            "YC_OAUTH_TOKEN",
-            "CLUSTER_API_BASE_URL",
-            "PROJECT_PATH",
+            (("YC_DATAPROC_CLUSTER_ID",) if cluster_id is None else ())
+            + ("YC_DATAPROC_BASE_URL", "YC_OAUTH_TOKEN", "PROJECT_PATH")
+            + (("CLUSTER_API_BASE_URL",) if cluster_api_base_url is None else ())
         )
         env_man.check_environ(var=_REQUIRED_VARS)
 
-        (
-            self._CLUSTER_ID,
-            self._BASE_URL,
-            self._OAUTH_TOKEN,
-            self._CLUSTER_API_BASE_URL,
-        ) = map(getenv, _REQUIRED_VARS[:4])
-
-        self.config = Config(
-            config_path=Path(getenv("PROJECT_PATH"), "config/config.yaml")  # type: ignore
+        self._CLUSTER_ID = cluster_id or getenv("YC_DATAPROC_CLUSTER_ID")
+        self._BASE_URL = getenv("YC_DATAPROC_BASE_URL")
+        self._OAUTH_TOKEN = getenv("YC_OAUTH_TOKEN")
+        self._CLUSTER_API_BASE_URL = cluster_api_base_url or getenv(
+            "CLUSTER_API_BASE_URL"
         )
 
+        self.config: Config = env_man.config
+
     @property
     def max_retries(self) -> int:
         """
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from src.cluster.aio import AsyncDataProcCluster
 from src.cluster.cluster import DataProcCluster
+from src.cluster.datamodel import ClusterHandle
 from src.cluster.exceptions import YandexAPIError
 
-__all__ = ["DataProcCluster", "YandexAPIError"]
+__all__ = ["DataProcCluster", "AsyncDataProcCluster", "ClusterHandle", "YandexAPIError"]
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Literal
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.cluster.cluster import DataProcCluster
+from src.cluster.exceptions import RetryableRequestError, YandexAPIError
+
+
+class AsyncDataProcCluster(DataProcCluster):
+    """Asyncio implementation of `DataProcCluster`.
+
+    ## Notes
+    Waiting between requests is done with `asyncio.sleep`, so waiting for the Cluster status holds no thread and many Clusters can be watched from one event loop. Each single HTTP request is sent in default executor of running loop.
+
+    Retries, deadline, backoff and IAM token handling are the same as in `DataProcCluster`.
+
+    ## Examples
+    Initialize Class instance:
+    >>> cluster = AsyncDataProcCluster()
+
+    Start Cluster and wait until it will be ready to use:
+    >>> await cluster.exec_command(command="start")
+    >>> await cluster.check_status(target_status="running")
+
+    Wait for several Clusters at once:
+    >>> await asyncio.gather(
+    ...     *(cluster.check_status(target_status="stopped") for cluster in clusters)
+    ... )
+    """
+
+    __slots__ = ()
+
+    async def _run_in_executor(self, func: Callable[..., Any], **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(None, partial(func, **kwargs))
+
+    async def exec_command(self, command: Literal["start", "stop"]) -> bool:  # type: ignore
+        """Sends request to Yandex Cloud API to execute Cluster command.
+
+        ## Parameters
+        `command` : Command to execute
+
+        ## Raises
+        `YandexAPIError` : If unable to get response or error occured while requesting API
+        """
+        self.logger.info(f"Sending request to execute Cluster command: '{command}'")
+
+        for _TRY in range(1, self._MAX_RETRIES + 1):
+            try:
+                self.logger.debug(f"Requesting... Try: {_TRY}")
+                await self._run_in_executor(self._request_command, command=command)
+
+                return True
+
+            except RetryableRequestError as err:
+                if _TRY == self._MAX_RETRIES:
+                    raise YandexAPIError(str(err))
+
+                self.logger.warning(err.warning)
+                await asyncio.sleep(self._DELAY)
+
+    async def check_status(self, target_status: Literal["running", "stopped"], deadline: int | None = None) -> bool:  # type: ignore
+        """Sends requests to check current Cluster status.
+
+        Waits until Cluster status will be equal to `target_status` or deadline exceeded.
+
+        ## Parameters
+        `target_status` : The target Cluster status\n
+        `deadline` : Total time in secs to wait for target status, by default `cluster.polling.deadline` from config
+
+        ## Raises
+        `YandexAPIError` : If deadline exceeded, if `max_retries` requests in a row failed or if error occured while requesting API
+        """
+        self.logger.info(
+            f"Checking current Cluster status. Target status: '{target_status.upper()}'"
+        )
+
+        poller = await self._run_in_executor(
+            self._get_poller, target_status=target_status, deadline=deadline
+        )
+
+        _FAILED = 0
+        last_status = None
+
+        while True:
+            try:
+                self.logger.debug(
+                    f"Requesting... Elapsed: {poller.elapsed:.0f} secs, failed in a row: {_FAILED}"
+                )
+                last_status = await self._run_in_executor(self._request_status)
+
+            except RetryableRequestError as err:
+                _FAILED += 1
+                if _FAILED >= self._MAX_RETRIES:
+                    raise YandexAPIError(str(err))
+
+                self.logger.warning(err.warning)
+
+            else:
+                _FAILED = 0
+                if await self._run_in_executor(
+                    self._is_target_status,
+                    status=last_status,
+                    target_status=target_status,
+                ):
+                    return True
+
+            await asyncio.sleep(
+                self._get_next_delay(poller=poller, last_status=last_status)
+            )
@@ -9,7 +9,7 @@ from pathlib import Path
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Literal
+    from typing import Dict, Literal, Union
 
 import requests
 from requests.exceptions import (
@@ -24,8 +24,12 @@ from requests.exceptions import (
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.base import BaseRequestHandler
-from src.cluster.exceptions import YandexAPIError
+from src.cluster.datamodel import ClusterHandle
+from src.cluster.exceptions import RetryableRequestError, YandexAPIError
+from src.cluster.iam import IAMToken, IAMTokenProvider
+from src.cluster.poller import BackoffPolicy, StatusPoller, TransitionHistory
 from src.logger import SparkLogger
+from src.store import JSONStateStore
 
 
 class DataProcCluster(BaseRequestHandler):
@@ -38,7 +42,9 @@ class DataProcCluster(BaseRequestHandler):
 
     See `.env.template` for mote details.
 
-    At initializing moment will try to get IAM token from environment variables if no ones, sends request to Yandex Cloud API to get token and than sets to environ as `YC_IAM_TOKEN`.
+    Initialization does no network calls. IAM token is taken before the first request to API from the on-disk cache shared by all processes on the host. If no valid token cached, sends request to Yandex Cloud API to get one. Token is refreshed before it expires and once more if API rejects it with 401 code. It also set to environ as `YC_IAM_TOKEN`.
+
+    Cache is configured in `cluster.iam_token` section of `config.yaml`.
 
     ## Examples
     Initialize Class instance:
@@ -47,17 +53,22 @@ class DataProcCluster(BaseRequestHandler):
     Send request to start Cluster:
     >>> cluster.exec_command(command="start")
 
-    If request was sent successfully we can check current Cluster status:
+    If request was sent successfully we can wait for target Cluster status:
     >>> cluster.check_status(target_status="running")
     ... [2023-05-26 12:51:21] {src.cluster.cluster:133} INFO: Sending request to check Cluster status. Target status: running
     ... [2023-05-26 12:51:21] {src.cluster.cluster:156} INFO: Current cluster status is: STARTING
     ... [2023-05-26 12:51:41] {src.cluster.cluster:156} INFO: Current cluster status is: STARTING
     ... [2023-05-26 12:59:39] {src.cluster.cluster:160} INFO: Current cluster status is: RUNNING
     ... [2023-05-26 12:59:39] {src.cluster.cluster:165} INFO: The target status has been reached!
+
+    Polling is deadline based and configured in `cluster.polling` section of `config.yaml`. Delay between requests grows from `initial_delay` up to `retry_delay` and tightens near the expected transition time learned from past runs.
     """
 
     __slots__ = (
         "_IAM_TOKEN",
+        "_POLLING",
+        "_history",
+        "_token_provider",
         "logger",
     )
 
@@ -67,11 +78,21 @@ class DataProcCluster(BaseRequestHandler):
         max_retries: int = 10,
         retry_delay: int = 60,
         session_timeout: int = 60 * 2,
+        cluster_id: str | None = None,
     ) -> None:
+        """
+
+        ## Parameters
+        `max_retries` : Max requests in a row which may fail, by default 10\n
+        `retry_delay` : Max delay between requests in secs, by default 60\n
+        `session_timeout` : Session timeout in secs, by default 60*2\n
+        `cluster_id` : Cluster ID, by default taken from `YC_DATAPROC_CLUSTER_ID` environ variable
+        """
         super().__init__(
             max_retries=max_retries,
             retry_delay=retry_delay,
             session_timeout=session_timeout,
+            cluster_id=cluster_id,
         )
         self.logger = (
             getLogger("aiflow.task")
@@ -81,18 +102,87 @@ class DataProcCluster(BaseRequestHandler):
             )
         )
 
-        if "YC_IAM_TOKEN" not in environ:
-            self._get_iam_token()
+        self._POLLING = self.config.get_cluster_config["polling"]
+        self._history = TransitionHistory(
+            store=JSONStateStore(
+                path=Path(getenv("PROJECT_PATH"), self._POLLING["history_path"])  # type: ignore
+            ),
+            size=self._POLLING["history_size"],
+            namespace=self._CLUSTER_ID,
+        )
+
+        _IAM_TOKEN_CONFIG = self.config.get_cluster_config["iam_token"]
+        self._token_provider = IAMTokenProvider(
+            store=JSONStateStore(
+                path=Path(getenv("PROJECT_PATH"), _IAM_TOKEN_CONFIG["cache_path"])  # type: ignore
+            ),
+            fetch=self._request_iam_token,
+            refresh_margin=_IAM_TOKEN_CONFIG["refresh_margin"],
+        )
+
+        self._IAM_TOKEN = None
 
-        self._IAM_TOKEN = getenv("YC_IAM_TOKEN")
+    @property
+    def handle(self) -> ClusterHandle:
+        """Serializable reference to the managed Cluster"""
+        return ClusterHandle(id=self._CLUSTER_ID)
 
-    def _get_iam_token(self) -> bool:  # type: ignore
+    def _get_iam_token(self) -> bool:
         """
-        Gets IAM token from Yandex Cloud API. If recieved, sets as `YC_IAM_TOKEN` environment variable.
+        Gets new IAM token from Yandex Cloud API and caches it. If recieved, sets as `YC_IAM_TOKEN` environment variable.
 
         ## Returns
         `bool` : Returns True if got token and successfully set as environ variable
 
+        ## Raises
+        `YandexAPIError` : If unable to get IAM token or error occured while sending requests to API
+        """
+        self._IAM_TOKEN = self._token_provider.refresh()
+        environ["YC_IAM_TOKEN"] = self._IAM_TOKEN
+
+        return True
+
+    def _get_auth_headers(self) -> Dict[str, str]:
+        """Returns authorization headers with valid IAM token. Refreshes token if it is about to expire"""
+        self._IAM_TOKEN = self._token_provider.get_token()
+        environ["YC_IAM_TOKEN"] = self._IAM_TOKEN
+
+        return {"Authorization": f"Bearer {self._IAM_TOKEN}"}
+
+    def _send_request(
+        self, method: Literal["get", "post"], url: str
+    ) -> requests.Response:
+        """Sends authorized request to Yandex Cloud API.
+
+        If API rejects IAM token with 401 code, refreshes token and resends request once.
+        """
+        send = requests.get if method == "get" else requests.post
+
+        response = send(
+            url=url, headers=self._get_auth_headers(), timeout=self._SESSION_TIMEOUT
+        )
+
+        if response.status_code == 401:
+            self.logger.warning(
+                "IAM token rejected by API. Refreshing and resending..."
+            )
+
+            self._IAM_TOKEN = self._token_provider.refresh(rejected=self._IAM_TOKEN)
+            environ["YC_IAM_TOKEN"] = self._IAM_TOKEN
+
+            response = send(
+                url=url, headers=self._get_auth_headers(), timeout=self._SESSION_TIMEOUT
+            )
+
+        return response
+
+    def _request_iam_token(self) -> IAMToken:  # type: ignore
+        """
+        Requests new IAM token from Yandex Cloud API.
+
+        ## Returns
+        `IAMToken` : Received token with its expiration time
+
         ## Raises
         `YandexAPIError` : If unable to get IAM token or error occured while sending requests to API
         """
@@ -114,7 +204,7 @@ class DataProcCluster(BaseRequestHandler):
 
             except (InvalidSchema, InvalidURL, MissingSchema) as err:
                 raise YandexAPIError(
-                    f"{err}. Check provided URL for POST request in '_get_iam_token' method"
+                    f"{err}. Check provided URL for POST request in '_request_iam_token' method"
                 )
 
             except (HTTPError, ConnectionError, Timeout) as err:
@@ -148,9 +238,16 @@ class DataProcCluster(BaseRequestHandler):
 
                     # fmt: on
                     self.logger.debug("IAM token collected")
-                    environ["YC_IAM_TOKEN"] = response[token_key]
 
-                    return True
+                    return IAMToken(
+                        value=response[token_key],
+                        expires_at=IAMToken.parse_expires_at(
+                            value=response.get("expiresAt"),
+                            default_ttl=self.config.get_cluster_config["iam_token"][
+                                "default_ttl"
+                            ],
+                        ),
+                    )
 
                 except StopIteration:
                     if _TRY == self._MAX_RETRIES:
@@ -176,6 +273,48 @@ class DataProcCluster(BaseRequestHandler):
 
                     continue
 
+    def _request_command(self, command: Literal["start", "stop"]) -> None:
+        """Sends single request to execute Cluster command.
+
+        ## Raises
+        `YandexAPIError` : If URL is invalid\n
+        `RetryableRequestError` : If request failed but can be retried
+        """
+        try:
+            response = self._send_request(
+                method="post", url=f"{self._BASE_URL}/{self._CLUSTER_ID}:{command}"
+            )
+            response.raise_for_status()
+
+        except (InvalidSchema, InvalidURL, MissingSchema) as err:
+            raise YandexAPIError(
+                f"{err}. Please check 'YC_DATAPROC_BASE_URL' and 'YC_DATAPROC_CLUSTER_ID' environment variables"
+            )
+
+        except (HTTPError, ConnectionError, Timeout) as err:
+            raise RetryableRequestError(msg=str(err), warning=f"{err}. Retrying...")
+
+        if response.status_code != 200:
+            raise RetryableRequestError(
+                msg="Unable send request to Yandex Cloud API",
+                warning="Ops, seems like something went wrong. Retrying...",
+            )
+
+        self.logger.debug("Response received")
+
+        try:
+            self.logger.debug("Decoding response")
+            response = response.json()
+            self.logger.debug(f"{response=}")
+        except JSONDecodeError as err:
+            self.logger.warning(str(err))
+
+        self.logger.info("Command in progress!")
+
+        self._history.mark_started(
+            target_status="running" if command == "start" else "stopped"
+        )
+
     def exec_command(self, command: Literal["start", "stop"]) -> bool:  # type: ignore
         """Sends request to Yandex Cloud API to execute Cluster command.
 
@@ -193,151 +332,201 @@ class DataProcCluster(BaseRequestHandler):
         for _TRY in range(1, self._MAX_RETRIES + 1):
             try:
                 self.logger.debug(f"Requesting... Try: {_TRY}")
-                response = requests.post(
-                    url=f"{self._BASE_URL}/{self._CLUSTER_ID}:{command}",
-                    headers={"Authorization": f"Bearer {self._IAM_TOKEN}"},
-                    timeout=self._SESSION_TIMEOUT,
-                )
-                response.raise_for_status()
+                self._request_command(command=command)
 
-            except (InvalidSchema, InvalidURL, MissingSchema) as err:
-                raise YandexAPIError(
-                    f"{err}. Please check 'YC_DATAPROC_BASE_URL' and 'YC_DATAPROC_CLUSTER_ID' environment variables"
-                )
+                return True
 
-            except (HTTPError, ConnectionError, Timeout) as err:
+            except RetryableRequestError as err:
                 if _TRY == self._MAX_RETRIES:
                     raise YandexAPIError(str(err))
 
-                self.logger.warning(f"{err}. Retrying...")
+                self.logger.warning(err.warning)
                 time.sleep(self._DELAY)
 
-                continue
+    def _request_status(self) -> str:
+        """Sends single request for current Cluster status.
 
-            if response.status_code == 200:
-                self.logger.debug("Response received")
+        ## Returns
+        `str` : Cluster status as returned by API
 
-                try:
-                    self.logger.debug("Decoding response")
-                    response = response.json()
-                    self.logger.debug(f"{response=}")
-                except JSONDecodeError as err:
-                    self.logger.warning(str(err))
-                    pass
+        ## Raises
+        `YandexAPIError` : If URL is invalid\n
+        `RetryableRequestError` : If request failed but can be retried
+        """
+        try:
+            response = self._send_request(
+                method="get", url=f"{self._BASE_URL}/{self._CLUSTER_ID}"
+            )
+            response.raise_for_status()
 
-                self.logger.info("Command in progress!")
+        except (InvalidSchema, InvalidURL, MissingSchema) as err:
+            raise YandexAPIError(
+                f"{err}. Please check 'YC_DATAPROC_BASE_URL' and 'YC_DATAPROC_CLUSTER_ID' environment variables"
+            )
 
-                return True
+        except (HTTPError, ConnectionError, Timeout) as err:
+            raise RetryableRequestError(msg=str(err), warning=f"{err}. Retrying...")
 
-            else:
-                if _TRY == self._MAX_RETRIES:
-                    raise YandexAPIError("Unable send request to Yandex Cloud API")
+        if response.status_code != 200:
+            raise RetryableRequestError(
+                msg="Unable to get 'status' from API response",
+                warning="Ops, seems like something went wrong. Retrying...",
+            )
 
-                self.logger.warning("Ops, seems like something went wrong. Retrying...")
-                time.sleep(self._DELAY)
+        self.logger.debug("Response recieved")
 
-                continue
+        try:
+            self.logger.debug("Decoding response")
+            response = response.json()
+            self.logger.debug(f"{response=}")
 
-    def check_status(self, target_status: Literal["running", "stopped"]) -> bool:  # type: ignore
-        """Sends request to check current Cluster status.
+        except JSONDecodeError as err:
+            raise RetryableRequestError(msg=str(err), warning=f"{err}. Retrying...")
 
-        Waits until Cluster status will be equal to `target_status`.
+        try:
+            # fmt: off
+            status_key = next(_ for _ in response.keys() if re.search("status", _, re.IGNORECASE))
 
-        ## Parameters
-        `target_status` : The target Cluster status
+            # fmt: on
+        except StopIteration:
+            raise RetryableRequestError(
+                msg="Unable to get 'status' from API response",
+                warning="No 'status' in API response. Retrying...",
+            )
 
-        ## Raises
-        `YandexAPIError` : If unable to get response or error occured while requesting API
-        """
-        self.logger.info(
-            f"Checking current Cluster status. Target status: '{target_status.upper()}'"
-        )
+        self.logger.info(f"Current cluster status: '{response[status_key]}'")
 
-        self.logger.debug(f"Max retries: {self._MAX_RETRIES}")
-        self.logger.debug(f"Delay between retries: {self._DELAY} secs")
+        return response[status_key]
+
+    def get_status(self) -> str:  # type: ignore
+        """Returns current Cluster status without waiting for any target one.
 
+        ## Returns
+        `str` : Lowercase Cluster status, e.g. 'running', 'starting' or 'stopped'
+
+        ## Raises
+        `YandexAPIError` : If `max_retries` requests in a row failed or if error occured while requesting API
+        """
         for _TRY in range(1, self._MAX_RETRIES + 1):
             try:
                 self.logger.debug(f"Requesting... Try: {_TRY}")
-                response = requests.get(
-                    url=f"{self._BASE_URL}/{self._CLUSTER_ID}",
-                    headers={"Authorization": f"Bearer {self._IAM_TOKEN}"},
-                    timeout=self._SESSION_TIMEOUT,
-                )
-                response.raise_for_status()
 
-            except (InvalidSchema, InvalidURL, MissingSchema) as err:
-                raise YandexAPIError(
-                    f"{err}. Please check 'YC_DATAPROC_BASE_URL' and 'YC_DATAPROC_CLUSTER_ID' environment variables"
-                )
+                return self._request_status().strip().lower()
 
-            except (HTTPError, ConnectionError, Timeout) as err:
+            except RetryableRequestError as err:
                 if _TRY == self._MAX_RETRIES:
                     raise YandexAPIError(str(err))
-                else:
-                    self.logger.warning(f"{err}. Retrying...")
-                    time.sleep(self._DELAY)
 
-                    continue
+                self.logger.warning(err.warning)
+                time.sleep(self._DELAY)
 
-            if response.status_code == 200:
-                self.logger.debug("Response recieved")
+    def _is_target_status(self, status: str, target_status: str) -> bool:
+        """Checks if received `status` is the target one. If so, records transition duration"""
+        if status.strip().lower() != target_status:
+            self.logger.info("Not target yet. Retrying...")
 
-                try:
-                    self.logger.debug("Decoding response")
-                    response = response.json()
-                    self.logger.debug(f"{response=}")
+            return False
 
-                except JSONDecodeError as err:
-                    if _TRY == self._MAX_RETRIES:
-                        raise YandexAPIError(str(err))
-                    else:
-                        self.logger.warning(f"{err}. Retrying...")
-                        time.sleep(self._DELAY)
+        self.logger.info("The target status has been reached!")
 
-                        continue
-                try:
-                    # fmt: off
-                    status_key = next(_ for _ in response.keys() if re.search("status", _, re.IGNORECASE))
+        duration = self._history.record(target_status=target_status)
+        if duration is not None:
+            self.logger.debug(f"Transition took {duration} secs")
 
-                    # fmt: on
-                    if status_key in response.keys():
-                        self.logger.info(
-                            f"Current cluster status: '{response[status_key]}'"
-                        )
-                        if response[status_key].strip().lower() == target_status:
-                            self.logger.info("The target status has been reached!")
+        return True
+
+    def _get_poller(self, target_status: str, deadline: int | None) -> StatusPoller:
+        """Creates `StatusPoller` for waiting `target_status` with learned expected transition time"""
+        started_at = self._history.get_started_at(target_status=target_status)
+        deadline = deadline if deadline is not None else self._POLLING["deadline"]
 
-                            return True
+        if started_at is not None and time.time() - started_at > deadline:
+            self.logger.debug("Transition start mark is outdated. Ignoring")
+            started_at = None
 
-                        else:
-                            if _TRY == self._MAX_RETRIES:
-                                raise YandexAPIError(
-                                    "No more retries left to check Cluster status!\n"
-                                    f"Last received status was: '{response[status_key]}'"
-                                )
-                            else:
-                                self.logger.info("Not target yet. Retrying...")
-                                time.sleep(self._DELAY)
+        expected_duration = (
+            self._history.get_expected_duration(target_status=target_status)
+            if started_at is not None
+            else None
+        )
 
-                                continue
+        self.logger.debug(f"Deadline: {deadline} secs")
+        self.logger.debug(f"Expected transition time: {expected_duration} secs")
+
+        return StatusPoller(
+            policy=BackoffPolicy(
+                initial_delay=min(self._POLLING["initial_delay"], self._DELAY),
+                max_delay=self._DELAY,
+                multiplier=self._POLLING["multiplier"],
+                jitter=self._POLLING["jitter"],
+            ),
+            deadline=deadline,
+            expected_duration=expected_duration,
+            expected_window=self._POLLING["expected_window"],
+            started_at=started_at,
+        )
 
-                except StopIteration:
-                    if _TRY == self._MAX_RETRIES:
-                        raise YandexAPIError("Unable to get 'status' from API response")
-                    else:
-                        self.logger.warning("No 'status' in API response. Retrying...")
-                        time.sleep(self._DELAY)
+    def _get_next_delay(
+        self, poller: StatusPoller, last_status: Union[str, None]
+    ) -> float:
+        """Returns delay in secs before next status request.
 
-                        continue
+        ## Raises
+        `YandexAPIError` : If deadline exceeded
+        """
+        if poller.is_expired:
+            raise YandexAPIError(
+                "Deadline exceeded while waiting for Cluster status!\n"
+                f"Last received status was: '{last_status}'"
+            )
+
+        delay = poller.get_next_delay()
+        self.logger.debug(f"Next request in {delay:.1f} secs")
+
+        return delay
+
+    def check_status(self, target_status: Literal["running", "stopped"], deadline: int | None = None) -> bool:  # type: ignore
+        """Sends requests to check current Cluster status.
+
+        Waits until Cluster status will be equal to `target_status` or deadline exceeded.
+
+        ## Parameters
+        `target_status` : The target Cluster status\n
+        `deadline` : Total time in secs to wait for target status, by default `cluster.polling.deadline` from config
+
+        ## Raises
+        `YandexAPIError` : If deadline exceeded, if `max_retries` requests in a row failed or if error occured while requesting API
+        """
+        self.logger.info(
+            f"Checking current Cluster status. Target status: '{target_status.upper()}'"
+        )
+
+        self.logger.debug(f"Max failed requests in a row: {self._MAX_RETRIES}")
+
+        poller = self._get_poller(target_status=target_status, deadline=deadline)
+
+        _FAILED = 0
+        last_status = None
+
+        while True:
+            try:
+                self.logger.debug(
+                    f"Requesting... Elapsed: {poller.elapsed:.0f} secs, failed in a row: {_FAILED}"
+                )
+                last_status = self._request_status()
+
+            except RetryableRequestError as err:
+                _FAILED += 1
+                if _FAILED >= self._MAX_RETRIES:
+                    raise YandexAPIError(str(err))
+
+                self.logger.warning(err.warning)
 
             else:
-                if _TRY == self._MAX_RETRIES:
-                    raise YandexAPIError("Unable to get 'status' from API response")
-                else:
-                    self.logger.warning(
-                        "Ops, seems like something went wrong. Retrying..."
-                    )
-                    time.sleep(self._DELAY)
+                _FAILED = 0
+                if self._is_target_status(
+                    status=last_status, target_status=target_status
+                ):
+                    return True
 
-                    continue
+            time.sleep(self._get_next_delay(poller=poller, last_status=last_status))
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ClusterHandle:
+    """Serializable reference to DataProc Cluster.
+
+    Cheap to create and safe to pass between Airflow tasks with `dataclasses.asdict`. Real client is built from it with `DataProcCluster(cluster_id=handle.id)` only when needed.
+
+    ## Parameters
+    `id` : DataProc Cluster ID. If None, taken from `YC_DATAPROC_CLUSTER_ID` environ variable
+    """
+
+    id: str | None = None
@@ -6,3 +6,15 @@ class YandexAPIError(Exception):
         `msg` : Error message
         """
         super().__init__(msg)
+
+
+class RetryableRequestError(YandexAPIError):
+    def __init__(self, msg: str, warning: str) -> None:
+        """Request to Yandex Cloud API failed, but can be retried
+
+        ## Parameters
+        `msg` : Error message if no more retries left\n
+        `warning` : Message to log before retrying
+        """
+        super().__init__(msg)
+        self.warning = warning
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Union
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.store import JSONStateStore
+
+
+@dataclass(frozen=True)
+class IAMToken:
+    """Yandex Cloud IAM token with its expiration time in UTC"""
+
+    value: str
+    expires_at: datetime
+
+    def expires_within(self, secs: float) -> bool:
+        return datetime.now(timezone.utc) + timedelta(seconds=secs) >= self.expires_at
+
+    @classmethod
+    def parse_expires_at(cls, value: Union[str, None], default_ttl: int) -> datetime:
+        """Parses `expiresAt` field of Yandex Cloud API response.
+
+        ## Notes
+        API returns time with nanoseconds, e.g. `2023-05-26T22:51:21.123456789Z`, so fractional part is dropped.
+
+        If value is missing or can't be parsed `default_ttl` secs from now is returned.
+        """
+        if value:
+            match = re.match(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})", value)
+            if match:
+                return datetime.strptime(match.group(1), r"%Y-%m-%dT%H:%M:%S").replace(
+                    tzinfo=timezone.utc
+                )
+
+        return datetime.now(timezone.utc) + timedelta(seconds=default_ttl)
+
+
+class IAMTokenProvider:
+    """Provides Yandex Cloud IAM token cached on disk.
+
+    ## Notes
+    Token is shared by all processes on the host through `JSONStateStore`, so Airflow workers request IAM endpoint only when cached token is about to expire.
+
+    Token is refreshed proactively when less than `refresh_margin` secs left before its expiration.
+
+    ## Examples
+    >>> provider = IAMTokenProvider(store=store, fetch=cluster._request_iam_token)
+
+    Get valid token:
+    >>> provider.get_token()
+    't1.9euelZqSmJ...'
+
+    If API rejected token with 401 code:
+    >>> provider.refresh(rejected='t1.9euelZqSmJ...')
+    't1.9euelZrHjp...'
+    """
+
+    __slots__ = ("_store", "_fetch", "_refresh_margin", "_token")
+
+    def __init__(
+        self,
+        store: JSONStateStore,
+        fetch: Callable[[], IAMToken],
+        refresh_margin: int = 60 * 10,
+    ) -> None:
+        """
+
+        ## Parameters
+        `store` : Store to cache token in\n
+        `fetch` : Function which requests new token from API\n
+        `refresh_margin` : Secs before expiration when token will be refreshed, by default 600
+        """
+        self._store = store
+        self._fetch = fetch
+        self._refresh_margin = refresh_margin
+        self._token: Union[IAMToken, None] = None
+
+    def _is_valid(self, token: Union[IAMToken, None]) -> bool:
+        return token is not None and not token.expires_within(self._refresh_margin)
+
+    def _read(self) -> Union[IAMToken, None]:
+        state = self._store.read()
+
+        try:
+            return IAMToken(
+                value=state["iamToken"],
+                expires_at=datetime.fromisoformat(state["expiresAt"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _write(self, token: IAMToken) -> None:
+        self._store.write(
+            {"iamToken": token.value, "expiresAt": token.expires_at.isoformat()}
+        )
+
+    def get_token(self) -> str:
+        """Returns valid token. Takes it from memory, from cache file or requests new one"""
+        if self._is_valid(self._token):
+            return self._token.value  # type: ignore
+
+        with self._store.lock():
+            token = self._read()
+
+            if not self._is_valid(token):
+                token = self._fetch()
+                self._write(token)
+
+        self._token = token
+
+        return token.value  # type: ignore
+
+    def refresh(self, rejected: Union[str, None] = None) -> str:
+        """Requests new token and caches it.
+
+        ## Parameters
+        `rejected` : Token rejected by API. If cached token differs from it, it was already refreshed by another process and will be returned without requesting API, by default None
+
+        ## Returns
+        `str` : New token
+        """
+        with self._store.lock():
+            token = self._read()
+
+            if rejected is None or not self._is_valid(token) or token.value == rejected:  # type: ignore
+                token = self._fetch()
+                self._write(token)
+
+        self._token = token
+
+        return token.value  # type: ignore
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Union
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.store import JSONStateStore
+
+
+@dataclass(frozen=True)
+class BackoffPolicy:
+    """Exponential backoff with jitter.
+
+    ## Parameters
+    `initial_delay` : Delay before second request in secs\n
+    `max_delay` : Upper bound of delay in secs\n
+    `multiplier` : Factor of delay growth between requests\n
+    `jitter` : Fraction of delay randomly added or subtracted
+
+    ## Examples
+    >>> policy = BackoffPolicy(initial_delay=5, max_delay=60, multiplier=2, jitter=0)
+    >>> [policy.get_delay(attempt=i) for i in range(1, 6)]
+    [5.0, 10.0, 20.0, 40.0, 60.0]
+    """
+
+    initial_delay: float
+    max_delay: float
+    multiplier: float = 2.0
+    jitter: float = 0.2
+
+    def apply_jitter(self, delay: float) -> float:
+        delay = delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+        return max(0.0, min(delay, self.max_delay))
+
+    def get_delay(self, attempt: int) -> float:
+        delay = self.initial_delay * self.multiplier ** max(attempt - 1, 0)
+
+        return self.apply_jitter(min(float(delay), self.max_delay))
+
+
+class TransitionHistory:
+    """Keeps durations of past Cluster status transitions.
+
+    ## Notes
+    Time of sending Cluster command is saved by `mark_started` and the transition duration is recorded when target status reached. Both happen in different Airflow tasks, that's why history is kept in `JSONStateStore`.
+
+    ## Examples
+    >>> history = TransitionHistory(store=JSONStateStore(path=".cache/cluster-transitions.json"))
+    >>> history.mark_started(target_status="running")
+    >>> history.record(target_status="running")
+    >>> history.get_expected_duration(target_status="running")
+    491.7
+    """
+
+    __slots__ = ("_store", "_size", "_namespace")
+
+    def __init__(
+        self, store: JSONStateStore, size: int = 20, namespace: str | None = None
+    ) -> None:
+        """
+
+        ## Parameters
+        `store` : Store to keep history in\n
+        `size` : Number of last transitions to keep for each status, by default 20\n
+        `namespace` : Prefix of history keys, e.g. Cluster ID to keep separate history for each Cluster in one store, by default None
+        """
+        self._store = store
+        self._size = size
+        self._namespace = namespace
+
+    def _get_key(self, target_status: str) -> str:
+        return (
+            f"{self._namespace}/{target_status}" if self._namespace else target_status
+        )
+
+    def mark_started(self, target_status: str) -> None:
+        """Saves time when transition to `target_status` was requested"""
+        with self._store.transaction() as state:
+            state.setdefault(self._get_key(target_status), {})[
+                "started_at"
+            ] = time.time()
+
+    def get_started_at(self, target_status: str) -> Union[float, None]:
+        return (
+            self._store.read().get(self._get_key(target_status), {}).get("started_at")
+        )
+
+    def record(self, target_status: str) -> Union[float, None]:
+        """Records duration of finished transition to `target_status`.
+
+        ## Returns
+        `Union[float, None]` : Recorded duration in secs or None if transition start is unknown
+        """
+        with self._store.transaction() as state:
+            transition = state.setdefault(self._get_key(target_status), {})
+            started_at = transition.pop("started_at", None)
+
+            if started_at is None:
+                return None
+
+            duration = round(time.time() - started_at, 1)
+
+            durations = transition.setdefault("durations", [])
+            durations.append(duration)
+            del durations[: -self._size]
+
+        return duration
+
+    def get_expected_duration(self, target_status: str) -> Union[float, None]:
+        """Median duration of past transitions to `target_status` or None if no history yet"""
+        durations = (
+            self._store.read().get(self._get_key(target_status), {}).get("durations")
+        )
+
+        return statistics.median(durations) if durations else None
+
+
+class StatusPoller:
+    """Computes delays between requests while waiting for Cluster status.
+
+    ## Notes
+    Polls often right after the start, then backs off exponentially with jitter.
+
+    If expected transition duration is known polling is sparse until the transition is about to happen and tight inside `expected_window` around expected time. If transition is late, backs off again starting from initial delay.
+
+    Never sleeps past the deadline.
+
+    ## Examples
+    >>> poller = StatusPoller(policy=policy, deadline=1800, expected_duration=480)
+    >>> while not poller.is_expired:
+    ...     time.sleep(poller.get_next_delay())
+    """
+
+    __slots__ = (
+        "_policy",
+        "_deadline_at",
+        "_expected_duration",
+        "_expected_window",
+        "_started_at",
+        "_attempt",
+    )
+
+    def __init__(
+        self,
+        policy: BackoffPolicy,
+        deadline: float,
+        expected_duration: float | None = None,
+        expected_window: float = 60,
+        started_at: float | None = None,
+    ) -> None:
+        """
+
+        ## Parameters
+        `policy` : Backoff policy\n
+        `deadline` : Total time in secs to wait from now\n
+        `expected_duration` : Expected duration of transition in secs, by default None\n
+        `expected_window` : Secs around expected time with tight polling, by default 60\n
+        `started_at` : Unix time when transition was requested, by default now
+        """
+        now = time.time()
+
+        self._policy = policy
+        self._deadline_at = now + deadline
+        self._expected_duration = expected_duration
+        self._expected_window = expected_window
+        self._started_at = started_at if started_at is not None else now
+        self._attempt = 0
+
+    @property
+    def elapsed(self) -> float:
+        """Secs since transition was requested"""
+        return time.time() - self._started_at
+
+    @property
+    def remaining(self) -> float:
+        """Secs left before deadline"""
+        return max(0.0, self._deadline_at - time.time())
+
+    @property
+    def is_expired(self) -> bool:
+        return self.remaining <= 0
+
+    def get_next_delay(self) -> float:
+        """Returns delay in secs before next request"""
+        elapsed = self.elapsed
+
+        if (
+            self._expected_duration is not None
+            and elapsed < self._expected_duration + self._expected_window
+        ):
+            self._attempt = 0
+            until_window = self._expected_duration - self._expected_window - elapsed
+
+            if until_window > 0:
+                delay = min(until_window, self._policy.max_delay)
+            else:
+                delay = self._policy.apply_jitter(self._policy.initial_delay)
+        else:
+            self._attempt += 1
+            delay = self._policy.get_delay(attempt=self._attempt)
+
+        return min(delay, self.remaining)
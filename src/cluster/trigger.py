@@ -0,0 +1,123 @@
+#
+# Airflow deferrable primitives for waiting Cluster status.
+# This module imports Airflow, so it's not exported from ``src.cluster``
+# and should be imported only inside Airflow environment.
+#
+from __future__ import annotations
+
+import sys
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from airflow.exceptions import AirflowException  # type: ignore
+from airflow.models.baseoperator import BaseOperator  # type: ignore
+from airflow.triggers.base import BaseTrigger, TriggerEvent  # type: ignore
+
+if TYPE_CHECKING:
+    from typing import Any, AsyncIterator, Dict, Literal, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.cluster.exceptions import YandexAPIError
+
+
+class ClusterStatusTrigger(BaseTrigger):
+    """Fires when Cluster reaches `target_status` or waiting failed.
+
+    ## Notes
+    Runs inside Airflow triggerer with `AsyncDataProcCluster`, so all waiting Clusters share one event loop and hold no worker slots.
+
+    Fired event payload is `{"status": "success" | "error", "message": str}`.
+    """
+
+    def __init__(
+        self,
+        target_status: Literal["running", "stopped"],
+        deadline: int | None = None,
+    ) -> None:
+        """
+
+        ## Parameters
+        `target_status` : The target Cluster status\n
+        `deadline` : Total time in secs to wait for target status, by default `cluster.polling.deadline` from config
+        """
+        super().__init__()
+
+        self.target_status = target_status
+        self.deadline = deadline
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return (
+            f"{__name__}.{self.__class__.__name__}",
+            dict(target_status=self.target_status, deadline=self.deadline),
+        )
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:  # type: ignore
+        import asyncio
+
+        from src.cluster import AsyncDataProcCluster
+
+        try:
+            loop = asyncio.get_running_loop()
+            cluster = await loop.run_in_executor(None, AsyncDataProcCluster)
+
+            await cluster.check_status(
+                target_status=self.target_status, deadline=self.deadline
+            )
+
+            yield TriggerEvent(
+                dict(
+                    status="success",
+                    message=f"Cluster status is '{self.target_status.upper()}'",
+                )
+            )
+
+        except YandexAPIError as err:
+            yield TriggerEvent(dict(status="error", message=str(err)))
+
+
+class ClusterStatusSensor(BaseOperator):
+    """Deferrable operator which waits until Cluster reaches `target_status`.
+
+    ## Examples
+    >>> wait_until_cluster_running = ClusterStatusSensor(
+    ...     task_id="wait_until_cluster_running", target_status="running"
+    ... )
+    """
+
+    def __init__(
+        self,
+        *,
+        target_status: Literal["running", "stopped"],
+        deadline: int | None = None,
+        **kwargs,
+    ) -> None:
+        """
+
+        ## Parameters
+        `target_status` : The target Cluster status\n
+        `deadline` : Total time in secs to wait for target status, by default `cluster.polling.deadline` from config
+        """
+        super().__init__(**kwargs)
+
+        self.target_status = target_status
+        self.deadline = deadline
+
+    def execute(self, context: Dict[str, Any]) -> None:
+        self.defer(
+            trigger=ClusterStatusTrigger(
+                target_status=self.target_status, deadline=self.deadline
+            ),
+            method_name="execute_complete",
+            timeout=timedelta(seconds=self.deadline) if self.deadline else None,
+        )
+
+    def execute_complete(
+        self, context: Dict[str, Any], event: Dict[str, str] | None = None
+    ) -> None:
+        if not event or event.get("status") != "success":
+            raise AirflowException(
+                event.get("message") if event else "No event received from trigger"
+            )
+
+        self.log.info(event["message"])
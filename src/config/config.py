@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import re
 import sys
+import threading
 from datetime import date
-from os import walk
+from os import stat, walk
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -11,11 +12,16 @@ import yaml
 
 if TYPE_CHECKING:
     from os import PathLike
-    from typing import Dict
+    from typing import Any, Dict, Tuple
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.config.exceptions import UnableToGetConfig
 
+# Shared by all `Config` instances of the process
+_LOCK = threading.Lock()
+_PARSED: Dict[str, Tuple[int, Dict[str, Any]]] = {}  # path -> (mtime, content)
+_FOUND: Dict[Tuple[str, str], Path] = {}  # (search dir, file name) -> path
+
 
 class Config:
     """Parses project's configuration file.
@@ -23,6 +29,8 @@ class Config:
     ## Notes
     Confinguration file should be located in one of the project's dirs.
 
+    Parsed files are cached per process and keyed by path and modification time, so creating many instances reads the file only once. Modified file is re-read by new instances, existing ones keep their content until `reload`. Sections returned by properties are shared between instances and must not be modified.
+
     ## Examples
     Initialize Class instance:
     >>> config = Config()
@@ -43,6 +51,9 @@ class Config:
     >>> a, b, c, d = config.get_users_info_datamart_config.values()
     >>> print(a)
     2022-03-12
+
+    Read file again after it was changed:
+    >>> config.reload()
     """
 
     __slots__ = ("_CONFIG_NAME", "_CONFIG_PATH", "_config", "_environ")
@@ -77,13 +88,46 @@ class Config:
                 "One of the arguments required. Please specify 'config_name' or 'config_path'"
             )
 
+        self._config = self._load()
+        self._environ = self._config["environ"]["type"]
+
+    def _load(self, force: bool = False) -> Dict[str, Any]:
+        """Returns parsed config file from cache. Reads file if it's not cached yet, was modified or `force` is True"""
         try:
-            with open(self._CONFIG_PATH) as f:
-                self._config = yaml.safe_load(f)
-                self._environ = self._config["environ"]["type"]
+            path = str(Path(self._CONFIG_PATH).resolve())
+            mtime = stat(path).st_mtime_ns
+
+            with _LOCK:
+                cached = _PARSED.get(path)
+
+                if force or cached is None or cached[0] != mtime:
+                    with open(path) as f:
+                        cached = _PARSED[path] = (mtime, yaml.safe_load(f))
+
         except FileNotFoundError as err:
             raise UnableToGetConfig(str(err))
 
+        return cached[1]
+
+    def reload(self) -> None:
+        """Reads config file again and updates cache shared by all instances.
+
+        ## Notes
+        Value of `environ` set on the instance is reset to the one from file.
+
+        ## Raises
+        `UnableToGetConfig` : If unable to find or read config file
+        """
+        self._config = self._load(force=True)
+        self._environ = self._config["environ"]["type"]
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drops all parsed and found config files cached by the process"""
+        with _LOCK:
+            _PARSED.clear()
+            _FOUND.clear()
+
     def _validate_config_name(self, name: str) -> bool:
         if not isinstance(name, str):
             raise TypeError("config name must be string type")
@@ -95,10 +139,16 @@ class Config:
         return True
 
     def _find_config(self) -> Path:
+        key = (str(Path.cwd()), self._CONFIG_NAME)
+
+        if key in _FOUND and _FOUND[key].is_file():
+            return _FOUND[key]
+
         for dirpath, _, filenames in walk(Path.cwd()):
             for filename in filenames:
                 if filename == self._CONFIG_NAME:
-                    return Path(dirpath, filename)
+                    _FOUND[key] = Path(dirpath, filename)
+                    return _FOUND[key]
 
         raise UnableToGetConfig(
             "Unable to find config file in project!\n"
@@ -126,6 +176,94 @@ class Config:
     ) -> Dict[str, Dict[str, str | int | date]]:
         return self._config["spark"]["jobs"]
 
+    @property
+    def get_cluster_config(self) -> Dict[str, Any]:
+        return self._config["cluster"]
+
+    @property
+    def get_reader_config(self) -> Dict[str, Any]:
+        return self._config["reader"]
+
+    @property
+    def get_sizing_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["sizing"]
+
+    @property
+    def get_backfill_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["backfill"]
+
+    @property
+    def get_checkpoints_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["checkpoints"]
+
+    @property
+    def get_outputs_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["outputs"]
+
+    @property
+    def get_dictionaries_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["dictionaries"]
+
+    @property
+    def get_bloom_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["bloom"]
+
+    @property
+    def get_graph_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["graph"]
+
+    @property
+    def get_skew_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["skew"]
+
+    @property
+    def get_timeline_config(self) -> Dict[str, Any]:
+        return self._config["spark"]["timeline"]
+
+    def get_tuning_profile(self, name: str) -> Dict[str, str]:
+        """Returns Spark properties of tuning profile from `spark.tuning_profiles` section.
+
+        Profile may extend another one with `extends` key, its own properties take precedence.
+
+        ## Parameters
+        `name` : Name of profile
+
+        ## Returns
+        `Dict[str, str]` : Spark properties with values as strings
+
+        ## Raises
+        `UnableToGetConfig` : If profile not found or profiles extend each other in a loop
+
+        ## Examples
+        >>> config.get_tuning_profile(name="geo-heavy")["spark.sql.adaptive.enabled"]
+        'true'
+        """
+        profiles = self._config["spark"]["tuning_profiles"]
+        chain = []
+
+        while name is not None:
+            if name not in profiles:
+                raise UnableToGetConfig(f"Tuning profile '{name}' not found in config")
+            if name in chain:
+                raise UnableToGetConfig(
+                    f"Tuning profiles extend each other in a loop: {chain + [name]}"
+                )
+
+            chain.append(name)
+            name = profiles[name].get("extends")
+
+        properties = {}
+
+        for name in reversed(chain):
+            for key, value in profiles[name].items():
+                if key == "extends":
+                    continue
+                properties[key] = (
+                    str(value).lower() if isinstance(value, bool) else str(value)
+                )
+
+        return properties
+
     @property
     def get_logging_level(self) -> Dict[str, str]:
         return {k: v.upper() for k, v in self._config["logging"]["level"].items()}
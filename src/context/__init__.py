@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from src.context.context import ProjectContext, get_context
+
+__all__ = ["ProjectContext", "get_context"]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from dotenv import find_dotenv, load_dotenv
+
+if TYPE_CHECKING:
+    from logging import Logger
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.config import Config
+from src.logger import SparkLogger
+
+
+@dataclass(frozen=True)
+class ProjectContext:
+    """Process-wide project context: loaded environ and parsed config.
+
+    ## Notes
+    Use `get_context` to get the instance instead of creating it directly.
+    """
+
+    project_path: Path
+    config: Config
+
+    def get_logger(self, name: str) -> Logger:
+        """Returns logger suitable for current environment.
+
+        ## Parameters
+        `name` : Name of the logger
+        """
+        if self.config.environ == "airflow":
+            return getLogger("aiflow.task")
+
+        return SparkLogger(level=self.config.get_logging_level["python"]).get_logger(
+            name=name
+        )
+
+
+@lru_cache(maxsize=None)
+def get_context() -> ProjectContext:
+    """Builds project context once per process.
+
+    ## Notes
+    Loads `.env` file and overrides environment variables with its values. If there is no `.env` file, variables set globally are used, e.g. inside Docker container.
+
+    Call `get_context.cache_clear()` to build context again on the next call.
+
+    ## Returns
+    `ProjectContext` : Shared project context
+
+    ## Raises
+    `DotEnvError` : If no `.env` file found and `PROJECT_PATH` not set globally\n
+    `UnableToGetConfig` : If unable to find or read config file
+
+    ## Examples
+    >>> context = get_context()
+    >>> context.config.get_spark_app_name
+    'DATAMART-COLLECTOR-APP'
+    >>> logger = context.get_logger(name=__name__)
+    """
+    dotenv_path = find_dotenv(filename=".env")
+
+    if dotenv_path:
+        load_dotenv(dotenv_path=dotenv_path, override=True)
+    elif "PROJECT_PATH" not in os.environ:
+        # imported here because `src.environ` itself depends on context
+        from src.environ.exceptions import DotEnvError
+
+        raise DotEnvError(
+            ".env file not found and 'PROJECT_PATH' not set globally. Environ not loaded"
+        )
+
+    project_path = Path(os.environ["PROJECT_PATH"])
+
+    return ProjectContext(
+        project_path=project_path,
+        config=Config(config_path=Path(project_path, "config/config.yaml")),
+    )
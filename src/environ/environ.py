@@ -4,15 +4,22 @@ import os
 import sys
 from logging import getLogger
 from pathlib import Path
-from typing import Tuple, overload
+from typing import TYPE_CHECKING, Tuple, overload
+
+if TYPE_CHECKING:
+    from typing import Dict
 
 from dotenv import find_dotenv, load_dotenv
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.config import Config
+from src.context import get_context
 from src.environ.exceptions import DotEnvError, EnvironNotSet
 from src.logger import SparkLogger
 
+# .env files loaded by the process: path -> mtime
+_LOADED: Dict[str, int] = {}
+
 
 class EnvironManager:
     """Project's environment manager.
@@ -47,11 +54,7 @@ class EnvironManager:
         self._find_dotenv = find_dotenv
         self._read_dotenv = load_dotenv
 
-        load_dotenv()  # Because of supervisor errors
-
-        self.config = Config(
-            config_path=Path(os.getenv("PROJECT_PATH"), "config/config.yaml")  # type: ignore
-        )
+        self.config: Config = get_context().config
 
         self.logger = (
             getLogger("aiflow.task")
@@ -61,16 +64,21 @@ class EnvironManager:
             )
         )
 
-    def load_environ(self, dotenv_file_name: str | None = None) -> bool:
+    def load_environ(
+        self, dotenv_file_name: str | None = None, force: bool = False
+    ) -> bool:
         """Find .env file and load environment variables from it.
 
         ## Notes
         Overrides system environment variables with same names.
 
+        File is read once per process. It's read again only if it was modified since or `force` is True.
+
         `.env` file should located in root project directory. You can find example with all variables required for the project here -> `$PROJECT_DIR/templates/.env.template`
 
         ## Parameters
-        `dotenv_file_name` : Path to `.env` file, by default ".env"
+        `dotenv_file_name` : Path to `.env` file, by default ".env"\n
+        `force` : Read file even if it was already loaded, by default False
 
         ## Raises
         `DotEnvError` : Raise if enable to find or load file
@@ -93,10 +101,23 @@ class EnvironManager:
         except IOError:
             raise DotEnvError(".env file not found. Environ not loaded")
 
+        try:
+            mtime = os.stat(_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        if not force and mtime is not None and _LOADED.get(_PATH) == mtime:
+            self.logger.debug("File already loaded")
+            return True
+
         self.logger.debug("Reading .env file")
         try:
             self._read_dotenv(dotenv_path=_PATH, verbose=True, override=True)
             self.logger.debug("Environ loaded")
+
+            if mtime is not None:
+                _LOADED[_PATH] = mtime
+
             return True
 
         except IOError:
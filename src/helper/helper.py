@@ -1,18 +1,16 @@
 from __future__ import annotations
 
+import hashlib
 import sys
 from datetime import datetime, timedelta
 from os import getenv
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from boto3 import client
-from botocore.exceptions import ClientError
-
 if TYPE_CHECKING:
     from datetime import date
     from logging import Logger
-    from typing import Generator, Literal, Tuple
+    from typing import Any, Dict, Generator, List, Literal, Tuple
 
     from botocore.client import S3  # type: ignore
 
@@ -22,18 +20,23 @@ if TYPE_CHECKING:
 # package
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.config import Config
+from src.context import get_context
 from src.environ import EnvironManager
 from src.helper.exceptions import S3ServiceError
 from src.logger import SparkLogger
 
 
 class SparkHelper:
-    """Helper class for Apache Spark runtime"""
+    """Helper class for Apache Spark runtime
+
+    ## Notes
+    boto3 connection instance is created on first access to `s3`, so initialization of the Class instance does no network calls.
+    """
 
     __slots__ = (
         "config",
         "logger",
-        "s3",
+        "_s3",
         "AWS_ENDPOINT_URL",
         "AWS_ACCESS_KEY_ID",
         "AWS_SECRET_ACCESS_KEY",
@@ -41,7 +44,6 @@ class SparkHelper:
 
     def __init__(self) -> None:
         environ: EnvironManager = EnvironManager()
-        environ.load_environ()
 
         _REQUIRED_VARS = (
             "AWS_ENDPOINT_URL",
@@ -57,18 +59,25 @@ class SparkHelper:
             self.AWS_SECRET_ACCESS_KEY,
         ) = map(getenv, _REQUIRED_VARS[:3])
 
-        self.config: Config = Config(
-            config_path=Path(getenv("PROJECT_PATH"), "config/config.yaml")  # type: ignore
-        )
+        self.config: Config = get_context().config
 
         self.logger: Logger = SparkLogger(
             level=self.config.get_logging_level["python"]
         ).get_logger(name=f"{__name__}.{__class__.__name__}")
 
-        self.s3 = self._get_s3_instance()
+        self._s3 = None
+
+    @property
+    def s3(self) -> S3:
+        "boto3 connection instance for communication with s3 service"
+        if self._s3 is None:
+            self._s3 = self._get_s3_instance()
+
+        return self._s3
 
     def _get_s3_instance(self) -> S3:
         "Gets ready-to-use boto3 connection instance for communication with s3 service"
+        from boto3 import client
 
         self.logger.debug("Getting boto3 instance")
 
@@ -127,6 +136,8 @@ class SparkHelper:
         >>> print(result)
         False
         """
+        from botocore.exceptions import ClientError
+
         if type not in ("object", "bucket"):
             raise KeyError("Only 'object' or 'bucket' are allowed as 'type'")
 
@@ -229,3 +240,240 @@ class SparkHelper:
         self.logger.debug(f"Done. {len(existing_paths)} paths collected")
 
         return tuple(existing_paths)
+
+    def _list_s3_objects(self, key: str) -> List[Dict[str, Any]]:
+        """Lists all objects under given S3 key.
+
+        ## Parameters
+        `key` : Full path to list, for example: `s3a://data-ice-lake-05/messager-data/...`
+
+        ## Returns
+        `List[Dict[str, Any]]` : Objects as returned by `list_objects_v2`, each with `Key`, `Size`, `ETag` and `LastModified`
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        from botocore.exceptions import ClientError
+
+        self.logger.debug(f"Listing '{key}' objects")
+
+        objects = []
+
+        try:
+            for page in self.s3.get_paginator("list_objects_v2").paginate(
+                Bucket=key.split(sep="/")[2],
+                Prefix="/".join(key.split(sep="/")[3:]),
+            ):
+                objects.extend(page.get("Contents", []))
+
+        except ClientError as err:
+            raise S3ServiceError(str(err))
+
+        self.logger.debug(f"{len(objects)} objects listed")
+
+        return objects
+
+    def _delete_s3_objects(self, key: str) -> int:
+        """Deletes all objects under given S3 key.
+
+        ## Parameters
+        `key` : Full path to delete, for example: `s3a://data-ice-lake-05/messager-data/...`
+
+        ## Returns
+        `int` : Number of deleted objects
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        from botocore.exceptions import ClientError
+
+        objects = self._list_s3_objects(key=key)
+
+        self.logger.debug(f"Deleting {len(objects)} '{key}' objects")
+
+        try:
+            # no more than 1000 keys per request
+            for i in range(0, len(objects), 1000):
+                self.s3.delete_objects(
+                    Bucket=key.split(sep="/")[2],
+                    Delete=dict(
+                        Objects=[dict(Key=_["Key"]) for _ in objects[i : i + 1000]],
+                        Quiet=True,
+                    ),
+                )
+        except ClientError as err:
+            raise S3ServiceError(str(err))
+
+        return len(objects)
+
+    def _put_s3_object(self, key: str, body: bytes) -> ...:
+        """Writes object with given body to S3, replacing existing one.
+
+        ## Parameters
+        `key` : Full path of object, for example: `s3a://data-ice-lake-05/messager-data/.../_index.json`\n
+        `body` : Content of object
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        from botocore.exceptions import ClientError
+
+        self.logger.debug(f"Writing '{key}' object")
+
+        try:
+            self.s3.put_object(
+                Bucket=key.split(sep="/")[2],
+                Key="/".join(key.split(sep="/")[3:]),
+                Body=body,
+            )
+        except ClientError as err:
+            raise S3ServiceError(str(err))
+
+    def _get_src_size(
+        self,
+        event_types: Tuple[Literal["message", "reaction", "subscription"], ...],
+        keeper: ArgsKeeper,
+    ) -> int:
+        """Estimates size of job input data.
+
+        ## Parameters
+        `event_types` : Event types which job reads\n
+        `keeper` : `ArgsKeeper` class instance with Spark Job arguments
+
+        ## Returns
+        `int` : Total size in bytes of all existing partitions
+
+        ## Raises
+        `S3ServiceError` : If no paths for given arguments was found on S3
+
+        ## Examples
+        >>> helper._get_src_size(event_types=("message", "subscription"), keeper=keeper)
+        1073741824
+        """
+        size = sum(
+            obj["Size"]
+            for event_type in event_types
+            for path in self._get_src_paths(event_type=event_type, keeper=keeper)
+            for obj in self._list_s3_objects(key=path)
+        )
+
+        self.logger.debug(f"Input size: {size / 1024**2:.1f} MB")
+
+        return size
+
+    def get_input_fingerprint(
+        self,
+        event_types: Tuple[Literal["message", "reaction", "subscription"], ...],
+        keeper: ArgsKeeper,
+    ) -> str:
+        """Computes fingerprint of job input data.
+
+        Fingerprint is a hash of S3 listing of source partitions and cities coordinates file: key, size and ETag of each object. Any added, removed or rewritten object changes it, data itself is not read.
+
+        ## Parameters
+        `event_types` : Event types which job reads\n
+        `keeper` : `ArgsKeeper` class instance with Spark Job arguments
+
+        ## Returns
+        `str` : Hex digest of input listing
+
+        ## Raises
+        `S3ServiceError` : If no paths for given arguments was found on S3
+
+        ## Examples
+        >>> helper.get_input_fingerprint(event_types=("message",), keeper=keeper)
+        '9f2c0d...'
+        """
+        keys = [
+            path
+            for event_type in event_types
+            for path in self._get_src_paths(event_type=event_type, keeper=keeper)
+        ]
+        if keeper.coords_path:
+            keys.append(keeper.coords_path)
+
+        digest = hashlib.sha256()
+
+        for obj in sorted(
+            (obj["Key"], obj["Size"], obj.get("ETag", ""))
+            for key in keys
+            for obj in self._list_s3_objects(key=key)
+        ):
+            digest.update("\t".join(map(str, obj)).encode() + b"\n")
+
+        return digest.hexdigest()
+
+    def get_s3_etag(self, key: str) -> str:
+        """Returns combined ETag of all objects under given S3 key.
+
+        Changes if any object under the key is added, removed or rewritten.
+
+        ## Parameters
+        `key` : Full path, for example: `s3a://data-ice-lake-05/messager-data/...`
+
+        ## Returns
+        `str` : Hex digest of keys and ETags of objects
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        digest = hashlib.sha256()
+
+        for obj in sorted(
+            (obj["Key"], obj.get("ETag", "")) for obj in self._list_s3_objects(key=key)
+        ):
+            digest.update("\t".join(obj).encode() + b"\n")
+
+        return digest.hexdigest()
+
+    def _get_fingerprint_key(self, job: str, keeper: ArgsKeeper) -> str:
+        "Path of job input fingerprint. Stored next to datamarts and ignored by Spark as it starts with underscore"
+        return f"{keeper.tgt_path}/_fingerprints/{job}"
+
+    def read_fingerprint(self, job: str, keeper: ArgsKeeper) -> str | None:
+        """Reads input fingerprint saved by the last successful run of job.
+
+        ## Parameters
+        `job` : Name of job\n
+        `keeper` : `ArgsKeeper` class instance with Spark Job arguments
+
+        ## Returns
+        `str | None` : Saved fingerprint or `None` if job has never run successfully
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        from botocore.exceptions import ClientError
+
+        key = self._get_fingerprint_key(job=job, keeper=keeper)
+        self.logger.debug(f"Reading '{key}' fingerprint")
+
+        try:
+            response = self.s3.get_object(
+                Bucket=key.split(sep="/")[2],
+                Key="/".join(key.split(sep="/")[3:]),
+            )
+        except ClientError as err:
+            if err.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                self.logger.debug("No fingerprint saved")
+                return None
+
+            raise S3ServiceError(str(err))
+
+        return response["Body"].read().decode().strip()
+
+    def write_fingerprint(self, job: str, keeper: ArgsKeeper, fingerprint: str) -> ...:
+        """Saves input fingerprint of successful run of job.
+
+        ## Parameters
+        `job` : Name of job\n
+        `keeper` : `ArgsKeeper` class instance with Spark Job arguments\n
+        `fingerprint` : Fingerprint returned by `get_input_fingerprint`
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        key = self._get_fingerprint_key(job=job, keeper=keeper)
+        self.logger.debug(f"Writing '{key}' fingerprint")
+
+        self._put_s3_object(key=key, body=fingerprint.encode())
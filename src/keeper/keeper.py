@@ -15,7 +15,8 @@ class ArgsKeeper(BaseModel):
     `depth`: Datamart calculation depth in days\n
     `src_path`: Path to input data on S3\n
     `tgt_path`: S3 path where collected datamart will be saved\n
-    `processed_dttm`: Processed timestamp. Format: `%Y-%m-%dT%H:%M:%S`, defaults `None`
+    `processed_dttm`: Processed timestamp. Format: `%Y-%m-%dT%H:%M:%S`, defaults `None`\n
+    `end_date`: Last date of backfill range. If set, datamart is collected for each day from `date` to `end_date`. Format: `%Y-%m-%d`, defaults `None`
 
     ## Raises
     `ValueError` : Raises if parameter don't pass validation\n
@@ -54,9 +55,13 @@ class ArgsKeeper(BaseModel):
     tgt_path: str
     coords_path: Union[str, None] = None
     processed_dttm: Union[str, None] = None
+    end_date: Union[str, None] = None
 
     def __str__(self) -> str:
-        return f"\tDate: {self.date}\n\tDepth: {self.depth}\n\tSource path: {self.src_path}\n\tTarget path: {self.tgt_path}\n\tProcessed time: {self.processed_dttm}"
+        return (
+            f"\tDate: {self.date}\n\tDepth: {self.depth}\n\tSource path: {self.src_path}\n\tTarget path: {self.tgt_path}\n\tProcessed time: {self.processed_dttm}"
+            + (f"\n\tEnd date: {self.end_date}" if self.end_date else "")
+        )
 
     @validator("date")
     def validate_date(cls, v) -> str:
@@ -119,6 +124,19 @@ class ArgsKeeper(BaseModel):
                 raise ValueError("must be '%Y-%m-%dT%H:%M:%S' format")
         return v
 
+    @validator("end_date")
+    def validate_end_date(cls, v, values) -> str:
+        if v is not None:
+            if not isinstance(v, str):
+                raise ValueError("must string")
+            if not re.match(pattern=r"^\d{4}-\d{2}-\d{2}$", string=v):
+                raise ValueError("must be '%Y-%m-%d' format")
+            if datetime.strptime(v, r"%Y-%m-%d").date() > date.today():
+                raise ValueError("date must be earlier than today")
+            if "date" in values and v < values["date"]:
+                raise ValueError("must not be earlier than 'date'")
+        return v
+
 
 class SparkConfigKeeper(BaseModel):
     """Keeping and validating Spark configuration properties.
@@ -127,6 +145,8 @@ class SparkConfigKeeper(BaseModel):
     `executor_memory` : `spark.executor.memory` - Amount of memory to use per executor process, in the same format as JVM memory strings with a size unit suffix ("k", "m", "g" or "t") (e.g. 512m, 2g)\n
     `executor_cores` : `spark.executor.cores`\n
     `max_executors_num` : `spark.dynamicAllocation.maxExecutors`\n
+    `shuffle_partitions` : `spark.sql.shuffle.partitions`, Spark default if not set\n
+    `broadcast_threshold` : `spark.sql.autoBroadcastJoinThreshold` and the same threshold of adaptive execution in JVM memory string format, Spark default if not set\n
 
     ## Raises
     `ValueError` : Raises if parameter don't pass validation\n
@@ -139,9 +159,11 @@ class SparkConfigKeeper(BaseModel):
     executor_memory: str
     executor_cores: int
     max_executors_num: int
+    shuffle_partitions: Union[int, None] = None
+    broadcast_threshold: Union[str, None] = None
 
     def __str__(self) -> str:
-        return f"\tspark.executor.memory: {self.executor_memory}\n\tspark.executor.cores: {self.executor_cores}\n\tspark.dynamicAllocation.maxExecutors: {self.max_executors_num}"
+        return f"\tspark.executor.memory: {self.executor_memory}\n\tspark.executor.cores: {self.executor_cores}\n\tspark.dynamicAllocation.maxExecutors: {self.max_executors_num}\n\tspark.sql.shuffle.partitions: {self.shuffle_partitions}\n\tspark.sql.autoBroadcastJoinThreshold: {self.broadcast_threshold}"
 
     @validator("executor_memory")
     def validate_executor_memory(cls, v) -> str:
@@ -182,3 +204,27 @@ class SparkConfigKeeper(BaseModel):
             )
 
         return v
+
+    @validator("shuffle_partitions")
+    def validate_shuffle_partitions(cls, v) -> int:
+        if v is not None:
+            if not isinstance(v, int):
+                raise ValueError("must be integer")
+            if v < 1:
+                raise ValueError("must be positive")
+            if v > 10000:
+                raise ValueError("must be lower than 10000")
+
+        return v
+
+    @validator("broadcast_threshold")
+    def validate_broadcast_threshold(cls, v) -> str:
+        if v is not None:
+            if not isinstance(v, str):
+                raise ValueError("must be string")
+            if not re.match(pattern=r"^(\d+[kmg]|-1)$", string=v):
+                raise ValueError(
+                    'must be in JVM memory strings format with a size unit suffix ("k", "m" or "g") or -1 to disable broadcasting'
+                )
+
+        return v
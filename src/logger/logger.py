@@ -3,8 +3,6 @@ from __future__ import annotations
 import sys
 from logging import Logger, StreamHandler, getLogger
 
-from coloredlogs import ColoredFormatter, install
-
 
 class SparkLogger(Logger):
     """Python Logger instance.
@@ -35,6 +33,9 @@ class SparkLogger(Logger):
         ## Returns
         `logging.Logger` : Returns Logger class object
         """
+        # coloredlogs is imported on demand to keep import of the module cheap
+        from coloredlogs import ColoredFormatter, install
+
         logger = getLogger(name=name)
 
         install(logger=logger, level=self._level)
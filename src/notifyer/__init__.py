@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from src.notifyer.notifyer import TelegramNotifyer
+from src.notifyer.notifyer import TelegramNotifyer, notify_on_task_failure
 from src.notifyer.exceptions import AirflowContextError, UnableToSendMessage
 from src.notifyer.datamodel import AirflowTaskData, TelegramMessage, MessageType
 
 __all__ = (
     "TelegramNotifyer",
+    "notify_on_task_failure",
     "AirflowContextError",
     "UnableToSendMessage",
     "AirflowTaskData",
@@ -4,6 +4,7 @@ import os
 import sys
 import time
 from datetime import datetime
+from functools import lru_cache
 from logging import getLogger
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -73,7 +74,6 @@ class TelegramNotifyer(BaseRequestHandler):
         )
 
         environ = EnvironManager()
-        environ.load_environ()
 
         _REQUIRED_VARS = (
             "TG_CHAT_ID",
@@ -258,3 +258,24 @@ class TelegramNotifyer(BaseRequestHandler):
         output = self._send_message(url=self._make_url(message=message))
 
         return output
+
+
+@lru_cache(maxsize=1)
+def _get_notifyer() -> TelegramNotifyer:
+    return TelegramNotifyer()
+
+
+def notify_on_task_failure(airflow_context: Dict[Any, Any]) -> bool:
+    """Airflow `on_failure_callback` which creates `TelegramNotifyer` only when task failed.
+
+    Use it instead of `TelegramNotifyer().notify_on_task_failure` in DAG files, so DAG parsing does not read environ and credentials.
+
+    ## Parameters
+    `airflow_context` : Airflow task context dictionary
+
+    ## Examples
+    >>> @task(default_args={"on_failure_callback": notify_on_task_failure})
+    ... def some_task() -> None:
+    ...      ...
+    """
+    return _get_notifyer().notify_on_task_failure(airflow_context=airflow_context)
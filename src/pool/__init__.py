@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+from src.pool.datamodel import ClusterSpec, Lease
+from src.pool.exceptions import NoClusterAvailable
+from src.pool.pool import ClusterPool
+
+__all__ = ["ClusterPool", "ClusterSpec", "Lease", "NoClusterAvailable"]
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ClusterSpec:
+    """Cluster of the pool as described in `cluster.pool.clusters` section of config.
+
+    ## Parameters
+    `name` : Unique name of Cluster inside the pool\n
+    `capacity` : Max number of jobs running on Cluster at the same time\n
+    `id` : DataProc Cluster ID. If None, taken from `YC_DATAPROC_CLUSTER_ID` environ variable\n
+    `api_base_url` : Base URL of Cluster Rest API. If None, taken from `CLUSTER_API_BASE_URL` environ variable
+    """
+
+    name: str
+    capacity: int = 1
+    id: str | None = None
+    api_base_url: str | None = None
+
+
+@dataclass(frozen=True)
+class Lease:
+    """Slot taken by a job on the pool Cluster"""
+
+    id: str
+    cluster: str
+    job: str
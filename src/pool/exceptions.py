@@ -0,0 +1,8 @@
+class NoClusterAvailable(Exception):
+    def __init__(self, msg: str) -> None:
+        """Raises if no Cluster of the pool was able to take a job before deadline.
+
+        ## Parameters
+        `msg` : Error message
+        """
+        super().__init__(msg)
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import sys
+import time
+from logging import getLogger
+from os import getenv
+from pathlib import Path
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List, Tuple, Union
+
+    from src.keeper import ArgsKeeper
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.cluster import DataProcCluster, YandexAPIError
+from src.config import Config
+from src.environ import EnvironManager
+from src.logger import SparkLogger
+from src.pool.datamodel import ClusterSpec, Lease
+from src.pool.exceptions import NoClusterAvailable
+from src.store import JSONStateStore
+from src.submitter import SparkSubmitter
+
+
+class ClusterPool:
+    """Shards Spark jobs across several DataProc Clusters.
+
+    ## Notes
+    Clusters are listed in `cluster.pool.clusters` section of `config.yaml`, each with its own capacity - max number of jobs running on it at the same time.
+
+    Job is placed on the least loaded running Cluster. If every running Cluster is full, job waits in the queue. When the queue becomes deeper than `scale_up_queue_depth` or no Cluster is running at all, one of stopped Clusters is started. Clusters started by the pool are stopped with `stop_started`.
+
+    Running jobs and the queue are kept in `JSONStateStore`, so parallel Airflow tasks on the same host share them. Leases of dead tasks expire after `lease_ttl` secs.
+
+    ## Examples
+    Initialize Class instance:
+    >>> pool = ClusterPool()
+
+    Submit job on the least loaded Cluster:
+    >>> pool.submit_job(job="collect_users_demographic_dm_job", keeper=keeper)
+
+    Or manage Cluster slot manually:
+    >>> lease = pool.acquire(job="collect_users_demographic_dm_job")
+    >>> pool.get_submitter(name=lease.cluster).submit_job(job=lease.job, keeper=keeper)
+    >>> pool.release(lease=lease)
+
+    Stop Clusters started on demand:
+    >>> pool.stop_started()
+    ['extra-1']
+    """
+
+    __slots__ = ("_POOL", "_DELAY", "_specs", "_clusters", "_store", "config", "logger")
+
+    def __init__(self, *, retry_delay: int = 30) -> None:
+        """
+
+        ## Parameters
+        `retry_delay` : Delay in secs between attempts to find free Cluster, by default 30
+        """
+        env_man = EnvironManager()
+        env_man.load_environ()
+        env_man.check_environ(var="PROJECT_PATH")
+
+        self.config: Config = env_man.config
+        self.logger = (
+            getLogger("aiflow.task")
+            if self.config.environ == "airflow"
+            else SparkLogger(level=self.config.get_logging_level["python"]).get_logger(
+                name=f"{__name__}.{__class__.__name__}"
+            )
+        )
+
+        self._DELAY = retry_delay
+        self._POOL = self.config.get_cluster_config["pool"]
+        self._specs: Dict[str, ClusterSpec] = {
+            spec.name: spec
+            for spec in (ClusterSpec(**_) for _ in self._POOL["clusters"])
+        }
+        self._clusters: Dict[str, DataProcCluster] = {}
+        self._store = JSONStateStore(
+            path=Path(getenv("PROJECT_PATH"), self._POOL["state_path"])  # type: ignore
+        )
+
+    @property
+    def clusters(self) -> Tuple[ClusterSpec, ...]:
+        """Clusters of the pool in priority order"""
+        return tuple(self._specs.values())
+
+    def get_cluster(self, name: str) -> DataProcCluster:
+        """Returns `DataProcCluster` instance to manage Cluster of the pool"""
+        if name not in self._clusters:
+            self._clusters[name] = DataProcCluster(cluster_id=self._specs[name].id)
+
+        return self._clusters[name]
+
+    def get_submitter(self, name: str) -> SparkSubmitter:
+        """Returns `SparkSubmitter` instance which sends jobs to Cluster of the pool"""
+        return SparkSubmitter(cluster_api_base_url=self._specs[name].api_base_url)
+
+    def get_loads(self) -> Dict[str, int]:
+        """Returns number of running jobs on each Cluster of the pool"""
+        state = self._store.read()
+        self._drop_outdated(state=state)
+
+        return self._count_loads(state=state)
+
+    def _get_statuses(self) -> Dict[str, str]:
+        statuses = {}
+
+        for name in self._specs:
+            try:
+                statuses[name] = self.get_cluster(name=name).get_status()
+            except YandexAPIError as err:
+                self.logger.warning(f"Unable to get '{name}' Cluster status. {err}")
+                statuses[name] = "unknown"
+
+        self.logger.debug(f"Pool Clusters statuses: {statuses}")
+
+        return statuses
+
+    def _drop_outdated(self, state: Dict[str, Any]) -> None:
+        """Drops entries of dead tasks from state"""
+        now = time.time()
+        ttls = dict(
+            leases=self._POOL["lease_ttl"],
+            queue=self._POOL["lease_ttl"],
+            starting=self.config.get_cluster_config["polling"]["deadline"],
+            stopping=self.config.get_cluster_config["polling"]["deadline"],
+        )
+
+        for key, ttl in ttls.items():
+            entries = state.setdefault(key, {})
+            for _id in [_ for _, v in entries.items() if now - v["since"] > ttl]:
+                self.logger.debug(f"Dropping outdated '{_id}' from {key}")
+                del entries[_id]
+
+        state.setdefault("started", {})
+
+    def _count_loads(self, state: Dict[str, Any]) -> Dict[str, int]:
+        loads = {name: 0 for name in self._specs}
+
+        for lease in state.get("leases", {}).values():
+            if lease["cluster"] in loads:
+                loads[lease["cluster"]] += 1
+
+        return loads
+
+    def _choose_cluster(
+        self, state: Dict[str, Any], statuses: Dict[str, str]
+    ) -> Union[str, None]:
+        """Returns the least loaded running Cluster with free slot"""
+        loads = self._count_loads(state=state)
+
+        candidates = [
+            name
+            for name, spec in self._specs.items()
+            if statuses[name] == "running"
+            and name not in state["stopping"]
+            and loads[name] < spec.capacity
+        ]
+
+        return min(
+            candidates,
+            key=lambda name: loads[name] / self._specs[name].capacity,
+            default=None,
+        )
+
+    def _choose_to_start(
+        self, state: Dict[str, Any], statuses: Dict[str, str]
+    ) -> Union[str, None]:
+        """Returns stopped Cluster to start if no Cluster is up or the queue is deep enough"""
+        is_starting = bool(state["starting"]) or "starting" in statuses.values()
+        is_any_up = is_starting or "running" in statuses.values()
+
+        if is_any_up and (
+            is_starting or len(state["queue"]) < self._POOL["scale_up_queue_depth"]
+        ):
+            return None
+
+        return next(
+            (
+                name
+                for name in self._specs
+                if statuses[name] == "stopped"
+                and name not in state["starting"]
+                and name not in state["stopping"]
+            ),
+            None,
+        )
+
+    def _start(self, name: str) -> None:
+        self.logger.info(f"Starting '{name}' Cluster on demand")
+
+        cluster = self.get_cluster(name=name)
+
+        try:
+            cluster.exec_command(command="start")
+            cluster.check_status(target_status="running")
+
+        finally:
+            with self._store.transaction() as state:
+                state.setdefault("starting", {}).pop(name, None)
+
+        with self._store.transaction() as state:
+            state.setdefault("started", {})[name] = dict(since=time.time())
+
+    def acquire(self, job: str, deadline: int | None = None) -> Lease:
+        """Takes slot for `job` on the least loaded running Cluster.
+
+        Waits in the queue if all Clusters are full and starts extra Cluster if the queue is deep.
+
+        ## Parameters
+        `job` : Name of job\n
+        `deadline` : Total time in secs to wait for free slot, by default `cluster.pool.acquire_deadline` from config
+
+        ## Returns
+        `Lease` : Taken slot. Must be released with `release`
+
+        ## Raises
+        `NoClusterAvailable` : If no slot became free before deadline\n
+        `YandexAPIError` : If unable to start Cluster
+        """
+        deadline = deadline if deadline is not None else self._POOL["acquire_deadline"]
+        deadline_at = time.time() + deadline  # type: ignore
+        waiter = uuid4().hex
+
+        self.logger.info(f"Looking for free Cluster to submit '{job}' job")
+
+        try:
+            while True:
+                statuses = self._get_statuses()
+
+                with self._store.transaction() as state:
+                    self._drop_outdated(state=state)
+
+                    name = self._choose_cluster(state=state, statuses=statuses)
+                    if name is not None:
+                        lease = Lease(id=uuid4().hex, cluster=name, job=job)
+                        state["leases"][lease.id] = dict(
+                            cluster=name, job=job, since=time.time()
+                        )
+                        self.logger.info(f"'{job}' job placed on '{name}' Cluster")
+
+                        return lease
+
+                    state["queue"].setdefault(waiter, dict(job=job, since=time.time()))
+                    queue_depth = len(state["queue"])
+
+                    to_start = self._choose_to_start(state=state, statuses=statuses)
+                    if to_start is not None:
+                        state["starting"][to_start] = dict(since=time.time())
+
+                if to_start is not None:
+                    self._start(name=to_start)
+                    continue
+
+                if time.time() >= deadline_at:
+                    raise NoClusterAvailable(
+                        f"No free Cluster for '{job}' job within {deadline} secs"
+                    )
+
+                self.logger.info(
+                    f"No free Cluster. Jobs in queue: {queue_depth}. Retrying..."
+                )
+                time.sleep(min(self._DELAY, max(0.0, deadline_at - time.time())))
+
+        finally:
+            with self._store.transaction() as state:
+                state.setdefault("queue", {}).pop(waiter, None)
+
+    def release(self, lease: Lease) -> None:
+        """Frees slot taken by `acquire`"""
+        with self._store.transaction() as state:
+            state.setdefault("leases", {}).pop(lease.id, None)
+
+        self.logger.debug(f"'{lease.job}' job released '{lease.cluster}' Cluster")
+
+    def submit_job(self, job: str, keeper: ArgsKeeper) -> bool:
+        """Submits Spark job on the least loaded Cluster of the pool.
+
+        ## Parameters
+        `job` : Name of submitting job\n
+        `keeper` : Instance with Job arguments
+
+        ## Returns
+        `bool` : True if job was submitted successfully
+
+        ## Raises
+        `NoClusterAvailable` : If no slot became free before deadline\n
+        `UnableToSubmitJob` : If failed while submitting job
+        """
+        lease = self.acquire(job=job)
+
+        try:
+            return self.get_submitter(name=lease.cluster).submit_job(job=job, keeper=keeper)  # type: ignore
+
+        finally:
+            self.release(lease=lease)
+
+    def stop_started(self) -> List[str]:
+        """Stops Clusters started by the pool which have no running jobs.
+
+        ## Returns
+        `List[str]` : Names of stopped Clusters
+
+        ## Raises
+        `YandexAPIError` : If unable to stop Cluster
+        """
+        with self._store.transaction() as state:
+            self._drop_outdated(state=state)
+            loads = self._count_loads(state=state)
+
+            to_stop = [
+                name
+                for name in state["started"]
+                if name in self._specs and loads[name] == 0
+            ]
+            for name in to_stop:
+                state["stopping"][name] = dict(since=time.time())
+
+        stopped = []
+
+        for name in to_stop:
+            cluster = self.get_cluster(name=name)
+
+            try:
+                if cluster.get_status() == "running":
+                    self.logger.info(f"Stopping '{name}' Cluster")
+                    cluster.exec_command(command="stop")
+                    cluster.check_status(target_status="stopped")
+
+            finally:
+                with self._store.transaction() as state:
+                    state.setdefault("stopping", {}).pop(name, None)
+
+            with self._store.transaction() as state:
+                state.setdefault("started", {}).pop(name, None)
+
+            stopped.append(name)
+
+        return stopped
@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+from src.reader.reader import DatamartReader
+from src.reader.exceptions import DatamartNotFound
+
+__all__ = ["DatamartReader", "DatamartNotFound"]
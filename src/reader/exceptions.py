@@ -0,0 +1,8 @@
+class DatamartNotFound(Exception):
+    def __init__(self, msg: str) -> None:
+        """Raises if datamart or its partition of requested date not found on S3.
+
+        ## Parameters
+        `msg` : Error message
+        """
+        super().__init__(msg)
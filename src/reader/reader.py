@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List, Sequence, Tuple
+
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.helper import S3ServiceError, SparkHelper
+from src.logger import SparkLogger
+from src.reader.exceptions import DatamartNotFound
+
+
+class DatamartReader(SparkHelper):
+    """Point lookups of datamarts written by `DatamartCollector` with PyArrow, without Spark.
+
+    ## Notes
+    Files of datamart partition are downloaded once into local cache and memory-mapped. Only files
+    which key range from `_index.json` covers looked up key are read, see `DatamartCollector._write_datamart`.
+    Row groups are skipped by their min/max statistics and only requested columns of the rest are decoded.
+    Decoded row groups are kept in LRU cache, so lookups of hot keys don't touch files at all.
+
+    Partitions of datamart are listed on S3 not more often than once in `max_staleness` secs,
+    so new partition is served with that delay. Local file name has ETag of S3 object, so
+    recollected partition is downloaded again.
+
+    Configured in `reader` section of `config.yaml`. Requires `pyarrow`.
+
+    ## Examples
+    >>> reader = DatamartReader()
+
+    Recommendations of user from the latest partition:
+    >>> reader.lookup(datamart="add-to-friends-recommendations-dm", filters=dict(user_id=19741))
+    [{'user_id': 19741, 'rec_to_add_user_id': 149989, 'processed_dttm': datetime.datetime(2023, 5, 22, 12, 3, 25), 'zone_id': 10, 'local_time': datetime.datetime(2022, 4, 17, 19, 52, 54)}]
+
+    Events of zone from partition of the date:
+    >>> reader.lookup(datamart="events-total-cnt-agg-wk-mnth-dm", filters=dict(zone_id=10), columns=["week", "week_message"], date="2022-04-26")
+    [{'week': datetime.date(2022, 4, 18), 'week_message': 312}, ...]
+    """
+
+    __slots__ = (
+        "_READER",
+        "_cache_path",
+        "_partitions",
+        "_indexes",
+        "_files",
+        "_row_groups",
+        "_lock",
+    )
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        self.logger = SparkLogger(
+            level=self.config.get_logging_level["python"]
+        ).get_logger(name=f"{__name__}.{__class__.__name__}")
+
+        self._READER = self.config.get_reader_config
+        self._cache_path = Path(getenv("PROJECT_PATH"), self._READER["cache_path"])  # type: ignore
+
+        # datamart path -> (time of listing, date -> file name -> S3 object)
+        self._partitions: Dict[
+            str, Tuple[float, Dict[str, Dict[str, Dict[str, Any]]]]
+        ] = {}
+        # (index path, ETag) -> index
+        self._indexes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # local path -> opened memory-mapped file
+        self._files: Dict[Path, pq.ParquetFile] = {}
+        # (local path, row group, columns) -> decoded row group, the least recently used first
+        self._row_groups: OrderedDict[Tuple[Path, int, Tuple[str, ...]], pa.Table] = (
+            OrderedDict()
+        )
+        # API serves requests from several threads
+        self._lock = threading.RLock()
+
+    def get_dates(self, datamart: str, tgt_path: str | None = None) -> List[str]:
+        """Returns dates of partitions of datamart in ascending order.
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        path = f"{tgt_path or self._READER['tgt_path']}/{datamart}"
+
+        return sorted(self._list_partitions(path=path))
+
+    def lookup(
+        self,
+        datamart: str,
+        filters: Dict[str, Any],
+        columns: Sequence[str] | None = None,
+        date: str | None = None,
+        tgt_path: str | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Returns rows of datamart partition with given values of columns.
+
+        ## Parameters
+        `datamart` : Name of datamart, for example `users-demographic-dm`\n
+        `filters` : Column -> value, rows with all values equal to given ones are returned\n
+        `columns` : Columns of returned rows, all columns by default\n
+        `date` : Date of partition, the latest one by default. Format: `%Y-%m-%d`\n
+        `tgt_path` : Path datamarts are written to, by default `reader.tgt_path` from config
+
+        ## Returns
+        `List[Dict[str, Any]]` : Found rows
+
+        ## Raises
+        `DatamartNotFound` : If datamart has no partitions or no partition of `date`\n
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        path = f"{tgt_path or self._READER['tgt_path']}/{datamart}"
+        partitions = self._list_partitions(path=path)
+
+        if not partitions:
+            raise DatamartNotFound(f"No partitions of '{datamart}' datamart -> {path}")
+
+        date = date or max(partitions)
+        if date not in partitions:
+            raise DatamartNotFound(
+                f"No partition of '{datamart}' datamart for {date} -> {path}"
+            )
+
+        objects = partitions[date]
+        names = sorted(_ for _ in objects if _.endswith(".parquet"))
+
+        if "_index.json" in objects:
+            index = self._get_index(obj=objects["_index.json"])
+            names = [
+                _["path"]
+                for _ in index["files"]
+                if _["path"] in objects
+                and self._in_range(keys=index["keys"], file=_, filters=filters)
+            ]
+
+        self.logger.debug(
+            f"Looking up {filters} in {len(names)} files of '{datamart}' datamart for {date}"
+        )
+
+        rows: List[Dict[str, Any]] = []
+        for name in names:
+            path, file = self._open_local_file(obj=objects[name])
+            rows.extend(
+                self._lookup_file(
+                    path=path, file=file, filters=filters, columns=columns
+                )
+            )
+
+        return rows
+
+    def _list_partitions(self, path: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Returns objects of each `date=` partition of datamart, listed again after `max_staleness` secs"""
+        with self._lock:
+            listed = self._partitions.get(path)
+
+            if listed and time.monotonic() - listed[0] < self._READER["max_staleness"]:
+                return listed[1]
+
+        partitions: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        for obj in self._list_s3_objects(key=f"{path}/date="):
+            *_, partition, name = obj["Key"].split(sep="/")
+            if partition.startswith("date="):
+                partitions.setdefault(partition[len("date=") :], {})[name] = dict(
+                    obj, Bucket=path.split(sep="/")[2]
+                )
+
+        with self._lock:
+            self._partitions[path] = (time.monotonic(), partitions)
+
+        return partitions
+
+    def _get_index(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns `_index.json` of partition, read again only if its ETag changed"""
+        from botocore.exceptions import ClientError
+
+        key = (obj["Key"], obj["ETag"])
+
+        with self._lock:
+            if key in self._indexes:
+                return self._indexes[key]
+
+        try:
+            body = self.s3.get_object(Bucket=obj["Bucket"], Key=obj["Key"])["Body"]
+        except ClientError as err:
+            raise S3ServiceError(str(err))
+
+        index = json.loads(body.read())
+
+        with self._lock:
+            self._indexes[key] = index
+
+        return index
+
+    @staticmethod
+    def _in_range(
+        keys: List[str], file: Dict[str, Any], filters: Dict[str, Any]
+    ) -> bool:
+        """Checks if key range of file from index may contain rows with `filters` values.
+
+        Files are sorted by keys, so only leading keys with given values are compared.
+        """
+        prefix = []
+        for key in keys:
+            if key not in filters:
+                break
+            prefix.append(filters[key])
+
+        n = len(prefix)
+        try:
+            return file["min"][:n] <= prefix <= file["max"][:n]
+        except TypeError:
+            # values of index are not comparable with given ones, for example dates
+            return True
+
+    def _open_local_file(self, obj: Dict[str, Any]) -> Tuple[Path, pq.ParquetFile]:
+        """Returns path and opened local copy of S3 object, downloads it if not cached yet.
+
+        File is checked and opened under lock, so another thread doesn't evict it in between.
+        Opened file is memory-mapped, so it stays readable after eviction deletes it.
+        """
+        from botocore.exceptions import ClientError
+
+        digest = hashlib.sha1(
+            f"{obj['Bucket']}/{obj['Key']}:{obj['ETag']}".encode()
+        ).hexdigest()
+        path = self._cache_path / f"{digest}.parquet"
+
+        with self._lock:
+            try:
+                # modification time orders files for eviction
+                os.utime(path)
+                return path, self._open(path=path)
+            except FileNotFoundError:
+                pass
+
+        self.logger.debug(f"Downloading '{obj['Key']}' -> {path}")
+
+        self._cache_path.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}")
+
+        try:
+            self.s3.download_file(
+                Bucket=obj["Bucket"], Key=obj["Key"], Filename=str(tmp)
+            )
+        except ClientError as err:
+            tmp.unlink(missing_ok=True)
+            raise S3ServiceError(str(err))
+
+        with self._lock:
+            os.replace(tmp, path)
+            file = self._open(path=path)
+            self._evict_local_files(keep=path)
+
+        return path, file
+
+    def _evict_local_files(self, keep: Path) -> ...:
+        """Deletes the least recently used local files while cache is larger than `max_cache_bytes`.
+
+        Must be called under lock, see `_open_local_file`.
+        """
+        files = sorted(
+            (
+                (_.stat().st_mtime, _.stat().st_size, _)
+                for _ in self._cache_path.glob("*.parquet")
+            ),
+        )
+        size = sum(_[1] for _ in files)
+
+        for _, file_size, path in files:
+            if size <= self._READER["max_cache_bytes"]:
+                break
+            if path == keep:
+                continue
+
+            self._files.pop(path, None)
+            for key in [_ for _ in self._row_groups if _[0] == path]:
+                del self._row_groups[key]
+
+            path.unlink(missing_ok=True)
+            size -= file_size
+
+            self.logger.debug(f"Evicted from local cache -> {path}")
+
+    def _open(self, path: Path) -> pq.ParquetFile:
+        """Returns memory-mapped parquet file, only its footer is read on opening"""
+        import pyarrow.parquet as pq  # type: ignore
+
+        with self._lock:
+            if path not in self._files:
+                self._files[path] = pq.ParquetFile(path, memory_map=True)
+
+            return self._files[path]
+
+    def _read_row_group(
+        self,
+        path: Path,
+        file: pq.ParquetFile,
+        row_group: int,
+        columns: Tuple[str, ...],
+    ) -> pa.Table:
+        """Returns decoded columns of row group from LRU cache of `row_groups` size"""
+        key = (path, row_group, columns)
+
+        with self._lock:
+            if key in self._row_groups:
+                self._row_groups.move_to_end(key)
+                return self._row_groups[key]
+
+        table = file.read_row_group(row_group, columns=list(columns))
+
+        with self._lock:
+            self._row_groups[key] = table
+            while len(self._row_groups) > self._READER["row_groups"]:
+                self._row_groups.popitem(last=False)
+
+        return table
+
+    @staticmethod
+    def _may_contain(metadata: pq.RowGroupMetaData, filters: Dict[str, Any]) -> bool:
+        """Checks min/max statistics of row group columns against `filters` values"""
+        for i in range(metadata.num_columns):
+            column = metadata.column(i)
+            if column.path_in_schema not in filters:
+                continue
+
+            stats = column.statistics
+            if stats is None or not stats.has_min_max:
+                continue
+
+            value = filters[column.path_in_schema]
+            try:
+                if not stats.min <= value <= stats.max:
+                    return False
+            except TypeError:
+                continue
+
+        return True
+
+    def _lookup_file(
+        self,
+        path: Path,
+        file: pq.ParquetFile,
+        filters: Dict[str, Any],
+        columns: Sequence[str] | None,
+    ) -> List[Dict[str, Any]]:
+        """Returns rows of local parquet file opened by `_open_local_file` with `filters` values"""
+        import pyarrow.compute as pc  # type: ignore
+
+        columns = list(columns or file.schema_arrow.names)
+        read_columns = tuple(columns + [_ for _ in filters if _ not in columns])
+
+        rows: List[Dict[str, Any]] = []
+
+        for i in range(file.num_row_groups):
+            if not self._may_contain(
+                metadata=file.metadata.row_group(i), filters=filters
+            ):
+                continue
+
+            table = self._read_row_group(
+                path=path, file=file, row_group=i, columns=read_columns
+            )
+
+            mask = None
+            for column, value in filters.items():
+                equal = pc.equal(table[column], value)
+                mask = equal if mask is None else pc.and_(mask, equal)
+
+            if mask is not None:
+                table = table.filter(mask)
+
+            rows.extend(table.select(columns).to_pylist())
+
+        return rows
@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+from src.registry.datamodel import JobSpec
+from src.registry.exceptions import JobGraphError, UnknownJob
+from src.registry.registry import JobRegistry
+
+__all__ = ["JobRegistry", "JobSpec", "JobGraphError", "UnknownJob"]
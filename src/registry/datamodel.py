@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from datetime import date
+    from typing import Dict, Tuple
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """Spark job as declared in `spark.jobs` section of config.
+
+    ## Parameters
+    `name` : Unique name of job, also name of API route and Airflow task\n
+    `method` : Name of `DatamartCollector` method which collects datamart, called with `keeper` and `partition_date` arguments\n
+    `event_types` : Types of events read by job, input size is measured on them\n
+    `profile` : Name of tuning profile from `spark.tuning_profiles`\n
+    `depends_on` : Names of jobs which must be finished before this one\n
+    `args` : Default job arguments: `date`, `depth`, `src_path`, `tgt_path` and `coords_path`
+    """
+
+    name: str
+    method: str
+    event_types: Tuple[str, ...]
+    profile: str = "default"
+    depends_on: Tuple[str, ...] = ()
+    args: Dict[str, str | int | date] = field(default_factory=dict)
@@ -0,0 +1,18 @@
+class UnknownJob(Exception):
+    def __init__(self, msg: str) -> None:
+        """Raises if job not declared in `spark.jobs` section of config.
+
+        ## Parameters
+        `msg` : Error message
+        """
+        super().__init__(msg)
+
+
+class JobGraphError(Exception):
+    def __init__(self, msg: str) -> None:
+        """Raises if jobs depend on unknown jobs or on each other in a loop.
+
+        ## Parameters
+        `msg` : Error message
+        """
+        super().__init__(msg)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterator, List, Tuple
+
+    from src.config import Config
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.registry.datamodel import JobSpec
+from src.registry.exceptions import JobGraphError, UnknownJob
+
+_ARGS = ("date", "depth", "src_path", "tgt_path", "coords_path")
+
+
+class JobRegistry:
+    """Spark jobs declared in `spark.jobs` section of `config.yaml`.
+
+    ## Notes
+    Single source of jobs for Airflow DAG tasks, API routes, job entry point and `SparkSubmitter`. New job is added with new section in config and `DatamartCollector` method.
+
+    Jobs are grouped into stages by `depends_on`, jobs of one stage are independent and may run in parallel.
+
+    ## Examples
+    >>> registry = JobRegistry()
+    >>> registry.names
+    ('collect_users_demographic_dm_job', 'collect_events_total_cnt_agg_wk_mnth_dm_job', 'update_social_graph_job', 'collect_add_to_friends_recommendations_dm_job')
+    >>> registry.get(name="collect_users_demographic_dm_job").profile
+    'geo-heavy'
+
+    Independent jobs are in the same stage:
+    >>> registry.get_stages()
+    [('collect_users_demographic_dm_job', 'collect_events_total_cnt_agg_wk_mnth_dm_job', 'update_social_graph_job'), ('collect_add_to_friends_recommendations_dm_job',)]
+    """
+
+    __slots__ = ("_specs",)
+
+    def __init__(self, config: Config | None = None) -> None:
+        """
+
+        ## Parameters
+        `config` : Project config, by default taken from project context
+
+        ## Raises
+        `JobGraphError` : If job depends on unknown job or jobs depend on each other in a loop
+        """
+        if config is None:
+            from src.context import get_context
+
+            config = get_context().config
+
+        self._specs: Dict[str, JobSpec] = {
+            name: JobSpec(
+                name=name,
+                method=section["method"],
+                event_types=tuple(section["event_types"]),
+                profile=section.get("profile", "default"),
+                depends_on=tuple(section.get("depends_on") or ()),
+                args={k: v for k, v in section.items() if k in _ARGS},
+            )
+            for name, section in config.get_job_config.items()
+        }
+        self.get_stages()
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def __iter__(self) -> Iterator[JobSpec]:
+        return iter(self._specs.values())
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """Names of jobs in config order"""
+        return tuple(self._specs)
+
+    def get(self, name: str) -> JobSpec:
+        """Returns job by name.
+
+        ## Raises
+        `UnknownJob` : If job not declared in config
+        """
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise UnknownJob(
+                f"Job '{name}' not declared in config. Known jobs: {', '.join(self._specs)}"
+            )
+
+    def get_stages(self) -> List[Tuple[str, ...]]:
+        """Groups jobs into stages in execution order.
+
+        Each job is placed in the first stage after all of its dependencies.
+
+        ## Returns
+        `List[Tuple[str, ...]]` : Names of jobs of each stage in config order
+
+        ## Raises
+        `JobGraphError` : If job depends on unknown job or jobs depend on each other in a loop
+        """
+        for spec in self._specs.values():
+            for dependency in spec.depends_on:
+                if dependency not in self._specs:
+                    raise JobGraphError(
+                        f"Job '{spec.name}' depends on unknown job '{dependency}'"
+                    )
+
+        stages: List[Tuple[str, ...]] = []
+        done: set = set()
+
+        while len(done) < len(self._specs):
+            stage = tuple(
+                name
+                for name, spec in self._specs.items()
+                if name not in done and done.issuperset(spec.depends_on)
+            )
+            if not stage:
+                raise JobGraphError(
+                    f"Jobs depend on each other in a loop: {', '.join(sorted(set(self._specs) - done))}"
+                )
+
+            stages.append(stage)
+            done.update(stage)
+
+        return stages
@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+from src.sizer.datamodel import RunMetrics
+from src.sizer.sizer import ResourceSizer
+
+__all__ = ["ResourceSizer", "RunMetrics"]
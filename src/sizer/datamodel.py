@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RunMetrics:
+    """Metrics of finished Spark job run.
+
+    ## Parameters
+    `input_bytes` : Size of input data on S3\n
+    `duration` : Job execution time in secs\n
+    `executors` : Peak number of executors job used at the same time\n
+    `executor_cores` : Cores per executor\n
+    `spilled_bytes` : Bytes spilled from memory by all stages, by default 0
+    """
+
+    input_bytes: int
+    duration: float
+    executors: int
+    executor_cores: int
+    spilled_bytes: int = 0
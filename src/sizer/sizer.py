@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import math
+import statistics
+import sys
+from dataclasses import asdict
+from os import getenv
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import List
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.config import Config
+from src.environ import EnvironManager
+from src.keeper import SparkConfigKeeper
+from src.logger import SparkLogger
+from src.sizer.datamodel import RunMetrics
+from src.store import JSONStateStore
+
+
+def _clamp(value: float, lower: float, upper: float) -> float:
+    return max(lower, min(value, upper))
+
+
+class ResourceSizer:
+    """Derives Spark job resources from input size and metrics of past runs.
+
+    ## Notes
+    Number of shuffle partitions is taken from input size, so each partition is about `partition_bytes` in memory.
+
+    If job has no history yet, number of executors is enough to process all partitions in `task_waves` waves. Otherwise it's scaled by the median throughput of past runs to finish within `target_duration`.
+
+    Memory per core grows with the median spill ratio of past runs and broadcast threshold follows executor memory.
+
+    Configured in `spark.sizing` section of `config.yaml`.
+
+    ## Examples
+    >>> sizer = ResourceSizer()
+    >>> input_bytes = collector._get_src_size(event_types=("message",), keeper=keeper)
+    >>> spark_conf = sizer.estimate(job="collect_users_demographic_dm_job", input_bytes=input_bytes)
+    >>> print(spark_conf)
+        spark.executor.memory: 3000m
+        spark.executor.cores: 1
+        spark.dynamicAllocation.maxExecutors: 8
+        spark.sql.shuffle.partitions: 16
+        spark.sql.autoBroadcastJoinThreshold: 150m
+
+    Save metrics of finished run:
+    >>> sizer.record(job="collect_users_demographic_dm_job", metrics=metrics)
+    """
+
+    __slots__ = ("_SIZING", "_store", "config", "logger")
+
+    def __init__(self) -> None:
+        env_man = EnvironManager()
+        env_man.load_environ()
+        env_man.check_environ(var="PROJECT_PATH")
+
+        self.config: Config = env_man.config
+        self.logger = SparkLogger(
+            level=self.config.get_logging_level["python"]
+        ).get_logger(name=f"{__name__}.{__class__.__name__}")
+
+        self._SIZING = self.config.get_sizing_config
+        self._store = JSONStateStore(
+            path=Path(getenv("PROJECT_PATH"), self._SIZING["metrics_path"])  # type: ignore
+        )
+
+    def get_history(self, job: str) -> List[RunMetrics]:
+        """Returns metrics of past runs of `job`"""
+        return [RunMetrics(**_) for _ in self._store.read().get(job, [])]
+
+    def record(self, job: str, metrics: RunMetrics) -> None:
+        """Saves metrics of finished run of `job`"""
+        with self._store.transaction() as state:
+            history = state.setdefault(job, [])
+            history.append(asdict(metrics))
+            del history[: -self._SIZING["history_size"]]
+
+        self.logger.debug(f"Metrics of '{job}' job run recorded: {metrics}")
+
+    def estimate(self, job: str, input_bytes: int) -> SparkConfigKeeper:
+        """Estimates resources for `job`.
+
+        ## Parameters
+        `job` : Name of job\n
+        `input_bytes` : Size of job input data on S3
+
+        ## Returns
+        `SparkConfigKeeper` : Spark configuration properties
+        """
+        S = self._SIZING
+        history = [_ for _ in self.get_history(job=job) if _.input_bytes > 0]
+
+        self.logger.debug(
+            f"Estimating '{job}' job resources. Input: {input_bytes / 1024**2:.1f} MB, past runs: {len(history)}"
+        )
+
+        cores = S["executor_cores"]
+
+        spill_ratio = (
+            statistics.median(_.spilled_bytes / _.input_bytes for _ in history)
+            if history
+            else 0.0
+        )
+        memory_per_core = _clamp(
+            S["memory_per_core"] * (1 + spill_ratio),
+            S["memory_per_core"],
+            S["max_memory_per_core"],
+        )
+        executor_memory = int(memory_per_core * cores)
+
+        partitions = _clamp(
+            math.ceil(input_bytes * S["expansion_factor"] / S["partition_bytes"]),
+            S["min_partitions"],
+            S["max_partitions"],
+        )
+
+        if history:
+            # bytes processed by single core per sec
+            throughput = statistics.median(
+                _.input_bytes / max(_.duration * _.executors * _.executor_cores, 1)
+                for _ in history
+            )
+            executors = math.ceil(
+                input_bytes / (throughput * S["target_duration"] * cores)
+            )
+        else:
+            executors = math.ceil(partitions / (cores * S["task_waves"]))
+
+        executors = int(_clamp(executors, S["min_executors"], S["max_executors"]))
+
+        # each wave of tasks should use all cores
+        slots = executors * cores
+        partitions = int(
+            min(math.ceil(partitions / slots) * slots, max(S["max_partitions"], slots))
+        )
+
+        broadcast_threshold = int(
+            min(executor_memory * S["broadcast_fraction"], S["max_broadcast"])
+        )
+
+        spark_conf = SparkConfigKeeper(
+            executor_memory=f"{executor_memory}m",
+            executor_cores=cores,
+            max_executors_num=executors,
+            shuffle_partitions=partitions,
+            broadcast_threshold=f"{broadcast_threshold}m",
+        )
+
+        self.logger.info(f"Estimated '{job}' job resources:\n{spark_conf}")
+
+        return spark_conf
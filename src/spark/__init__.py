@@ -3,5 +3,13 @@ from __future__ import annotations
 from src.spark.runner import SparkRunner
 from src.spark.collector import DatamartCollector
 from src.spark.mover import DataMover
+from src.spark.graph import SocialGraphStore
+from src.spark.timeline import TimelineEngine
 
-__all__ = ["SparkRunner", "DatamartCollector", "DataMover"]
+__all__ = [
+    "SparkRunner",
+    "DatamartCollector",
+    "DataMover",
+    "TimelineEngine",
+    "SocialGraphStore",
+]
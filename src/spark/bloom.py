@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Tuple
+
+    import pyspark.sql  # type: ignore
+    from pyspark.broadcast import Broadcast  # type: ignore
+
+
+def get_bloom_size(items: int, fpp: float) -> Tuple[int, int]:
+    """Returns number of bits and number of hash functions of Bloom filter.
+
+    ## Parameters
+    `items` : Expected number of items\n
+    `fpp` : Expected false positive probability
+
+    ## Examples
+    >>> get_bloom_size(items=1_000_000, fpp=0.01)
+    (9585059, 7)
+    """
+    num_bits = max(math.ceil(-items * math.log(fpp) / math.log(2) ** 2), 8)
+    num_hashes = max(round(num_bits / max(items, 1) * math.log(2)), 1)
+
+    return num_bits, num_hashes
+
+
+def _get_indexes(
+    cols: Tuple[str, str], num_bits: int, num_hashes: int
+) -> pyspark.sql.Column:
+    """Returns array of bit indexes of unordered pair of ids in `cols`.
+
+    Indexes are `h1 + i * h2` of two Spark hashes of the pair, so they are computed in JVM.
+    """
+    import pyspark.sql.functions as F  # type: ignore
+
+    first, second = (F.col(_).cast("long") for _ in cols)
+    pair = (F.least(first, second), F.greatest(first, second))
+
+    h1 = F.pmod(F.xxhash64(*pair), F.lit(num_bits))
+    h2 = F.pmod(F.hash(*pair).cast("long"), F.lit(num_bits))
+
+    return F.array(
+        *(F.pmod(h1 + F.lit(i) * h2, F.lit(num_bits)) for i in range(num_hashes))
+    )
+
+
+class PairBloomFilter:
+    """Bloom filter of unordered pairs of ids, for example users who wrote to each other.
+
+    Filter is built on executors and merged with tree reduce, then broadcasted and probed
+    on executors with vectorized NumPy, so neither side of the pairs is shuffled by probing.
+    Pair which is not in filter is definitely not in the set, the rest are possible matches.
+
+    ## Parameters
+    `num_bits` : Number of bits of filter\n
+    `num_hashes` : Number of hash functions\n
+    `bits` : Broadcasted bits of filter as `numpy.uint8` array
+
+    ## Examples
+    >>> bloom = PairBloomFilter.build(spark=spark, sdf=contacts_sdf, cols=("user_id", "contact_id"), items=items, fpp=0.01)
+    >>> sdf = bloom.might_contain(sdf=pairs_sdf, cols=("left_user", "right_user"), alias="is_contact")
+    >>> bloom.destroy()
+    """
+
+    __slots__ = ("num_bits", "num_hashes", "bits")
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: Broadcast) -> None:
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits
+
+    @classmethod
+    def build(
+        cls,
+        spark: pyspark.sql.SparkSession,
+        sdf: pyspark.sql.DataFrame,
+        cols: Tuple[str, str],
+        items: int,
+        fpp: float,
+    ) -> PairBloomFilter:
+        """Builds filter of pairs in `cols` of `sdf`.
+
+        ## Parameters
+        `spark` : Active Spark session\n
+        `sdf` : DataFrame with pairs\n
+        `cols` : Columns with ids of pair\n
+        `items` : Expected number of pairs\n
+        `fpp` : Expected false positive probability
+        """
+        num_bits, num_hashes = get_bloom_size(items=items, fpp=fpp)
+        size = (num_bits + 7) // 8
+
+        def _set_bits(batches):
+            import numpy as np  # type: ignore
+            import pandas as pd  # type: ignore
+
+            bits = np.zeros(size, dtype=np.uint8)
+
+            for pdf in batches:
+                if not len(pdf):
+                    continue
+                idx = np.concatenate(pdf["_idx"].to_numpy()).astype(np.int64)
+                np.bitwise_or.at(bits, idx >> 3, (1 << (idx & 7)).astype(np.uint8))
+
+            yield pd.DataFrame(dict(bits=[bits.tobytes()]))
+
+        def _merge(left: bytes, right: bytes) -> bytes:
+            import numpy as np  # type: ignore
+
+            return np.bitwise_or(
+                np.frombuffer(left, dtype=np.uint8),
+                np.frombuffer(right, dtype=np.uint8),
+            ).tobytes()
+
+        bits = (
+            sdf.select(
+                _get_indexes(cols=cols, num_bits=num_bits, num_hashes=num_hashes).alias(
+                    "_idx"
+                )
+            )
+            .mapInPandas(_set_bits, schema="bits binary")
+            .rdd.map(lambda row: bytes(row.bits))
+            .treeReduce(_merge)
+        )
+
+        import numpy as np  # type: ignore
+
+        return cls(
+            num_bits=num_bits,
+            num_hashes=num_hashes,
+            bits=spark.sparkContext.broadcast(np.frombuffer(bits, dtype=np.uint8)),
+        )
+
+    def might_contain(
+        self, sdf: pyspark.sql.DataFrame, cols: Tuple[str, str], alias: str
+    ) -> pyspark.sql.DataFrame:
+        """Adds boolean `alias` column, false if pair in `cols` is definitely not in filter"""
+        from pyspark.sql.types import BooleanType, StructField, StructType
+
+        bits = self.bits
+
+        def _probe(batches):
+            import numpy as np  # type: ignore
+
+            for pdf in batches:
+                idx = pdf.pop("_idx").to_numpy()
+                if not len(idx):
+                    yield pdf.assign(**{alias: np.empty(0, dtype=bool)})
+                    continue
+
+                idx = np.stack(idx).astype(np.int64)
+                found = (bits.value[idx >> 3] >> (idx & 7)) & 1
+
+                yield pdf.assign(**{alias: found.all(axis=1)})
+
+        return sdf.withColumn(
+            "_idx",
+            _get_indexes(cols=cols, num_bits=self.num_bits, num_hashes=self.num_hashes),
+        ).mapInPandas(
+            _probe,
+            schema=StructType(
+                sdf.schema.fields + [StructField(alias, BooleanType(), nullable=False)]
+            ),
+        )
+
+    def destroy(self) -> ...:
+        """Frees broadcasted bits of filter"""
+        self.bits.destroy()
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Literal, Tuple
+    from datetime import date
+    from typing import Any, Callable, Dict, List, Literal, Tuple
 
+    import pandas as pd  # type: ignore
     import pyspark.sql  # type: ignore
+    from pyspark.broadcast import Broadcast  # type: ignore
 
     from src.keeper import ArgsKeeper, SparkConfigKeeper
 
@@ -18,11 +22,16 @@ from src.keeper import SparkConfigKeeper
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.logger import SparkLogger
+from src.spark.bloom import PairBloomFilter, get_bloom_size
+from src.spark.graph import SocialGraphStore
 from src.spark.runner import SparkRunner
+from src.spark.skew import SkewProfiler
+from src.spark.timeline import TimelineEngine, keep_first, last_value
+from src.spark.timezone import get_utc_offsets
 
 
 class DatamartCollector(SparkRunner):
-    __slots__ = ("logger",)
+    __slots__ = ("logger", "_events", "_cities", "_releases")
 
     def __init__(self) -> None:
         super().__init__()
@@ -31,6 +40,19 @@ class DatamartCollector(SparkRunner):
             level=self.config.get_logging_level["python"]
         ).get_logger(name=f"{__name__}.{__class__.__name__}")
 
+        # (src path, event type) -> (first date, last date, events)
+        self._events: Dict[
+            Tuple[str, str], Tuple[date, date, pyspark.sql.DataFrame]
+        ] = {}
+
+        # coords path -> (ETag, time of the last check, pinned dataframe, broadcasted rows)
+        self._cities: Dict[str, Tuple[str, float, pyspark.sql.DataFrame, Broadcast]] = (
+            {}
+        )
+
+        # frees dataframes and broadcasts used by the whole collection, see `_collect`
+        self._releases: List[Callable[[], Any]] = []
+
     def init_session(
         self,
         app_name: str,
@@ -38,12 +60,173 @@ class DatamartCollector(SparkRunner):
         log4j_level: Literal[
             "ALL", "DEBUG", "ERROR", "FATAL", "INFO", "OFF", "TRACE", "WARN"
         ] = "WARN",
+        profile: str = "default",
+        master: str = "yarn",
     ) -> ...:
-        return super().init_session(app_name, spark_conf, log4j_level)
+        return super().init_session(app_name, spark_conf, log4j_level, profile, master)
 
     def stop_session(self) -> ...:
+        self._release()
+        self.uncache_events()
+        self.uncache_cities()
+
         return super().stop_session()
 
+    def _get_window(self, keeper: ArgsKeeper) -> Tuple[date, date]:
+        """Returns first and last dates of input partitions for `keeper` arguments"""
+        end = datetime.strptime(keeper.date, r"%Y-%m-%d").date()
+
+        return end - timedelta(days=int(keeper.depth) - 1), end
+
+    def _get_timeline_engine(self) -> TimelineEngine:
+        """Returns `TimelineEngine` for active session"""
+        return TimelineEngine(spark=self.spark, config=self.config)
+
+    def _get_skew_profiler(self) -> SkewProfiler:
+        """Returns `SkewProfiler` configured in `spark.skew` section of config"""
+        return SkewProfiler(config=self.config)
+
+    def cache_events(
+        self,
+        event_types: Tuple[Literal["message", "reaction", "subscription"], ...],
+        keeper: ArgsKeeper,
+    ) -> ...:
+        """Reads events once and keeps them for following collections in this session.
+
+        Used for backfill: events of the whole window of several days are read together and datamart of each day is collected from them without reading S3 again.
+
+        ## Parameters
+        `event_types` : Event types to cache\n
+        `keeper` : `ArgsKeeper` instance with window covering windows of all following collections
+
+        ## Raises
+        `S3ServiceError` : If no paths for given arguments was found on S3
+        """
+        from pyspark import StorageLevel  # type: ignore
+
+        start, end = self._get_window(keeper=keeper)
+
+        for event_type in event_types:
+            self.logger.debug(f"Caching '{event_type}' events from {start} to {end}")
+
+            sdf = (
+                self.spark.read.option("mergeSchema", "true")
+                .option("cacheMetadata", "true")
+                .option("basePath", f"{keeper.src_path}/event_type={event_type}")
+                .parquet(*self._get_src_paths(event_type=event_type, keeper=keeper))
+                .persist(storageLevel=StorageLevel.MEMORY_AND_DISK)
+            )
+            self._events[(keeper.src_path, event_type)] = (start, end, sdf)
+
+    def uncache_events(self) -> ...:
+        """Frees events cached by `cache_events`"""
+        for _, _, sdf in self._events.values():
+            sdf.unpersist()
+
+        self._events.clear()
+
+    def _read_events_df(
+        self,
+        event_type: Literal["message", "reaction", "subscription"],
+        keeper: ArgsKeeper,
+    ) -> pyspark.sql.DataFrame:
+        """Returns events of `event_type` for `keeper` arguments.
+
+        Takes them from events cached by `cache_events` if cached window covers the requested one. Reads from S3 otherwise.
+
+        Events have `event_ts` timestamp column: time of message for messages and time of event for other types.
+
+        ## Raises
+        `S3ServiceError` : If no paths for given arguments was found on S3
+        """
+        import pyspark.sql.functions as F  # type: ignore
+
+        start, end = self._get_window(keeper=keeper)
+        cached = self._events.get((keeper.src_path, event_type))
+
+        if cached is not None and cached[0] <= start and end <= cached[1]:
+            self.logger.debug(f"Taking '{event_type}' events from cache")
+
+            sdf = (
+                cached[2]
+                .where(F.col("date").between(str(start), str(end)))
+                .drop("date")
+            )
+        else:
+            sdf = (
+                self.spark.read.option("mergeSchema", "true")
+                .option("cacheMetadata", "true")
+                .parquet(*self._get_src_paths(event_type=event_type, keeper=keeper))
+            )
+
+        # partitions moved before `event_ts` was added to `DataMover` don't have it
+        return sdf.withColumn(
+            "event_ts",
+            F.coalesce(
+                *(_ for _ in ("event_ts", "message_ts", "datetime") if _ in sdf.columns)
+            ),
+        )
+
+    def _get_checkpoint_path(self, datamart: str, keeper: ArgsKeeper) -> str:
+        """Prefix of checkpoints of the run for the day. Days of backfill run share `processed_dttm`, so the day is a part of it.
+
+        Colons of `processed_dttm` are not allowed in Hadoop paths.
+        """
+        return f"{keeper.tgt_path}/_checkpoints/{datamart}/date={keeper.date}/{keeper.processed_dttm.replace(':', '')}"  # type: ignore
+
+    def _checkpoint(
+        self,
+        build: Callable[[], pyspark.sql.DataFrame],
+        datamart: str,
+        stage: str,
+        keeper: ArgsKeeper,
+    ) -> pyspark.sql.DataFrame:
+        """Saves intermediate DataFrame of the job stage, so retry of the job with the same `processed_dttm` resumes from it.
+
+        If the stage was completed by previous attempt of the run, its saved result is read and `build` is not called at all, so eager actions of builder like skew profiling don't scan input again. Stage is completed when `_COMPLETED` marker is written next to its data, so partially written stage is computed again.
+
+        Returns result of `build` if `spark.checkpoints.enabled` is false in config.
+
+        ## Parameters
+        `build` : Function which returns DataFrame of the stage\n
+        `datamart` : Name of collecting datamart\n
+        `stage` : Name of the stage, unique within datamart\n
+        `keeper` : `ArgsKeeper` instance with arguments of the run
+
+        ## Returns
+        `pyspark.sql.DataFrame` : DataFrame read from the stage checkpoint
+
+        ## Raises
+        `S3ServiceError` : If `botocore.exceptions.ClientError` occured in runtime
+        """
+        if not self.config.get_checkpoints_config["enabled"]:
+            return build()
+
+        path = f"{self._get_checkpoint_path(datamart=datamart, keeper=keeper)}/{stage}"
+
+        if self.check_s3_object_existence(key=f"{path}/_COMPLETED", type="object"):
+            self.logger.info(f"Resuming from '{stage}' stage checkpoint -> {path}")
+
+            return self.spark.read.parquet(path)
+
+        self.logger.debug(f"Saving '{stage}' stage checkpoint -> {path}")
+
+        build().write.parquet(path=path, mode="overwrite")
+        self._put_s3_object(key=f"{path}/_COMPLETED", body=b"")
+
+        return self.spark.read.parquet(path)
+
+    def _clear_checkpoints(self, datamart: str, keeper: ArgsKeeper) -> ...:
+        """Deletes checkpoints of the run after datamart was written"""
+        if not self.config.get_checkpoints_config["enabled"]:
+            return
+
+        path = self._get_checkpoint_path(datamart=datamart, keeper=keeper)
+
+        self.logger.debug(
+            f"{self._delete_s3_objects(key=path)} checkpoint objects deleted -> {path}"
+        )
+
     def _compute_distances(
         self, df: pyspark.sql.DataFrame, coord_cols_prefix: Tuple[str, str]
     ) -> pyspark.sql.DataFrame:
@@ -135,6 +318,8 @@ class DatamartCollector(SparkRunner):
     def _get_cities_coords_df(self, keeper: ArgsKeeper) -> pyspark.sql.DataFrame:
         """Gets DataFrame with cities coordinates and other data.
 
+        Dictionary is cached for the session, see `_load_cities`.
+
         ## Parameters
         `keeper` : `ArgsKeeper`
             Instance with arguments for the job.
@@ -160,10 +345,116 @@ class DatamartCollector(SparkRunner):
         |     10| Wollongong|-34.4331|150.8831|   Australia/Sydney|
         +-------+-----------+--------+--------+-------------------+
         """
-        self.logger.debug(
-            f"Getting cities coordinates dataframe from S3 paths -> {keeper.coords_path}"
+        return self._load_cities(keeper=keeper)[2]
+
+    def _get_cities_broadcast(self, keeper: ArgsKeeper) -> Broadcast:
+        """Returns rows of cities dictionary broadcasted to executors as list of dicts"""
+        return self._load_cities(keeper=keeper)[3]
+
+    def _load_cities(
+        self, keeper: ArgsKeeper
+    ) -> Tuple[str, float, pyspark.sql.DataFrame, Broadcast]:
+        """Returns cities dictionary cached for the session.
+
+        Dictionary is read from S3 once and kept both as in-memory dataframe and broadcast variable.
+        ETag of `keeper.coords_path` is checked not more often than once in `max_staleness` secs
+        of `spark.dictionaries` config section and dictionary is read again only if it changed.
+
+        ## Raises
+        `S3ServiceError` : If unable to list `keeper.coords_path` on S3
+        """
+        from pyspark import StorageLevel  # type: ignore
+
+        path: str = keeper.coords_path  # type: ignore
+        cached = self._cities.get(path)
+        now = time.monotonic()
+
+        if (
+            cached is not None
+            and now - cached[1] < self.config.get_dictionaries_config["max_staleness"]
+        ):
+            return cached
+
+        etag = self.get_s3_etag(key=path)
+
+        if cached is not None and cached[0] == etag:
+            self.logger.debug("Cities coordinates dictionary not changed")
+
+            self._cities[path] = (etag, now, cached[2], cached[3])
+            return self._cities[path]
+
+        self.logger.debug(f"Loading cities coordinates dictionary from -> {path}")
+
+        sdf = self.spark.read.parquet(path)
+        rows = sdf.collect()
+
+        self._cities[path] = (
+            etag,
+            now,
+            self.spark.createDataFrame(rows, schema=sdf.schema).persist(
+                storageLevel=StorageLevel.MEMORY_ONLY
+            ),
+            self.spark.sparkContext.broadcast([_.asDict() for _ in rows]),
+        )
+        if cached is not None:
+            cached[2].unpersist()
+            cached[3].unpersist()
+
+        self.logger.debug(f"Done. {len(rows)} cities loaded")
+
+        return self._cities[path]
+
+    def uncache_cities(self) -> ...:
+        """Frees cities dictionaries cached by `_get_cities_coords_df`"""
+        for _, _, sdf, broadcast in self._cities.values():
+            sdf.unpersist()
+            broadcast.unpersist()
+
+        self._cities.clear()
+
+    def _get_utc_offsets_df(self, keeper: ArgsKeeper) -> pyspark.sql.DataFrame:
+        """Returns periods of constant UTC offset of cities timezones within the job window.
+
+        Offsets are computed on driver once per call instead of resolving timezone for each row.
+
+        ## Parameters
+        `keeper` : `ArgsKeeper`
+            Instance with arguments for the job.
+
+        ## Returns
+        `pyspark.sql.DataFrame` :
+            DataFrame with `city_id`, `valid_from`, `valid_to` and `utc_offset` columns. Period bounds are UTC epoch seconds, `valid_to` is exclusive. Offset is in seconds.
+        """
+        from pyspark.sql.types import IntegerType, LongType, StructField, StructType
+
+        start, end = self._get_window(keeper=keeper)
+        cities = self._get_cities_broadcast(keeper=keeper).value
+
+        periods = get_utc_offsets(
+            timezones=(_["timezone"] for _ in cities), start=start, end=end
+        )
+
+        return self.spark.createDataFrame(
+            [
+                (city["city_id"], valid_from, valid_to, offset)
+                for city in cities
+                for timezone, valid_from, valid_to, offset in periods
+                if timezone == city["timezone"]
+            ],
+            schema=StructType(
+                [
+                    StructField(
+                        "city_id",
+                        self._get_cities_coords_df(keeper=keeper)
+                        .schema["city_id"]
+                        .dataType,
+                    ),
+                    StructField("valid_from", LongType(), nullable=False),
+                    StructField("valid_to", LongType(), nullable=False),
+                    StructField("utc_offset", IntegerType(), nullable=False),
+                ]
+            ),
         )
-        return self.spark.read.parquet(keeper.coords_path)  # type: ignore
 
     def _add_event_location_to_df(
         self,
@@ -272,7 +563,7 @@ class DatamartCollector(SparkRunner):
         root
         |-- user_id: long (nullable = true)
         |-- message_id: long (nullable = true)
-        |-- msg_ts: string (nullable = true)
+        |-- msg_ts: timestamp (nullable = true)
         |-- city_name: string (nullable = true)
         |-- act_city: string (nullable = true)
         |-- act_city_id: integer (nullable = true)
@@ -295,34 +586,22 @@ class DatamartCollector(SparkRunner):
         self.logger.debug("Collecting dataframe of users actual data")
 
         import pyspark.sql.functions as F  # type: ignore
-        from pyspark.sql import Window as W  # type: ignore
+        from pyspark.sql.types import StructField, StructType  # type: ignore
 
-        src_paths = self._get_src_paths(event_type="message", keeper=keeper)
-        events_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*src_paths)
-        )
+        events_sdf = self._read_events_df(event_type="message", keeper=keeper)
 
         self.logger.debug("Processing messages data")
 
-        sdf = (
-            events_sdf.where(events_sdf.message_from.isNotNull())
-            .select(
-                events_sdf.message_from.alias("user_id"),
-                events_sdf.message_id,
-                events_sdf.message_ts,
-                events_sdf.datetime,
-                events_sdf.lat.alias("event_lat"),
-                events_sdf.lon.alias("event_lon"),
-            )
-            .withColumn(
-                "msg_ts",
-                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
-                    F.col("datetime")
-                ),
-            )
-            .drop("message_ts", "datetime")
+        sdf = events_sdf.where(events_sdf.message_from.isNotNull()).select(
+            events_sdf.message_from.alias("user_id"),
+            events_sdf.message_id,
+            events_sdf.event_ts.alias("msg_ts"),
+            events_sdf.lat.alias("event_lat"),
+            events_sdf.lon.alias("event_lon"),
+        )
+        # profiled before cities are joined, frequencies of users are the same
+        profile = self._get_skew_profiler().profile(
+            sdf=sdf, key="user_id", stage="users-actual-data"
         )
         cities_coords_sdf = self._get_cities_coords_df(keeper=keeper)
 
@@ -334,34 +613,50 @@ class DatamartCollector(SparkRunner):
 
         self.logger.debug("Preparing users actual data results")
 
-        w = W().partitionBy("user_id").orderBy(F.desc("msg_ts"))
+        def _add_last_message_city(pdf: pd.DataFrame) -> pd.DataFrame:
+            keys = pdf["user_id"].to_numpy()
 
-        sdf = (
-            sdf.withColumn(
-                "act_city",
-                F.first(col="city_name", ignorenulls=True).over(w),
-            )
-            .withColumn(
-                "act_city_id",
-                F.first(col="city_id", ignorenulls=True).over(w),
+            return pdf.assign(
+                act_city=last_value(keys, pdf["city_name"].to_numpy()),
+                act_city_id=last_value(keys, pdf["city_id"].to_numpy()),
+                last_msg_ts=last_value(keys, pdf["msg_ts"].to_numpy()),
             )
-            .withColumn(
-                "last_msg_ts",
-                F.first(col="msg_ts", ignorenulls=True).over(w),
+
+        sdf = (
+            self._get_timeline_engine()
+            .apply(
+                sdf=sdf,
+                kernel=_add_last_message_city,
+                schema=StructType(
+                    sdf.schema.fields
+                    + [
+                        StructField("act_city", sdf.schema["city_name"].dataType),
+                        StructField("act_city_id", sdf.schema["city_id"].dataType),
+                        StructField("last_msg_ts", sdf.schema["msg_ts"].dataType),
+                    ]
+                ),
+                order_by=["msg_ts"],
+                profile=profile,
             )
             .drop("city_id")
         )
 
+        # local time is UTC time shifted by offset of city timezone at that moment
+        offsets_sdf = self._get_utc_offsets_df(keeper=keeper)
+        epoch = F.col("last_msg_ts").cast("long")
+
         return (
             sdf.join(
-                cities_coords_sdf.select("city_id", "timezone"),
-                on=F.col("act_city_id") == cities_coords_sdf.city_id,
+                F.broadcast(offsets_sdf),
+                on=(F.col("act_city_id") == offsets_sdf.city_id)
+                & (epoch >= offsets_sdf.valid_from)
+                & (epoch < offsets_sdf.valid_to),
                 how="left",
             )
             .withColumn(
                 "local_time",
-                F.from_utc_timestamp(
-                    timestamp=F.col("last_msg_ts"), tz=F.col("timezone")
+                (F.col("last_msg_ts").cast("double") + F.col("utc_offset")).cast(
+                    "timestamp"
                 ),
             )
             .select(
@@ -375,12 +670,226 @@ class DatamartCollector(SparkRunner):
             )
         )
 
-    def collect_users_demographic_dm(self, keeper: ArgsKeeper) -> ...:
+    def _write_datamart(
+        self,
+        sdf: pyspark.sql.DataFrame,
+        datamart: str,
+        keeper: ArgsKeeper,
+        partition_date: str | None = None,
+    ) -> ...:
+        """Writes datamart to `date=<partition_date>` partition of `tgt_path`, overwriting existing results.
+
+        Partition is the date of `processed_dttm` if `partition_date` not given.
+
+        Datamarts with keys in `spark.outputs.layout` section of config are range partitioned into several files
+        and sorted by keys, and `_index.json` with range of keys of each file is written next to them. Others are written as one file.
+        """
+        from pyspark.sql.utils import AnalysisException  # type: ignore
+
+        self.logger.info("Writing results")
+
+        partition_date = (
+            partition_date
+            or datetime.strptime(
+                keeper.processed_dttm.replace("T", " "), r"%Y-%m-%d %H:%M:%S"  # type: ignore
+            )
+            .date()
+            .isoformat()
+        )
+
+        OUTPUT_PATH = f"{keeper.tgt_path}/{datamart}/date={partition_date}"
+
+        _OUTPUTS = self.config.get_outputs_config
+        keys = (
+            tuple(_OUTPUTS["layout"].get(datamart) or ()) if _OUTPUTS["enabled"] else ()
+        )
+
+        writer = sdf.repartition(1).write
+
+        if keys:
+            self.logger.debug(
+                f"Datamart is sorted by {keys} and split into {_OUTPUTS['files']} files"
+            )
+            # parquet statistics and column indexes let readers skip row groups and pages by keys
+            writer = (
+                sdf.repartitionByRange(_OUTPUTS["files"], *keys)
+                .sortWithinPartitions(*keys)
+                .write.options(**_OUTPUTS["options"])
+            )
+
+        try:
+            writer.parquet(
+                path=OUTPUT_PATH,
+                mode="errorifexists",
+            )
+            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
+
+        except AnalysisException as err:
+            self.logger.warning(f"Notice that {str(err)}")
+            self.logger.info("Overwriting...")
+
+            writer.parquet(
+                path=OUTPUT_PATH,
+                mode="overwrite",
+            )
+            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
+
+        if keys:
+            self._write_datamart_index(path=OUTPUT_PATH, keys=keys)
+
+    def _write_datamart_index(self, path: str, keys: Tuple[str, ...]) -> ...:
+        """Writes `_index.json` with range of `keys` of each file of datamart written to `path`.
+
+        Files are range partitioned by keys, so lookup of key reads only files which range covers it.
+
+        ## Examples
+        Index of `events-total-cnt-agg-wk-mnth-dm` datamart:
+        >>> {
+        ...     "keys": ["zone_id", "week"],
+        ...     "files": [
+        ...         {"path": "part-00000-...c000.snappy.parquet", "rows": 212, "min": [1, "2022-03-28"], "max": [4, "2022-04-25"]},
+        ...         ...
+        ...     ],
+        ... }
+        """
+        import json
+
+        import pyspark.sql.functions as F  # type: ignore
+
+        # only key columns are read
+        files = (
+            self.spark.read.parquet(path)
+            .select(F.input_file_name().alias("file"), F.struct(*keys).alias("key"))
+            .groupby("file")
+            .agg(
+                F.count(F.lit(1)).alias("rows"),
+                F.min("key").alias("min"),
+                F.max("key").alias("max"),
+            )
+            .orderBy("min")
+            .collect()
+        )
+
+        index = dict(
+            keys=list(keys),
+            files=[
+                dict(
+                    path=row["file"].rsplit(sep="/", maxsplit=1)[-1],
+                    rows=row["rows"],
+                    min=list(row["min"]),
+                    max=list(row["max"]),
+                )
+                for row in files
+            ],
+        )
+
+        self._put_s3_object(
+            key=f"{path}/_index.json",
+            body=json.dumps(index, default=str).encode(),
+        )
+        self.logger.debug(f"Index of {len(files)} files -> {path}/_index.json")
+
+    def _collect(
+        self,
+        datamart: str,
+        build: Callable[..., pyspark.sql.DataFrame],
+        keeper: ArgsKeeper,
+        partition_date: str | None = None,
+    ) -> ...:
+        """Builds datamart with `build` method and writes it.
+
+        ## Parameters
+        `datamart` : Name of datamart\n
+        `build` : One of `_build_*_df` methods\n
+        `keeper` : `ArgsKeeper` instance with arguments for the job\n
+        `partition_date` : Date of output partition, date of `keeper.processed_dttm` by default
+        """
+        self.logger.info(f"Starting collecting '{datamart}'")
+        _job_start = datetime.now()
+
+        try:
+            sdf = build(keeper=keeper, datamart=datamart)
+
+            self.logger.info(f"Datamart '{datamart}' collected!")
+
+            self._write_datamart(
+                sdf=sdf, datamart=datamart, keeper=keeper, partition_date=partition_date
+            )
+        finally:
+            self._release()
+
+        self._clear_checkpoints(datamart=datamart, keeper=keeper)
+
+        _job_end = datetime.now()
+        self.logger.info(f"Job execution time: {_job_end - _job_start}")
+
+    def _release(self) -> ...:
+        """Frees dataframes and broadcasts which builders registered in `_releases`"""
+        while self._releases:
+            self._releases.pop()()
+
+    def _get_travels_df(self, df: pyspark.sql.DataFrame) -> pyspark.sql.DataFrame:
+        """Collects cities visited by each user one after another and determines home city of user.
+
+        Home city is the earliest city where user stayed for more than 27 days before the next travel.
+
+        Timeline of each user is sorted once: visits are found with one window pass and
+        home city is taken from the collected array of visits without exploding it back into rows.
+
+        ## Parameters
+        `df` : `pyspark.sql.DataFrame`
+            DataFrame returned by `_get_users_actual_data_df` function.
+
+        ## Returns
+        `pyspark.sql.DataFrame` :
+            DataFrame with `user_id`, `travel_array`, `travel_count` and `home_city` columns. `travel_array` is ordered by time of visit, `home_city` is null if it couldn't be determined.
+        """
+        import pyspark.sql.functions as F  # type: ignore
+        from pyspark.sql import Window as W  # type: ignore
+
+        self.logger.debug("Collecting travels data")
+
+        w = W().partitionBy("user_id").orderBy(F.asc("msg_ts"))
+
+        # index of the first visit which came more than 27 days after the previous one
+        home_idx = F.expr(
+            "filter(sequence(1, greatest(size(visits) - 1, 1)), "
+            "i -> datediff(visits[i].msg_ts, visits[i - 1].msg_ts) > 27)[0]"
+        )
+
+        return (
+            df.withColumn(
+                "prev_city",
+                F.lag("city_name").over(w),
+            )
+            .where(
+                (F.col("city_name") != F.col("prev_city"))
+                | (F.col("prev_city").isNull())
+            )
+            .groupby("user_id")
+            .agg(
+                F.sort_array(F.collect_list(F.struct("msg_ts", "city_name"))).alias(
+                    "visits"
+                )
+            )
+            .select(
+                "user_id",
+                F.expr("transform(visits, v -> v.city_name)").alias("travel_array"),
+                F.size("visits").alias("travel_count"),
+                F.col("visits")[home_idx - 1]["city_name"].alias("home_city"),
+            )
+        )
+
+    def collect_users_demographic_dm(
+        self, keeper: ArgsKeeper, partition_date: str | None = None
+    ) -> ...:
         """Collects `users-demographic-dm` datamart.
 
         ## Parameters
         `keeper` : `ArgsKeeper`
             Instance with arguments for the job.
+        `partition_date` : `str`, optional
+            Date of output partition, date of `keeper.processed_dttm` by default. Backfill writes each day to its own partition.
 
         ## Examples
         >>> spark = DatamartCollector()
@@ -416,12 +925,24 @@ class DatamartCollector(SparkRunner):
         |    617|  Newcastle| Couldn't determine |2021-04-26 ... |           1|         [Newcastle]|
         +-------+-----------+--------------------+---------------+------------+--------------------+
         """
-        _DATAMART_NAME = "users-demographic-dm"
+        self._collect(
+            datamart="users-demographic-dm",
+            build=self._build_users_demographic_df,
+            keeper=keeper,
+            partition_date=partition_date,
+        )
 
-        self.logger.info(f"Starting collecting '{_DATAMART_NAME}'")
+    def _build_users_demographic_df(
+        self, keeper: ArgsKeeper, datamart: str
+    ) -> pyspark.sql.DataFrame:
+        """Builds `users-demographic-dm` datamart without writing it.
 
-        import pyspark.sql.functions as F
-        from pyspark.sql import Window as W
+        ## Parameters
+        `keeper` : `ArgsKeeper`
+            Instance with arguments for the job.
+        `datamart` : `str`
+            Name of datamart, prefix of its checkpoints.
+        """
         from pyspark.sql.types import (
             ArrayType,
             IntegerType,
@@ -431,89 +952,37 @@ class DatamartCollector(SparkRunner):
             StructType,
             TimestampType,
         )
-        from pyspark.sql.utils import AnalysisException
 
-        _job_start = datetime.now()
-
-        sdf = self._get_users_actual_data_df(keeper=keeper)
+        sdf = self._checkpoint(
+            build=lambda: self._get_users_actual_data_df(keeper=keeper),
+            datamart=datamart,
+            stage="users-actual-data",
+            keeper=keeper,
+        )
 
-        self.logger.debug("Collecting travels data")
+        travels_sdf = self._checkpoint(
+            build=lambda: self._get_travels_df(df=sdf),
+            datamart=datamart,
+            stage="travels",
+            keeper=keeper,
+        )
 
-        w = W().partitionBy("user_id").orderBy(F.asc("msg_ts"))
+        self.logger.debug("Preparing results")
 
-        travels_sdf = (
-            sdf.withColumn(
-                "prev_city",
-                F.lag("city_name").over(w),
-            )
-            .withColumn(
-                "visit_flg",
-                F.when(
-                    (F.col("city_name") != F.col("prev_city"))
-                    | (F.col("prev_city").isNull()),
-                    F.lit(1),
-                ).otherwise(F.lit(0)),
-            )
-            .where(F.col("visit_flg") == 1)
-            .groupby("user_id")
-            .agg(
-                F.collect_list("city_name").alias("travel_array"),
-                F.collect_list("msg_ts").alias("travel_ts_array"),
-            )
+        sdf = (
+            sdf.drop_duplicates(subset=["user_id"])
+            .join(travels_sdf, how="left", on="user_id")
             .select(
                 "user_id",
+                "act_city",
+                "home_city",
+                "local_time",
+                "travel_count",
                 "travel_array",
-                F.size("travel_array").alias("travel_count"),
-                "travel_ts_array",
             )
         )
 
-        self.logger.debug("Collecting users home city")
-
-        w = W().partitionBy("user_id").orderBy(F.asc("travel_ts"))
-
-        home_city_sdf = (
-            travels_sdf.withColumn(
-                "zipped_array", F.arrays_zip("travel_array", "travel_ts_array")
-            )
-            .withColumn("upzipped_array", F.explode("zipped_array"))
-            .withColumn("travel_city", F.col("upzipped_array").getItem("travel_array"))
-            .withColumn("travel_ts", F.col("upzipped_array").getItem("travel_ts_array"))
-            .withColumn(
-                "prev_travel_ts",
-                F.lag("travel_ts").over(w),
-            )
-            .withColumn(
-                "prev_travel_city",
-                F.lag("travel_city").over(w),
-            )
-            .withColumn("diff", F.datediff("travel_ts", "prev_travel_ts"))
-            .where(F.col("diff") > 27)
-            .withColumn(
-                "rnk",
-                F.row_number().over(w),
-            )
-            .where(F.col("rnk") == 1)
-            .select("user_id", F.col("prev_travel_city").alias("home_city"))
-        )
-
-        self.logger.debug("Preparing results")
-
-        sdf = (
-            sdf.drop_duplicates(subset=["user_id"])
-            .join(travels_sdf, how="left", on="user_id")
-            .join(home_city_sdf, how="left", on="user_id")
-            .select(
-                "user_id",
-                "act_city",
-                "home_city",
-                "local_time",
-                "travel_count",
-                "travel_array",
-            )
-        )
-
-        sdf = sdf.fillna(value="Couldn't determine", subset="home_city")
+        sdf = sdf.fillna(value="Couldn't determine", subset="home_city")
 
         _SCHEMA = StructType(
             [
@@ -526,45 +995,18 @@ class DatamartCollector(SparkRunner):
             ]
         )
 
-        sdf = self.spark.createDataFrame(sdf.rdd, schema=_SCHEMA)
-
-        sdf.show(100)
-
-        self.logger.info(f"Datamart '{_DATAMART_NAME}' collected!")
-
-        self.logger.info("Writing results")
-
-        _PROCESSED_DT = datetime.strptime(
-            keeper.processed_dttm.replace("T", " "), r"%Y-%m-%d %H:%M:%S"  # type: ignore
-        ).date()
-
-        OUTPUT_PATH = f"{keeper.tgt_path}/{_DATAMART_NAME}/date={_PROCESSED_DT}"
-
-        try:
-            sdf.repartition(1).write.parquet(
-                path=OUTPUT_PATH,
-                mode="errorifexists",
-            )
-            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
-
-        except AnalysisException as err:
-            self.logger.warning(f"Notice that {str(err)}")
-            self.logger.info("Overwriting...")
-            sdf.repartition(1).write.parquet(
-                path=OUTPUT_PATH,
-                mode="overwrite",
-            )
-            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
-
-        _job_end = datetime.now()
-        self.logger.info(f"Job execution time: {_job_end - _job_start}")
+        return self.spark.createDataFrame(sdf.rdd, schema=_SCHEMA)
 
-    def collect_events_total_cnt_agg_wk_mnth_dm(self, keeper: ArgsKeeper) -> ...:
+    def collect_events_total_cnt_agg_wk_mnth_dm(
+        self, keeper: ArgsKeeper, partition_date: str | None = None
+    ) -> ...:
         """Collects `events-total-cnt-agg-wk-mnth-dm` datamart.
 
         ## Parameters
         `keeper` : `ArgsKeeper`
             Instance with arguments for the job.
+        `partition_date` : `str`, optional
+            Date of output partition, date of `keeper.processed_dttm` by default. Backfill writes each day to its own partition.
 
         ## Examples
         >>> spark = DatamartCollector()
@@ -603,11 +1045,24 @@ class DatamartCollector(SparkRunner):
         |3      |2022-03-28|2022-03-01|160         |181          |16878            |148      |1190         |1068          |99175             |1121      |
         +-------+----------+----------+------------+-------------+-----------------+---------+-------------+--------------+------------------+----------+
         """
-        _DATAMART_NAME = "events-total-cnt-agg-wk-mnth-dm"
+        self._collect(
+            datamart="events-total-cnt-agg-wk-mnth-dm",
+            build=self._build_events_total_cnt_agg_wk_mnth_df,
+            keeper=keeper,
+            partition_date=partition_date,
+        )
 
-        self.logger.info(f"Staring collecting '{_DATAMART_NAME}'")
-        _job_start = datetime.now()
+    def _build_events_total_cnt_agg_wk_mnth_df(
+        self, keeper: ArgsKeeper, datamart: str
+    ) -> pyspark.sql.DataFrame:
+        """Builds `events-total-cnt-agg-wk-mnth-dm` datamart without writing it.
 
+        ## Parameters
+        `keeper` : `ArgsKeeper`
+            Instance with arguments for the job.
+        `datamart` : `str`
+            Name of datamart, prefix of its checkpoints.
+        """
         import pyspark.sql.functions as F
         from pyspark.sql import Window as W
         from pyspark.sql.types import (
@@ -617,7 +1072,6 @@ class DatamartCollector(SparkRunner):
             StructField,
             StructType,
         )
-        from pyspark.sql.utils import AnalysisException
         from pyspark.storagelevel import StorageLevel
 
         cities_coords_sdf = self._get_cities_coords_df(keeper=keeper).persist(
@@ -626,193 +1080,194 @@ class DatamartCollector(SparkRunner):
 
         _W = W().partitionBy(F.col("zone_id"), F.col("month"))
 
-        self.logger.debug("Collecing messages data")
-
-        src_paths = self._get_src_paths(keeper=keeper, event_type="message")
-        messages_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*src_paths)
-        )
+        def _get_zoned_messages_df() -> pyspark.sql.DataFrame:
+            self.logger.debug("Collecing messages data")
+
+            messages_sdf = self._read_events_df(event_type="message", keeper=keeper)
+
+            messages_sdf = (
+                messages_sdf.where(F.col("message_from").isNotNull())
+                .select(
+                    F.col("message_from").alias("user_id"),
+                    F.col("message_id"),
+                    F.col("event_ts").alias("msg_ts"),
+                    F.col("lat").alias("event_lat"),
+                    F.col("lon").alias("event_lon"),
+                )
+                .drop_duplicates(subset=["user_id", "message_id", "msg_ts"])
+            )
 
-        messages_sdf = (
-            messages_sdf.where(F.col("message_from").isNotNull())
-            .select(
-                F.col("message_from").alias("user_id"),
-                F.col("message_id"),
-                F.col("message_ts"),
-                F.col("datetime"),
-                F.col("lat").alias("event_lat"),
-                F.col("lon").alias("event_lon"),
+            messages_sdf = self._add_event_location_to_df(
+                df=messages_sdf,
+                cities_coord_df=cities_coords_sdf,
+                event="message",
             )
-            .withColumn(
-                "msg_ts",
-                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
-                    F.col("datetime")
-                ),
+
+            messages_sdf = (
+                messages_sdf.withColumnRenamed("city_id", "zone_id")
+                .withColumn("week", F.trunc(F.col("msg_ts"), "week"))
+                .withColumn("month", F.trunc(F.col("msg_ts"), "month"))
+                .groupby("month", "week", "zone_id")
+                .agg(F.count("message_id").alias("week_message"))
+                .withColumn(
+                    "month_message",
+                    F.sum(F.col("week_message")).over(_W),
+                )
             )
-            .drop_duplicates(subset=["user_id", "message_id", "msg_ts"])
-            .drop("datetime", "message_ts")
-        )
 
-        messages_sdf = self._add_event_location_to_df(
-            df=messages_sdf,
-            cities_coord_df=cities_coords_sdf,
-            event="message",
-        )
+            return messages_sdf
+
+        messages_sdf = self._checkpoint(
+            build=_get_zoned_messages_df,
+            datamart=datamart,
+            stage="zoned-messages",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
+
+        def _get_zoned_reactions_df() -> pyspark.sql.DataFrame:
+            self.logger.debug("Collecing reacitons data")
+
+            reaction_sdf = self._read_events_df(event_type="reaction", keeper=keeper)
+
+            reaction_sdf = (
+                reaction_sdf.select(
+                    F.col("event_ts"),
+                    F.col("message_id"),
+                    F.col("reaction_from").alias("user_id"),
+                    F.col("lat").alias("event_lat"),
+                    F.col("lon").alias("event_lon"),
+                )
+                .drop_duplicates(subset=["user_id", "message_id", "event_ts"])
+                .where(F.col("event_lat").isNotNull())
+            )
+            reaction_sdf = self._add_event_location_to_df(
+                df=reaction_sdf,
+                cities_coord_df=cities_coords_sdf,
+                event="reaction",
+            )
 
-        messages_sdf = (
-            messages_sdf.withColumnRenamed("city_id", "zone_id")
-            .withColumn("week", F.trunc(F.col("msg_ts"), "week"))
-            .withColumn("month", F.trunc(F.col("msg_ts"), "month"))
-            .groupby("month", "week", "zone_id")
-            .agg(F.count("message_id").alias("week_message"))
-            .withColumn(
-                "month_message",
-                F.sum(F.col("week_message")).over(_W),
+            reaction_sdf = (
+                reaction_sdf.withColumnRenamed("city_id", "zone_id")
+                .where(F.col("event_lat").isNotNull())
+                .withColumn("week", F.trunc(F.col("event_ts"), "week"))
+                .withColumn("month", F.trunc(F.col("event_ts"), "month"))
+                .groupby("month", "week", "zone_id")
+                .agg(F.count("message_id").alias("week_reaction"))
+                .withColumn(
+                    "month_reaction",
+                    F.sum(F.col("week_reaction")).over(_W),
+                )
             )
-            .persist(storageLevel=StorageLevel.MEMORY_ONLY)
-        )
 
-        self.logger.debug("Collecing reacitons data")
+            return reaction_sdf
 
-        src_paths = self._get_src_paths(keeper=keeper, event_type="reaction")
-        reaction_sdf = self.spark.read.parquet(*src_paths)
-        reaction_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*src_paths)
-        )
+        reaction_sdf = self._checkpoint(
+            build=_get_zoned_reactions_df,
+            datamart=datamart,
+            stage="zoned-reactions",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
 
-        reaction_sdf = (
-            reaction_sdf.select(
-                F.col("datetime"),
-                F.col("message_id"),
-                F.col("reaction_from").alias("user_id"),
-                F.col("lat").alias("event_lat"),
-                F.col("lon").alias("event_lon"),
-            )
-            .drop_duplicates(subset=["user_id", "message_id", "datetime"])
-            .where(F.col("event_lat").isNotNull())
-        )
-        reaction_sdf = self._add_event_location_to_df(
-            df=reaction_sdf,
-            cities_coord_df=cities_coords_sdf,
-            event="reaction",
-        )
+        def _get_zoned_registrations_df() -> pyspark.sql.DataFrame:
+            self.logger.debug("Collecing registrations data")
 
-        reaction_sdf = (
-            reaction_sdf.withColumnRenamed("city_id", "zone_id")
-            .where(F.col("event_lat").isNotNull())
-            .withColumn("week", F.trunc(F.col("datetime"), "week"))
-            .withColumn("month", F.trunc(F.col("datetime"), "month"))
-            .groupby("month", "week", "zone_id")
-            .agg(F.count("message_id").alias("week_reaction"))
-            .withColumn(
-                "month_reaction",
-                F.sum(F.col("week_reaction")).over(_W),
+            registrations_sdf = self._read_events_df(
+                event_type="message", keeper=keeper
             )
-            .persist(storageLevel=StorageLevel.MEMORY_ONLY)
-        )
-
-        self.logger.debug("Collecing registrations data")
-
-        src_paths = self._get_src_paths(keeper=keeper, event_type="message")
-        registrations_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*src_paths)
-        )
-        w = W().partitionBy("user_id").orderBy(F.asc("msg_ts"))
 
-        registrations_sdf = (
-            registrations_sdf.where(F.col("message_from").isNotNull())
-            .select(
-                F.col("message_from").alias("user_id"),
-                F.col("message_id"),
-                F.col("message_ts"),
-                F.col("datetime"),
-                F.col("lat").alias("event_lat"),
-                F.col("lon").alias("event_lon"),
+            registrations_sdf = (
+                registrations_sdf.where(F.col("message_from").isNotNull())
+                .select(
+                    F.col("message_from").alias("user_id"),
+                    F.col("message_id"),
+                    F.col("event_ts").alias("msg_ts"),
+                    F.col("lat").alias("event_lat"),
+                    F.col("lon").alias("event_lon"),
+                )
+                .drop_duplicates(subset=["user_id", "message_id", "msg_ts"])
             )
-            .withColumn(
-                "msg_ts",
-                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
-                    F.col("datetime")
+            # registration is the first message of user
+            registrations_sdf = self._get_timeline_engine().apply(
+                sdf=registrations_sdf,
+                kernel=keep_first,
+                schema=registrations_sdf.schema,
+                order_by=["msg_ts"],
+                profile=self._get_skew_profiler().profile(
+                    sdf=registrations_sdf, key="user_id", stage="registrations"
                 ),
             )
-            .drop_duplicates(subset=["user_id", "message_id", "msg_ts"])
-            .drop("datetime", "message_ts")
-            .withColumn(
-                "registration_ts", F.first(col="msg_ts", ignorenulls=True).over(w)
+            registrations_sdf = self._add_event_location_to_df(
+                df=registrations_sdf,
+                cities_coord_df=cities_coords_sdf,
+                event="registration",
             )
-            .withColumn(
-                "is_reg",
-                F.when(F.col("registration_ts") == F.col("msg_ts"), F.lit(1)).otherwise(
-                    F.lit(0)
-                ),
-            )
-            .where(F.col("is_reg") == F.lit(1))
-            .drop("is_reg", "registration_ts")
-        )
-        registrations_sdf = self._add_event_location_to_df(
-            df=registrations_sdf,
-            cities_coord_df=cities_coords_sdf,
-            event="registration",
-        )
 
-        registrations_sdf = (
-            registrations_sdf.withColumnRenamed("city_id", "zone_id")
-            .where(F.col("event_lat").isNotNull())
-            .withColumn("week", F.trunc(F.col("msg_ts"), "week"))
-            .withColumn("month", F.trunc(F.col("msg_ts"), "month"))
-            .groupby("month", "week", "zone_id")
-            .agg(F.count("user_id").alias("week_user"))
-            .withColumn(
-                "month_user",
-                F.sum(F.col("week_user")).over(_W),
+            registrations_sdf = (
+                registrations_sdf.withColumnRenamed("city_id", "zone_id")
+                .where(F.col("event_lat").isNotNull())
+                .withColumn("week", F.trunc(F.col("msg_ts"), "week"))
+                .withColumn("month", F.trunc(F.col("msg_ts"), "month"))
+                .groupby("month", "week", "zone_id")
+                .agg(F.count("user_id").alias("week_user"))
+                .withColumn(
+                    "month_user",
+                    F.sum(F.col("week_user")).over(_W),
+                )
             )
-            .persist(storageLevel=StorageLevel.MEMORY_ONLY)
-        )
 
-        self.logger.debug("Collecing subscriptions data")
+            return registrations_sdf
 
-        src_paths = self._get_src_paths(keeper=keeper, event_type="subscription")
-        subscriptions_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*src_paths)
-        )
+        registrations_sdf = self._checkpoint(
+            build=_get_zoned_registrations_df,
+            datamart=datamart,
+            stage="zoned-registrations",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
+
+        def _get_zoned_subscriptions_df() -> pyspark.sql.DataFrame:
+            self.logger.debug("Collecing subscriptions data")
 
-        subscriptions_sdf = (
-            subscriptions_sdf.select(
-                F.col("datetime"),
-                F.col("subscription_channel"),
-                F.col("user").alias("user_id"),
-                F.col("lat").alias("event_lat"),
-                F.col("lon").alias("event_lon"),
+            subscriptions_sdf = self._read_events_df(
+                event_type="subscription", keeper=keeper
             )
-            .drop_duplicates(subset=["user_id", "subscription_channel", "datetime"])
-            .where(F.col("event_lat").isNotNull())
-        )
 
-        subscriptions_sdf = self._add_event_location_to_df(
-            df=subscriptions_sdf,
-            cities_coord_df=cities_coords_sdf,
-            event="subscription",
-        )
-        subscriptions_sdf = (
-            subscriptions_sdf.withColumnRenamed("city_id", "zone_id")
-            .where(F.col("event_lat").isNotNull())
-            .withColumn("week", F.trunc(F.col("datetime"), "week"))
-            .withColumn("month", F.trunc(F.col("datetime"), "month"))
-            .groupby("month", "week", "zone_id")
-            .agg(F.count("user_id").alias("week_subscription"))
-            .withColumn(
-                "month_subscription", F.sum(F.col("week_subscription")).over(_W)
+            subscriptions_sdf = (
+                subscriptions_sdf.select(
+                    F.col("event_ts"),
+                    F.col("subscription_channel"),
+                    F.col("user").alias("user_id"),
+                    F.col("lat").alias("event_lat"),
+                    F.col("lon").alias("event_lon"),
+                )
+                .drop_duplicates(subset=["user_id", "subscription_channel", "event_ts"])
+                .where(F.col("event_lat").isNotNull())
+            )
+
+            subscriptions_sdf = self._add_event_location_to_df(
+                df=subscriptions_sdf,
+                cities_coord_df=cities_coords_sdf,
+                event="subscription",
+            )
+            subscriptions_sdf = (
+                subscriptions_sdf.withColumnRenamed("city_id", "zone_id")
+                .where(F.col("event_lat").isNotNull())
+                .withColumn("week", F.trunc(F.col("event_ts"), "week"))
+                .withColumn("month", F.trunc(F.col("event_ts"), "month"))
+                .groupby("month", "week", "zone_id")
+                .agg(F.count("user_id").alias("week_subscription"))
+                .withColumn(
+                    "month_subscription", F.sum(F.col("week_subscription")).over(_W)
+                )
             )
-            .persist(storageLevel=StorageLevel.MEMORY_ONLY)
-        )
+
+            return subscriptions_sdf
+
+        subscriptions_sdf = self._checkpoint(
+            build=_get_zoned_subscriptions_df,
+            datamart=datamart,
+            stage="zoned-subscriptions",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
 
         self.logger.debug("Joining dataframes")
 
@@ -862,191 +1317,327 @@ class DatamartCollector(SparkRunner):
                 StructField("month_user", LongType(), nullable=False),
             ]
         )
-        sdf = self.spark.createDataFrame(data=sdf.rdd, schema=_SCHEMA)
+        return self.spark.createDataFrame(data=sdf.rdd, schema=_SCHEMA)
 
-        self.logger.info(f"Datamart '{_DATAMART_NAME}' collected!")
+    def _get_graph_store(self, keeper: ArgsKeeper) -> SocialGraphStore:
+        """Returns `SocialGraphStore` kept in `social-graph` folder of `tgt_path`"""
+        return SocialGraphStore(
+            spark=self.spark, config=self.config, path=f"{keeper.tgt_path}/social-graph"
+        )
 
-        self.logger.info("Writing results")
+    def _has_graph_snapshot(
+        self,
+        store: SocialGraphStore,
+        graph: Literal["contacts", "subscriptions"],
+        date: date,
+    ) -> bool:
+        """Checks if graph snapshot of the day is completely written"""
+        return self.check_s3_object_existence(
+            key=f"{store.get_path(graph=graph, date=date)}/_SUCCESS", type="object"
+        )
 
-        processed_dt = datetime.strptime(
-            keeper.processed_dttm.replace("T", " "), r"%Y-%m-%d %H:%M:%S"  # type: ignore
-        ).date()
+    def _read_graph_df(
+        self, graph: Literal["contacts", "subscriptions"], keeper: ArgsKeeper
+    ) -> pyspark.sql.DataFrame | None:
+        """Returns edges of `graph` with events within window of `keeper` arguments.
 
-        OUTPUT_PATH = f"{keeper.tgt_path}/{_DATAMART_NAME}/date={processed_dt}"
+        Edges are taken from snapshot of the last day of window, see `update_social_graph`.
 
-        try:
-            sdf.repartition(1).write.parquet(
-                path=OUTPUT_PATH,
-                mode="errorifexists",
-            )
-            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
+        ## Returns
+        `pyspark.sql.DataFrame | None` : Edges with `first_seen` and `last_seen` columns. `None` if graph is disabled in config or there is no snapshot of the day, so edges should be collected from events
+        """
+        import pyspark.sql.functions as F  # type: ignore
 
-        except AnalysisException as err:
-            self.logger.warning(f"Notice that {str(err)}")
-            self.logger.info("Overwriting...")
-            sdf.repartition(1).write.parquet(
-                path=OUTPUT_PATH,
-                mode="overwrite",
+        if not self.config.get_graph_config["enabled"]:
+            return None
+
+        store = self._get_graph_store(keeper=keeper)
+        start, end = self._get_window(keeper=keeper)
+
+        if not self._has_graph_snapshot(store=store, graph=graph, date=end):
+            self.logger.warning(
+                f"No '{graph}' graph snapshot of {end} -> {store.get_path(graph=graph, date=end)}. Collecting edges from events"
             )
-            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
+            return None
 
-        _job_end = datetime.now()
-        self.logger.info(f"Job execution time: {_job_end - _job_start}")
+        self.logger.debug(f"Reading '{graph}' graph snapshot of {end}")
 
-    def collect_add_to_friends_recommendations_dm(self, keeper: ArgsKeeper) -> ...:
-        """Collects `add-to-friends-recommendations-dm` datamart.
+        # the last event of edge is within window
+        return store.read(graph=graph, date=end).where(
+            F.col("last_seen") >= F.lit(start)
+        )
+
+    def update_social_graph(
+        self, keeper: ArgsKeeper, partition_date: str | None = None
+    ) -> ...:
+        """Updates social graph with events of `keeper.date`.
+
+        Snapshot of the previous day is merged with events of the day. If there is no previous snapshot, graph is built from events of `keeper.depth` days. Snapshot of `spark.graph.keep_days` days ago is deleted.
 
         ## Parameters
         `keeper` : `ArgsKeeper`
             Instance with arguments for the job.
+        `partition_date` : `str`, optional
+            Not used, snapshot is always of `keeper.date`. Taken as by other job methods, see `JobRegistry`.
 
         ## Examples
         >>> spark = DatamartCollector()
         >>> spark.init_session(app_name="testing-app", spark_conf=conf, log4j_level="INFO")
+        >>> spark.update_social_graph(keeper=keeper)
 
-        Submit the job:
-        >>> spark.collect_add_to_friends_recommendations_dm(keeper=keeper)
+        Contacts of the last 10 days:
+        >>> sdf = spark._read_graph_df(graph="contacts", keeper=keeper.copy(update=dict(depth=10)))
+        """
+        self.logger.info(f"Starting updating social graph of {keeper.date}")
+        _job_start = datetime.now()
 
-        Read saved results to see how it looks:
-        >>> sdf = spark.read.parquet(keeper.tgt_path)
-        >>> sdf.show(100)
-        +-------+------------------+-------------------+-------+-------------------+
-        |user_id|rec_to_add_user_id|processed_dttm     |zone_id|local_time         |
-        +-------+------------------+-------------------+-------+-------------------+
-        |19741  |149989            |2023-05-22 12:03:25|10     |2022-04-17 19:52:54|
-        |39022  |110529            |2023-05-22 12:03:25|2      |2022-04-23 19:35:19|
-                                    ...
-        |100241 |110765            |2023-05-22 12:03:25|3      |2022-04-17 22:38:26|
-        |103047 |136494            |2023-05-22 12:03:25|9      |2022-04-27 00:21:41|
-        +-------+------------------+-------------------+-------+-------------------+
-        >>> sdf.printSchema()
-        root
-        |-- user_id: long (nullable = false)
-        |-- rec_to_add_user_id: long (nullable = false)
-        |-- processed_dttm: timestamp (nullable = false)
-        |-- zone_id: integer (nullable = false)
-        |-- local_time: timestamp (nullable = false)
+        store = self._get_graph_store(keeper=keeper)
+        _, end = self._get_window(keeper=keeper)
+        previous_date = end - timedelta(days=1)
+
+        for graph, event_type in (
+            ("contacts", "message"),
+            ("subscriptions", "subscription"),
+        ):
+            if self._has_graph_snapshot(store=store, graph=graph, date=previous_date):
+                previous = store.read(graph=graph, date=previous_date)
+                events_keeper = keeper.copy(update=dict(depth=1))
+            else:
+                self.logger.info(
+                    f"No '{graph}' graph snapshot of {previous_date}. Building graph from events of {keeper.depth} days"
+                )
+                previous, events_keeper = None, keeper
+
+            delta = store.get_delta(
+                graph=graph,
+                sdf=self._read_events_df(event_type=event_type, keeper=events_keeper),  # type: ignore
+            )
+            store.write(
+                sdf=store.merge(graph=graph, previous=previous, delta=delta),
+                graph=graph,
+                date=end,
+            )
+
+            path = store.get_path(
+                graph=graph,
+                date=end - timedelta(days=self.config.get_graph_config["keep_days"]),
+            )
+            if self.check_s3_object_existence(key=path, type="object"):
+                self.logger.debug(
+                    f"{self._delete_s3_objects(key=f'{path}/')} objects of outdated snapshot deleted -> {path}"
+                )
+
+        _job_end = datetime.now()
+        self.logger.info(f"Job execution time: {_job_end - _job_start}")
+
+    def _exclude_real_contacts(
+        self, pairs_sdf: pyspark.sql.DataFrame, contacts_sdf: pyspark.sql.DataFrame
+    ) -> pyspark.sql.DataFrame:
+        """Drops pairs of users which have written to each other.
+
+        Pairs are probed with Bloom filter of contacts broadcasted to executors. Pairs which are definitely
+        not contacts are kept map-side and only possible contacts go through exact anti-join,
+        so most pairs are not shuffled. Configured in `spark.bloom` section of config.
+
+        Contacts are counted and filter is built eagerly, so it must be called only from builder
+        of `candidate-pairs` stage passed to `_checkpoint`. Resumed run doesn't rebuild it then.
+
+        ## Parameters
+        `pairs_sdf` : `pyspark.sql.DataFrame`
+            DataFrame with `left_user` and `right_user` columns.
+        `contacts_sdf` : `pyspark.sql.DataFrame`
+            DataFrame with `user_id` and `contact_id` columns.
+
+        ## Returns
+        `pyspark.sql.DataFrame` :
+            Pairs which are not contacts.
         """
+        import pyspark.sql.functions as F  # type: ignore
+        from pyspark import StorageLevel  # type: ignore
+
+        def _exclude(sdf: pyspark.sql.DataFrame) -> pyspark.sql.DataFrame:
+            return sdf.join(
+                contacts_sdf,
+                on=[
+                    sdf.left_user == contacts_sdf.user_id,
+                    sdf.right_user == contacts_sdf.contact_id,
+                ],
+                how="left_anti",
+            )
 
-        _DATAMART_NAME = "add-to-friends-recommendations-dm"
+        _BLOOM = self.config.get_bloom_config
 
-        self.logger.info(f"Staring collecting '{_DATAMART_NAME}'")
-        _job_start = datetime.now()
+        if not _BLOOM["enabled"]:
+            return _exclude(pairs_sdf)
 
-        import pyspark.sql.functions as F
-        from pyspark.sql import Window as W
-        from pyspark.sql.types import (
-            IntegerType,
-            LongType,
-            StructField,
-            StructType,
-            TimestampType,
+        # contacts are counted, hashed into filter and joined, so read once.
+        # Kept until datamart is written, its lineage runs again if stage is not checkpointed
+        contacts_sdf = contacts_sdf.persist()
+        self._releases.append(contacts_sdf.unpersist)
+        items = contacts_sdf.count()
+
+        if not items:
+            return pairs_sdf
+
+        num_bits, _ = get_bloom_size(items=items, fpp=_BLOOM["fpp"])
+        if num_bits // 8 > _BLOOM["max_bytes"]:
+            self.logger.warning(
+                f"Bloom filter of {items} contacts takes {num_bits // 8} bytes, more than {_BLOOM['max_bytes']}. Excluding contacts by anti-join only"
+            )
+            return _exclude(pairs_sdf)
+
+        self.logger.debug(f"Building Bloom filter of {items} contacts")
+
+        bloom = PairBloomFilter.build(
+            spark=self.spark,
+            sdf=contacts_sdf,
+            cols=("user_id", "contact_id"),
+            items=items,
+            fpp=_BLOOM["fpp"],
         )
-        from pyspark.sql.utils import AnalysisException
+        self._releases.append(bloom.destroy)
+
+        # both branches are split from probed pairs, so pairs are computed and probed once
+        pairs_sdf = bloom.might_contain(
+            sdf=pairs_sdf, cols=("left_user", "right_user"), alias="_maybe_contact"
+        ).persist(storageLevel=StorageLevel.MEMORY_AND_DISK)
+        self._releases.append(pairs_sdf.unpersist)
 
-        messages_src_paths = self._get_src_paths(keeper=keeper, event_type="message")
-        real_contacts_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*messages_src_paths)
+        return (
+            pairs_sdf.where(~F.col("_maybe_contact"))
+            .drop("_maybe_contact")
+            .unionByName(
+                _exclude(
+                    pairs_sdf.where(F.col("_maybe_contact")).drop("_maybe_contact")
+                )
+            )
         )
 
+    def _get_candidate_pairs_df(self, keeper: ArgsKeeper) -> pyspark.sql.DataFrame:
+        """Collects pairs of users which may be recommended to each other.
+
+        Users are subscribed to the same channel, have never written to each other and last messages of both were sent within 1 km.
+
+        ## Parameters
+        `keeper` : `ArgsKeeper`
+            Instance with arguments for the job.
+
+        ## Returns
+        `pyspark.sql.DataFrame` :
+            DataFrame with `left_user` and `right_user` columns. Each pair is included in both directions.
+        """
+        import pyspark.sql.functions as F  # type: ignore
+
         self.logger.debug("Collecting dataframe with real contacts")
 
         # реальные контакты
-        real_contacts_sdf = (
-            real_contacts_sdf.where(F.col("message_to").isNotNull())
-            .select(
-                F.col("message_from"),
-                F.col("message_to"),
-            )
-            .withColumn(
-                "user_id",
-                F.explode(F.array(F.col("message_from"), F.col("message_to"))),
+        real_contacts_sdf = self._read_graph_df(graph="contacts", keeper=keeper)
+
+        if real_contacts_sdf is not None:
+            real_contacts_sdf = real_contacts_sdf.select("user_id", "contact_id")
+        else:
+            real_contacts_sdf = self._read_events_df(
+                event_type="message", keeper=keeper
             )
-            .withColumn(
-                "contact_id",
-                F.when(
-                    F.col("user_id") == F.col("message_from"), F.col("message_to")
-                ).otherwise(F.col("message_from")),
+            real_contacts_sdf = (
+                real_contacts_sdf.where(F.col("message_to").isNotNull())
+                .select(
+                    F.col("message_from"),
+                    F.col("message_to"),
+                )
+                .withColumn(
+                    "user_id",
+                    F.explode(F.array(F.col("message_from"), F.col("message_to"))),
+                )
+                .withColumn(
+                    "contact_id",
+                    F.when(
+                        F.col("user_id") == F.col("message_from"), F.col("message_to")
+                    ).otherwise(F.col("message_from")),
+                )
+                .select("user_id", "contact_id")
+                .distinct()
             )
-            .select("user_id", "contact_id")
-            .distinct()
-        )
 
         self.logger.debug("Collecting all users with subscriptions")
         #  все пользователи подписавшиеся на один из каналов (любой)
-        subscription_src_paths = self._get_src_paths(
-            keeper=keeper, event_type="subscription"
-        )
-        subs_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*subscription_src_paths)
-        )
+        profiler = self._get_skew_profiler()
+        subs_sdf = self._read_graph_df(graph="subscriptions", keeper=keeper)
+
+        if subs_sdf is not None:
+            self.logger.debug("Collecting users with the same subsctiptions only")
+            # snapshot is bucketed by channel, so self-join doesn't shuffle it
+            subs_sdf = subs_sdf.select("subscription_channel", "user_id")
+            subs_sdf = (
+                subs_sdf.withColumnRenamed("user_id", "left_user")
+                .join(
+                    subs_sdf.withColumnRenamed("user_id", "right_user"),
+                    on="subscription_channel",
+                    how="inner",
+                )
+                .where(F.col("left_user") != F.col("right_user"))
+            )
+        else:
+            subs_sdf = self._read_events_df(event_type="subscription", keeper=keeper)
+
+            subs_sdf = (
+                subs_sdf.where(F.col("subscription_channel").isNotNull())
+                .where(F.col("user").isNotNull())
+                .select(
+                    F.col("subscription_channel"),
+                    F.col("user").alias("user_id"),
+                )
+                .drop_duplicates(subset=["user_id", "subscription_channel"])
+            )
 
-        subs_sdf = (
-            subs_sdf.where(F.col("subscription_channel").isNotNull())
-            .where(F.col("user").isNotNull())
-            .select(
-                F.col("subscription_channel"),
-                F.col("user").alias("user_id"),
+            self.logger.debug("Collecting users with the same subsctiptions only")
+            # пользователи подписанные на один и тот же канал
+            profile = profiler.profile(
+                sdf=subs_sdf, key="subscription_channel", stage="same-channel-users"
             )
-            .drop_duplicates(subset=["user_id", "subscription_channel"])
-        )
 
-        self.logger.debug("Collecting users with the same subsctiptions only")
-        # пользователи подписанные на один и тот же канал
-        subs_sdf = (
-            subs_sdf.withColumnRenamed("user_id", "left_user")
-            .join(
-                subs_sdf.withColumnRenamed("user_id", "right_user"),
-                on="subscription_channel",
-                how="cross",
+            # pairs of popular channels are spread over several tasks by salt
+            subs_sdf = (
+                profiler.salt(sdf=subs_sdf, profile=profile, by="user_id")
+                .withColumnRenamed("user_id", "left_user")
+                .join(
+                    profiler.replicate(sdf=subs_sdf, profile=profile).withColumnRenamed(
+                        "user_id", "right_user"
+                    ),
+                    on=["subscription_channel", "_salt"],
+                    how="inner",
+                )
+                .drop("_salt")
+                .where(F.col("left_user") != F.col("right_user"))
             )
-            .where(F.col("left_user") != F.col("right_user"))
-        )
 
         self.logger.debug("Excluding real contacts")
         #  убрать пользователей которые переписывались
-        users_for_rec = subs_sdf.join(
-            real_contacts_sdf,
-            on=[
-                subs_sdf.left_user == real_contacts_sdf.user_id,
-                subs_sdf.right_user == real_contacts_sdf.contact_id,
-            ],
-            how="left_anti",
+        users_for_rec = self._exclude_real_contacts(
+            pairs_sdf=subs_sdf, contacts_sdf=real_contacts_sdf
         )
 
         self.logger.debug("Collecting last message coordinates dataframe")
         # все пользователи которые писали сообщения -> координаты последнего отправленого сообщения
-        messages_sdf = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(*messages_src_paths)
-        )
-        w = W().partitionBy("user_id").orderBy(F.asc("msg_ts"))
+        messages_sdf = self._read_events_df(event_type="message", keeper=keeper)
 
+        messages_sdf = messages_sdf.where(F.col("message_from").isNotNull()).select(
+            F.col("message_from").alias("user_id"),
+            F.col("event_ts").alias("msg_ts"),
+            F.col("lat").alias("event_lat"),
+            F.col("lon").alias("event_lon"),
+        )
         messages_sdf = (
-            messages_sdf.where(F.col("message_from").isNotNull())
-            .select(
-                F.col("message_from").alias("user_id"),
-                F.col("message_ts"),
-                F.col("datetime"),
-                F.col("lat").alias("event_lat"),
-                F.col("lon").alias("event_lon"),
-            )
-            .withColumn(
-                "msg_ts",
-                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
-                    F.col("datetime")
+            self._get_timeline_engine()
+            .apply(
+                sdf=messages_sdf,
+                kernel=keep_first,
+                schema=messages_sdf.schema,
+                order_by=["msg_ts"],
+                profile=profiler.profile(
+                    sdf=messages_sdf, key="user_id", stage="users-last-message"
                 ),
             )
-            .withColumn(
-                "last_msg_ts",
-                F.first(col="msg_ts", ignorenulls=True).over(w),
-            )
-            .where(F.col("msg_ts") == F.col("last_msg_ts"))
             .select("user_id", "event_lat", "event_lon")
             .distinct()
         )
@@ -1082,16 +1673,92 @@ class DatamartCollector(SparkRunner):
             df=users_for_rec, coord_cols_prefix=("left_user", "right_user")
         )
 
-        users_info_sdf = self._get_users_actual_data_df(keeper=keeper)
+        return sdf.where(sdf.distance <= 1).select("left_user", "right_user").distinct()
+
+    def collect_add_to_friends_recommendations_dm(
+        self, keeper: ArgsKeeper, partition_date: str | None = None
+    ) -> ...:
+        """Collects `add-to-friends-recommendations-dm` datamart.
+
+        ## Parameters
+        `keeper` : `ArgsKeeper`
+            Instance with arguments for the job.
+        `partition_date` : `str`, optional
+            Date of output partition, date of `keeper.processed_dttm` by default. Backfill writes each day to its own partition.
+
+        ## Examples
+        >>> spark = DatamartCollector()
+        >>> spark.init_session(app_name="testing-app", spark_conf=conf, log4j_level="INFO")
+
+        Submit the job:
+        >>> spark.collect_add_to_friends_recommendations_dm(keeper=keeper)
+
+        Read saved results to see how it looks:
+        >>> sdf = spark.read.parquet(keeper.tgt_path)
+        >>> sdf.show(100)
+        +-------+------------------+-------------------+-------+-------------------+
+        |user_id|rec_to_add_user_id|processed_dttm     |zone_id|local_time         |
+        +-------+------------------+-------------------+-------+-------------------+
+        |19741  |149989            |2023-05-22 12:03:25|10     |2022-04-17 19:52:54|
+        |39022  |110529            |2023-05-22 12:03:25|2      |2022-04-23 19:35:19|
+                                    ...
+        |100241 |110765            |2023-05-22 12:03:25|3      |2022-04-17 22:38:26|
+        |103047 |136494            |2023-05-22 12:03:25|9      |2022-04-27 00:21:41|
+        +-------+------------------+-------------------+-------+-------------------+
+        >>> sdf.printSchema()
+        root
+        |-- user_id: long (nullable = false)
+        |-- rec_to_add_user_id: long (nullable = false)
+        |-- processed_dttm: timestamp (nullable = false)
+        |-- zone_id: integer (nullable = false)
+        |-- local_time: timestamp (nullable = false)
+        """
+        self._collect(
+            datamart="add-to-friends-recommendations-dm",
+            build=self._build_add_to_friends_recommendations_df,
+            keeper=keeper,
+            partition_date=partition_date,
+        )
+
+    def _build_add_to_friends_recommendations_df(
+        self, keeper: ArgsKeeper, datamart: str
+    ) -> pyspark.sql.DataFrame:
+        """Builds `add-to-friends-recommendations-dm` datamart without writing it.
+
+        ## Parameters
+        `keeper` : `ArgsKeeper`
+            Instance with arguments for the job.
+        `datamart` : `str`
+            Name of datamart, prefix of its checkpoints.
+        """
+        import pyspark.sql.functions as F
+        from pyspark.sql.types import (
+            IntegerType,
+            LongType,
+            StructField,
+            StructType,
+            TimestampType,
+        )
+
+        sdf = self._checkpoint(
+            build=lambda: self._get_candidate_pairs_df(keeper=keeper),
+            datamart=datamart,
+            stage="candidate-pairs",
+            keeper=keeper,
+        )
+
+        users_info_sdf = self._checkpoint(
+            build=lambda: self._get_users_actual_data_df(keeper=keeper),
+            datamart=datamart,
+            stage="users-actual-data",
+            keeper=keeper,
+        )
 
         self.logger.debug("Collecting resulting dataframe")
 
         # сборка итога
         sdf = (
-            sdf.where(sdf.distance <= 1)
-            .select("left_user", "right_user")
-            .distinct()
-            .join(
+            sdf.join(
                 users_info_sdf.select(
                     "user_id", "act_city_id", "local_time"
                 ).distinct(),
@@ -1117,34 +1784,4 @@ class DatamartCollector(SparkRunner):
                 StructField("local_time", TimestampType(), nullable=False),
             ]
         )
-        sdf = self.spark.createDataFrame(data=sdf.rdd, schema=_SCHEMA)
-
-        self.logger.info(f"Datamart '{_DATAMART_NAME}' collected!")
-
-        self.logger.info("Writing results")
-
-        processed_dt = datetime.strptime(
-            keeper.processed_dttm.replace("T", " "), r"%Y-%m-%d %H:%M:%S"  # type: ignore
-        ).date()
-
-        OUTPUT_PATH = f"{keeper.tgt_path}/{_DATAMART_NAME}/date={processed_dt}"
-
-        try:
-            sdf.repartition(1).write.parquet(
-                path=OUTPUT_PATH,
-                mode="errorifexists",
-            )
-            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
-
-        except AnalysisException as err:
-            self.logger.warning(f"Notice that {str(err)}")
-            self.logger.info("Overwriting...")
-
-            sdf.repartition(1).write.parquet(
-                path=OUTPUT_PATH,
-                mode="overwrite",
-            )
-            self.logger.info(f"Done! Results -> {OUTPUT_PATH}")
-
-        _job_end = datetime.now()
-        self.logger.info(f"Job execution time: {_job_end - _job_start}")
+        return self.spark.createDataFrame(data=sdf.rdd, schema=_SCHEMA)
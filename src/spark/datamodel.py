@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Tuple
+
+
+@dataclass(frozen=True)
+class SkewProfile:
+    """Frequencies of key values in a sample of dataframe.
+
+    ## Parameters
+    `stage` : Name of stage the dataframe is sampled before\n
+    `key` : Name of key column\n
+    `sampled_rows` : Number of rows in sample, 0 if profiling is disabled\n
+    `distinct_keys` : Number of distinct key values in sample\n
+    `ratio` : Frequency of the most frequent key divided by the mean frequency\n
+    `top` : The most frequent key values with their number of rows in sample\n
+    `heavy` : Key values which need skew mitigation, empty if skew is below threshold
+    """
+
+    stage: str
+    key: str
+    sampled_rows: int = 0
+    distinct_keys: int = 0
+    ratio: float = 0.0
+    top: Tuple[Tuple[Any, int], ...] = field(default_factory=tuple)
+    heavy: Tuple[Any, ...] = field(default_factory=tuple)
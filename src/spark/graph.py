@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from datetime import date
+    from typing import Literal, Optional
+
+    import pyspark.sql  # type: ignore
+
+    from src.config import Config
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.logger import SparkLogger
+
+# graph -> (bucketing column, the other end of edge)
+GRAPHS = dict(
+    contacts=("user_id", "contact_id"),
+    subscriptions=("subscription_channel", "user_id"),
+)
+
+
+class SocialGraphStore:
+    """Persisted social graph updated with events of each day.
+
+    Graph is kept as daily snapshots of adjacency lists in parquet, one row per edge with dates
+    of the first and the last event of it:
+    `contacts` : Users who wrote to each other, both directions, bucketed by `user_id`\n
+    `subscriptions` : Subscribers of channels, bucketed by `subscription_channel`
+
+    Snapshot of the day is the previous one merged with events of the day, so only one day of events
+    is read by update. Snapshots are bucketed and sorted by the same column with the same number of buckets,
+    so merge with the previous snapshot and joins of edges by bucketing column don't shuffle them.
+
+    Edges of the last `depth` days are the ones of snapshot of the last day with `last_seen`
+    not earlier than the first day.
+
+    Configured in `spark.graph` section of `config.yaml`.
+
+    ## Parameters
+    `spark` : `pyspark.sql.SparkSession`
+        Active Spark session.
+    `config` : `Config`
+        Project config.
+    `path` : `str`
+        Root path of graph, for example `s3a://.../social-graph`.
+
+    ## Examples
+    >>> store = SocialGraphStore(spark=spark, config=config, path=f"{keeper.tgt_path}/social-graph")
+
+    Update contacts with messages of the day:
+    >>> delta = store.get_delta(graph="contacts", sdf=messages_sdf)
+    >>> sdf = store.merge(graph="contacts", previous=store.read(graph="contacts", date=yesterday), delta=delta)
+    >>> store.write(sdf=sdf, graph="contacts", date=today)
+
+    Contacts of the last 10 days:
+    >>> store.read(graph="contacts", date=today).where(F.col("last_seen") >= today - timedelta(days=9))
+    """
+
+    __slots__ = ("spark", "path", "buckets", "logger")
+
+    def __init__(
+        self, spark: pyspark.sql.SparkSession, config: Config, path: str
+    ) -> None:
+        self.spark = spark
+        self.path = path
+        self.buckets = int(config.get_graph_config["buckets"])
+
+        self.logger = SparkLogger(level=config.get_logging_level["python"]).get_logger(
+            name=f"{__name__}.{__class__.__name__}"
+        )
+
+    def get_path(self, graph: Literal["contacts", "subscriptions"], date: date) -> str:
+        """Path of graph snapshot of the day"""
+        return f"{self.path}/{graph}/date={date}"
+
+    def _get_table_name(
+        self, graph: Literal["contacts", "subscriptions"], date: date
+    ) -> str:
+        """Bucketing is known to Spark only for tables, so each snapshot is registered as table of session catalog.
+
+        Name depends on root path, so snapshots of different graphs don't replace each other in catalog.
+        """
+        digest = hashlib.sha1(self.path.encode()).hexdigest()[:8]
+
+        return f"social_graph_{digest}_{graph}_{date:%Y%m%d}"
+
+    def read(
+        self, graph: Literal["contacts", "subscriptions"], date: date
+    ) -> pyspark.sql.DataFrame:
+        """Returns graph snapshot of the day as bucketed table.
+
+        ## Returns
+        `pyspark.sql.DataFrame` : Edges with `first_seen` and `last_seen` date columns
+        """
+        key, other = GRAPHS[graph]
+        table = self._get_table_name(graph=graph, date=date)
+
+        self.spark.sql(
+            f"CREATE TABLE IF NOT EXISTS {table} USING parquet "
+            f"CLUSTERED BY ({key}) SORTED BY ({key}, {other}) INTO {self.buckets} BUCKETS "
+            f"LOCATION '{self.get_path(graph=graph, date=date)}'"
+        )
+
+        return self.spark.table(table)
+
+    def write(
+        self,
+        sdf: pyspark.sql.DataFrame,
+        graph: Literal["contacts", "subscriptions"],
+        date: date,
+    ) -> ...:
+        """Writes graph snapshot of the day bucketed and sorted by bucketing column, overwriting existing one"""
+        key, other = GRAPHS[graph]
+        path = self.get_path(graph=graph, date=date)
+
+        self.logger.debug(f"Writing '{graph}' graph snapshot -> {path}")
+
+        (
+            sdf.write.bucketBy(self.buckets, key)
+            .sortBy(key, other)
+            .option("path", path)
+            .saveAsTable(self._get_table_name(graph=graph, date=date), mode="overwrite")
+        )
+
+    def get_delta(
+        self, graph: Literal["contacts", "subscriptions"], sdf: pyspark.sql.DataFrame
+    ) -> pyspark.sql.DataFrame:
+        """Returns edges of events in `sdf`: messages for `contacts` and subscriptions for `subscriptions` graph.
+
+        Events must have `event_ts` column, see `DatamartCollector._read_events_df`.
+        """
+        import pyspark.sql.functions as F  # type: ignore
+
+        sdf = sdf.withColumn("_date", F.to_date("event_ts"))
+
+        if graph == "contacts":
+            sdf = (
+                sdf.where(F.col("message_from").isNotNull())
+                .where(F.col("message_to").isNotNull())
+                .select(
+                    F.explode(
+                        F.array(
+                            F.struct(
+                                F.col("message_from").alias("user_id"),
+                                F.col("message_to").alias("contact_id"),
+                            ),
+                            F.struct(
+                                F.col("message_to").alias("user_id"),
+                                F.col("message_from").alias("contact_id"),
+                            ),
+                        )
+                    ).alias("_edge"),
+                    "_date",
+                )
+                .select("_edge.*", "_date")
+            )
+        else:
+            sdf = (
+                sdf.where(F.col("subscription_channel").isNotNull())
+                .where(F.col("user").isNotNull())
+                .select(
+                    F.col("subscription_channel"),
+                    F.col("user").alias("user_id"),
+                    "_date",
+                )
+            )
+
+        return sdf.groupby(*GRAPHS[graph]).agg(
+            F.min("_date").alias("first_seen"), F.max("_date").alias("last_seen")
+        )
+
+    def merge(
+        self,
+        graph: Literal["contacts", "subscriptions"],
+        previous: Optional[pyspark.sql.DataFrame],
+        delta: pyspark.sql.DataFrame,
+    ) -> pyspark.sql.DataFrame:
+        """Merges edges of new events into previous snapshot.
+
+        Previous snapshot is joined by its bucketing columns, so only `delta` is shuffled.
+
+        ## Parameters
+        `graph` : Name of graph\n
+        `previous` : Previous snapshot returned by `read`, graph is built from `delta` only if `None`\n
+        `delta` : Edges returned by `get_delta`
+
+        ## Returns
+        `pyspark.sql.DataFrame` : Edges of new snapshot
+        """
+        import pyspark.sql.functions as F  # type: ignore
+
+        columns = [*GRAPHS[graph], "first_seen", "last_seen"]
+
+        if previous is None:
+            return delta.select(*columns)
+
+        delta = delta.select(
+            *GRAPHS[graph],
+            F.col("first_seen").alias("_first_seen"),
+            F.col("last_seen").alias("_last_seen"),
+        )
+
+        return (
+            previous.join(delta, on=list(GRAPHS[graph]), how="full")
+            # both skip nulls, so edges of one side only keep their dates
+            .withColumn("first_seen", F.least("first_seen", "_first_seen"))
+            .withColumn("last_seen", F.greatest("last_seen", "_last_seen"))
+            .select(*columns)
+        )
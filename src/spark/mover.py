@@ -1,7 +1,10 @@
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
+
+if TYPE_CHECKING:
+    import pyspark.sql  # type: ignore
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.keeper import SparkConfigKeeper
@@ -32,21 +35,21 @@ class DataMover(SparkRunner):
     def stop_session(self) -> ...:
         return super().stop_session()
 
-    def _move_data(self, source_path: str, tgt_path: str) -> ...:
-        "Moves data between DWH layers. This method not for public calling"
+    @staticmethod
+    def _flatten_events(df: "pyspark.sql.DataFrame") -> "pyspark.sql.DataFrame":
+        """Flattens `event` struct of raw events into columns read by `DatamartCollector`.
 
-        _job_start = datetime.now()
+        ## Parameters
+        `df` : `pyspark.sql.DataFrame`
+            Raw events with `event` struct, `event_type`, `lat` and `lon` columns.
 
+        ## Returns
+        `pyspark.sql.DataFrame` :
+            Events with `date` column to partition by. `event_ts` is parsed time of message for messages and time of event for other event types.
+        """
         import pyspark.sql.functions as F
 
-        df = (
-            self.spark.read.option("mergeSchema", "true")
-            .option("cacheMetadata", "true")
-            .parquet(source_path)
-        )
-        df = df.repartition(56)
-
-        df = (
+        return (
             df.withColumn("admins", df.event.admins)
             .withColumn("channel_id", df.event.channel_id)
             .withColumn(
@@ -74,6 +77,7 @@ class DataMover(SparkRunner):
             .withColumn("subscription_user", df.event.subscription_user)
             .withColumn("tags", df.event.tags)
             .withColumn("user", df.event.user)
+            .withColumn("event_ts", F.coalesce("message_ts", "datetime"))
             .withColumn("event_type", df.event_type)
             .withColumn("date", F.date_format("datetime", "yyyy-MM-dd"))
             .withColumn("lat", df.lat)
@@ -97,6 +101,7 @@ class DataMover(SparkRunner):
                 "subscription_user",
                 "tags",
                 "user",
+                "event_ts",
                 "event_type",
                 "lat",
                 "lon",
@@ -104,6 +109,20 @@ class DataMover(SparkRunner):
             )
         )
 
+    def _move_data(self, source_path: str, tgt_path: str) -> ...:
+        "Moves data between DWH layers. This method not for public calling"
+
+        _job_start = datetime.now()
+
+        df = (
+            self.spark.read.option("mergeSchema", "true")
+            .option("cacheMetadata", "true")
+            .parquet(source_path)
+        )
+        df = df.repartition(56)
+
+        df = self._flatten_events(df=df)
+
         df.repartition(1).write.parquet(
             path=tgt_path,
             mode="overwrite",
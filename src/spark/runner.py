@@ -28,6 +28,9 @@ class SparkRunner(SparkHelper):
     Start session:
     >>> spark.init_session(app_name="test-app", spark_conf=conf, log4j_level="INFO")
 
+    Start session tuned for geo computations:
+    >>> spark.init_session(app_name="test-app", spark_conf=conf, profile="geo-heavy")
+
     Stop active session:
     >>> spark.stop_session()
     """
@@ -51,6 +54,8 @@ class SparkRunner(SparkHelper):
         log4j_level: Literal[
             "ALL", "DEBUG", "ERROR", "FATAL", "INFO", "OFF", "TRACE", "WARN"
         ] = "WARN",
+        profile: str = "default",
+        master: str = "yarn",
     ) -> ...:
         """Configure and initialize Spark Session.
 
@@ -61,6 +66,13 @@ class SparkRunner(SparkHelper):
             Spark configuration properties.
         `log4j_level` : `Literal[str]`
             Spark Context Java logging level, by default 'WARN'
+        `profile` : `str`
+            Name of tuning profile from `spark.tuning_profiles` section of config, by default 'default'. Properties of `spark_conf` take precedence over profile ones.
+        `master` : `str`
+            Spark master URL, by default 'yarn'. For example `local[*]` to run on local machine.
+
+        ## Raises
+        `UnableToGetConfig` : If tuning profile not found in config
         """
         self.logger.info("Initializing Spark session")
 
@@ -71,9 +83,15 @@ class SparkRunner(SparkHelper):
 
         from pyspark.sql import SparkSession  # type: ignore
 
-        self.spark = (
-            SparkSession.builder.master("yarn")
-            .config("spark.hadoop.fs.s3a.access.key", self.AWS_ACCESS_KEY_ID)
+        tuning = self.config.get_tuning_profile(name=profile)
+
+        builder = SparkSession.builder.master(master)
+
+        for key, value in tuning.items():
+            builder = builder.config(key, value)
+
+        builder = (
+            builder.config("spark.hadoop.fs.s3a.access.key", self.AWS_ACCESS_KEY_ID)
             .config("spark.hadoop.fs.s3a.secret.key", self.AWS_SECRET_ACCESS_KEY)
             .config("spark.hadoop.fs.s3a.endpoint", self.AWS_ENDPOINT_URL)
             .config(
@@ -85,11 +103,26 @@ class SparkRunner(SparkHelper):
                 "spark.dynamicAllocation.maxExecutors",
                 str(spark_conf.max_executors_num),
             )
-            .appName(app_name)
-            .getOrCreate()
         )
 
+        if spark_conf.shuffle_partitions is not None:
+            builder = builder.config(
+                "spark.sql.shuffle.partitions", str(spark_conf.shuffle_partitions)
+            )
+
+        if spark_conf.broadcast_threshold is not None:
+            builder = builder.config(
+                "spark.sql.autoBroadcastJoinThreshold", spark_conf.broadcast_threshold
+            ).config(
+                "spark.sql.adaptive.autoBroadcastJoinThreshold",
+                spark_conf.broadcast_threshold,
+            )
+
+        self.spark = builder.appName(app_name).getOrCreate()
+
         self.logger.info(f"Spark job properties:\n{spark_conf}")
+        self.logger.info(f"Tuning profile: '{profile}'")
+        self.logger.debug(f"Tuning properties: {tuning}")
 
         self.spark.sparkContext.setLogLevel(log4j_level)
 
@@ -103,3 +136,65 @@ class SparkRunner(SparkHelper):
         self.spark.stop()
 
         self.logger.info("Session stopped")
+
+    def get_spilled_bytes(self) -> int:
+        """Returns total number of bytes spilled by stages of active Spark application.
+
+        Takes metrics from Spark monitoring Rest API. Returns 0 if API is unavailable.
+        """
+        import requests
+
+        sc = self.spark.sparkContext
+
+        try:
+            response = requests.get(
+                url=f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}/stages",
+                timeout=10,
+            )
+            response.raise_for_status()
+
+            return sum(stage.get("memoryBytesSpilled", 0) for stage in response.json())
+
+        except (requests.exceptions.RequestException, ValueError) as err:
+            self.logger.warning(f"Unable to get Spark application metrics. {err}")
+
+            return 0
+
+    def get_peak_executors(self) -> int:
+        """Returns max number of executors which were running at the same time in active Spark application.
+
+        With dynamic allocation it may be less than allowed max number of executors. Takes executors,
+        including removed ones, from Spark monitoring Rest API. Returns 0 if API is unavailable.
+        """
+        import requests
+
+        sc = self.spark.sparkContext
+
+        try:
+            response = requests.get(
+                url=f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}/allexecutors",
+                timeout=10,
+            )
+            response.raise_for_status()
+
+            events = []
+            for executor in response.json():
+                if executor.get("id") == "driver":
+                    continue
+                events.append((executor["addTime"], 1))
+                if executor.get("removeTime"):
+                    events.append((executor["removeTime"], -1))
+
+        except (requests.exceptions.RequestException, ValueError, KeyError) as err:
+            self.logger.warning(f"Unable to get Spark application metrics. {err}")
+
+            return 0
+
+        # times are ISO strings of the same format. Removal goes before addition
+        # at the same time, so replaced executor is not counted twice
+        running = peak = 0
+        for _, change in sorted(events):
+            running += change
+            peak = max(peak, running)
+
+        return peak
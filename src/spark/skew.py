@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Tuple
+
+    import pyspark.sql  # type: ignore
+
+    from src.config import Config
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.logger import SparkLogger
+from src.spark.datamodel import SkewProfile
+
+
+class SkewProfiler:
+    """Finds heavy key values of dataframe before wide stage and spreads their rows.
+
+    Frequencies of key values are counted on a sample of rows. Key value is heavy if
+    skew ratio, the max frequency divided by the mean one, is above threshold, the value
+    is one of the top-k most frequent ones, its frequency is also above threshold and
+    it has at least `min_key_rows` rows estimated from the sample.
+
+    Rows of heavy key values are either salted, so they are spread over several tasks
+    of join, or processed by a separate path.
+
+    Configured in `spark.skew` section of `config.yaml`.
+
+    ## Parameters
+    `config` : `Config`
+        Project config.
+
+    ## Examples
+    >>> profiler = SkewProfiler(config=config)
+    >>> profile = profiler.profile(sdf=subs_sdf, key="subscription_channel", stage="same-channel-users")
+    >>> profile.heavy
+    (42,)
+
+    Join heavy channels by salted key:
+    >>> left = profiler.salt(sdf=subs_sdf, profile=profile, by="user_id")
+    >>> right = profiler.replicate(sdf=subs_sdf, profile=profile)
+    >>> sdf = left.join(right, on=["subscription_channel", "_salt"]).drop("_salt")
+    """
+
+    __slots__ = ("logger", "_SKEW")
+
+    def __init__(self, config: Config) -> None:
+        self.logger = SparkLogger(level=config.get_logging_level["python"]).get_logger(
+            name=f"{__name__}.{__class__.__name__}"
+        )
+
+        self._SKEW = config.get_skew_config
+
+    def profile(self, sdf: pyspark.sql.DataFrame, key: str, stage: str) -> SkewProfile:
+        """Counts frequencies of `key` values in a sample of `sdf` and finds heavy ones.
+
+        ## Parameters
+        `sdf` : `pyspark.sql.DataFrame`
+            Input of wide stage.
+        `key` : `str`
+            Column the stage is partitioned by.
+        `stage` : `str`
+            Name of stage, used in logs.
+
+        ## Returns
+        `SkewProfile` : Profile of key. Empty one if profiling is disabled in config
+        """
+        import pyspark.sql.functions as F  # type: ignore
+
+        if not self._SKEW["enabled"]:
+            return SkewProfile(stage=stage, key=key)
+
+        self.logger.debug(f"Profiling '{key}' before '{stage}' stage")
+
+        counts = (
+            sdf.select(key)
+            .where(F.col(key).isNotNull())
+            .sample(fraction=self._SKEW["sample_fraction"], seed=0)
+            .groupby(key)
+            .count()
+            .persist()
+        )
+        try:
+            stats = counts.agg(
+                F.sum("count").alias("rows"),
+                F.count(F.lit(1)).alias("keys"),
+                F.max("count").alias("max"),
+            ).first()
+
+            if not stats["keys"]:
+                return SkewProfile(stage=stage, key=key)
+
+            top = tuple(
+                (_[key], _["count"])
+                for _ in counts.orderBy(F.desc("count"))
+                .limit(self._SKEW["top_k"])
+                .collect()
+            )
+        finally:
+            counts.unpersist()
+
+        mean = stats["rows"] / stats["keys"]
+        ratio = stats["max"] / mean
+        threshold = self._SKEW["ratio_threshold"]
+
+        heavy = tuple(
+            value
+            for value, count in top
+            if ratio > threshold
+            and count > threshold * mean
+            and count / self._SKEW["sample_fraction"] >= self._SKEW["min_key_rows"]
+        )
+
+        profile = SkewProfile(
+            stage=stage,
+            key=key,
+            sampled_rows=stats["rows"],
+            distinct_keys=stats["keys"],
+            ratio=ratio,
+            top=top,
+            heavy=heavy,
+        )
+
+        self.logger.info(
+            f"Skew ratio of '{key}' before '{stage}' stage: {ratio:.1f}. Top keys: {top}"
+        )
+        if heavy:
+            self.logger.warning(
+                f"{len(heavy)} heavy '{key}' values before '{stage}' stage will be spread: {heavy}"
+            )
+
+        return profile
+
+    def salt(
+        self, sdf: pyspark.sql.DataFrame, profile: SkewProfile, by: str
+    ) -> pyspark.sql.DataFrame:
+        """Adds `_salt` column: hash of `by` column for rows of heavy key values and 0 for others.
+
+        Salt is derived from row values, not random, so recomputed partitions get the same salts.
+        """
+        import pyspark.sql.functions as F  # type: ignore
+
+        if not profile.heavy:
+            return sdf.withColumn("_salt", F.lit(0))
+
+        return sdf.withColumn(
+            "_salt",
+            F.when(
+                F.col(profile.key).isin(*profile.heavy),
+                F.pmod(F.hash(by), F.lit(self._SKEW["salt_buckets"])),
+            ).otherwise(F.lit(0)),
+        )
+
+    def replicate(
+        self, sdf: pyspark.sql.DataFrame, profile: SkewProfile
+    ) -> pyspark.sql.DataFrame:
+        """Adds `_salt` column matching `salt`: rows of heavy key values are repeated with every salt, others get 0"""
+        import pyspark.sql.functions as F  # type: ignore
+
+        if not profile.heavy:
+            return sdf.withColumn("_salt", F.lit(0))
+
+        return sdf.withColumn(
+            "_salt",
+            F.explode(
+                F.when(
+                    F.col(profile.key).isin(*profile.heavy),
+                    F.sequence(F.lit(0), F.lit(self._SKEW["salt_buckets"] - 1)),
+                ).otherwise(F.array(F.lit(0)))
+            ),
+        )
+
+    def split(
+        self, sdf: pyspark.sql.DataFrame, profile: SkewProfile
+    ) -> Tuple[pyspark.sql.DataFrame, pyspark.sql.DataFrame]:
+        """Splits `sdf` into rows of heavy key values and the rest"""
+        import pyspark.sql.functions as F  # type: ignore
+
+        is_heavy = F.col(profile.key).isin(*profile.heavy)
+
+        return sdf.where(is_heavy), sdf.where(~is_heavy | F.col(profile.key).isNull())
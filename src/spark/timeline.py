@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+    import pyspark.sql  # type: ignore
+    from pyspark.sql.types import StructType  # type: ignore
+
+    from src.config import Config
+    from src.spark.datamodel import SkewProfile
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.logger import SparkLogger
+from src.spark.skew import SkewProfiler
+
+
+def group_bounds(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns start index and length of each group of sorted `keys`"""
+    import numpy as np  # type: ignore
+
+    if not len(keys):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+    return starts, np.diff(np.r_[starts, len(keys)])
+
+
+def run_starts(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Returns mask of rows which start a run of equal `values` inside a group of sorted `keys`.
+
+    Run-length segments of timeline, for example cities visited one after another.
+    """
+    import numpy as np  # type: ignore
+
+    if not len(keys):
+        return np.empty(0, dtype=bool)
+
+    return np.r_[True, (keys[1:] != keys[:-1]) | (values[1:] != values[:-1])]
+
+
+def first_value(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Returns the first not null value of each group of sorted `keys` for every row of group"""
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+    starts, lengths = group_bounds(keys)
+    if not len(keys):
+        return values[:0]
+
+    idx = np.minimum.reduceat(
+        np.where(pd.isnull(values), len(keys), np.arange(len(keys))), starts
+    )
+    # all values of group are null, so the first one is taken
+    idx = np.where(idx == len(keys), starts, idx)
+
+    return np.repeat(values[idx], lengths)
+
+
+def last_value(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Returns the last not null value of each group of sorted `keys` for every row of group"""
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+    starts, lengths = group_bounds(keys)
+    if not len(keys):
+        return values[:0]
+
+    idx = np.maximum.reduceat(
+        np.where(pd.isnull(values), -1, np.arange(len(keys))), starts
+    )
+    idx = np.where(idx == -1, starts, idx)
+
+    return np.repeat(values[idx], lengths)
+
+
+def keep_first(
+    pdf: pd.DataFrame, key: str = "user_id", column: str = "msg_ts"
+) -> pd.DataFrame:
+    """Kernel which keeps rows with the first value of `column` in timeline of each user, for example the first messages"""
+    values = pdf[column].to_numpy()
+
+    return pdf[values == first_value(pdf[key].to_numpy(), values)]
+
+
+def stream_timelines(
+    batches: Iterable[pd.DataFrame],
+    kernel: Callable[[pd.DataFrame], pd.DataFrame],
+    key: str = "user_id",
+) -> Iterator[pd.DataFrame]:
+    """Applies `kernel` to batches of rows sorted by `key`, so that each call gets whole timelines.
+
+    Rows of the last user of batch may continue in the next one, so they are held back
+    and passed to kernel together with the next batch.
+    """
+    import pandas as pd  # type: ignore
+
+    carry = None
+
+    for pdf in batches:
+        if carry is not None:
+            pdf = pd.concat([carry, pdf], ignore_index=True)
+        if not len(pdf):
+            continue
+
+        starts, _ = group_bounds(pdf[key].to_numpy())
+        carry = pdf.iloc[starts[-1] :]
+
+        if starts[-1]:
+            yield kernel(pdf.iloc[: starts[-1]].reset_index(drop=True))
+
+    if carry is not None and len(carry):
+        yield kernel(carry.reset_index(drop=True))
+
+
+class TimelineEngine:
+    """Computes per-user timelines with pandas UDFs.
+
+    Users are hashed into buckets, rows of each bucket are sorted by user and time and streamed
+    to Python worker in Arrow batches of `spark.sql.execution.arrow.maxRecordsPerBatch` rows.
+    Kernel gets each batch as pandas DataFrame with whole timelines of its users, see `stream_timelines`.
+    So kernel processes timelines of many users at once with vectorized NumPy functions
+    of this module instead of a Spark window per computed value, and Python worker holds
+    one batch plus timeline of one user at a time.
+
+    Configured in `spark.timeline` section of `config.yaml`:
+    `buckets` : Number of buckets, `spark.sql.shuffle.partitions` if empty
+
+    ## Parameters
+    `spark` : `pyspark.sql.SparkSession`
+        Active Spark session.
+    `config` : `Config`
+        Project config.
+
+    ## Examples
+    >>> engine = TimelineEngine(spark=spark, config=config)
+
+    Add city of the last message to each message of user:
+    >>> def kernel(pdf: pd.DataFrame) -> pd.DataFrame:
+    ...     return pdf.assign(act_city=last_value(pdf["user_id"].to_numpy(), pdf["city_name"].to_numpy()))
+    >>> sdf = engine.apply(sdf=sdf, kernel=kernel, schema=schema, order_by=["msg_ts"])
+    """
+
+    __slots__ = ("spark", "buckets", "logger", "_profiler")
+
+    def __init__(self, spark: pyspark.sql.SparkSession, config: Config) -> None:
+        self.spark = spark
+        self.logger = SparkLogger(level=config.get_logging_level["python"]).get_logger(
+            name=f"{__name__}.{__class__.__name__}"
+        )
+
+        self._profiler = SkewProfiler(config=config)
+
+        _TIMELINE = config.get_timeline_config
+
+        self.buckets = int(
+            _TIMELINE["buckets"]
+            or spark.conf.get("spark.sql.shuffle.partitions", "200")
+        )
+
+        # Kernels are pickled together with functions of this module,
+        # so project is not required on executors
+        try:
+            from pyspark import cloudpickle  # type: ignore
+
+            cloudpickle.register_pickle_by_value(sys.modules[__name__])
+        except (ImportError, AttributeError):
+            self.logger.warning(
+                "Unable to pickle timeline functions by value. Project should be importable on executors"
+            )
+
+    def apply(
+        self,
+        sdf: pyspark.sql.DataFrame,
+        kernel: Callable[[pd.DataFrame], pd.DataFrame],
+        schema: StructType,
+        order_by: List[str],
+        key: str = "user_id",
+        profile: Optional[SkewProfile] = None,
+    ) -> pyspark.sql.DataFrame:
+        """Applies `kernel` to timelines of all users.
+
+        ## Parameters
+        `sdf` : `pyspark.sql.DataFrame`
+            Events of users.
+        `kernel` : `Callable[[pd.DataFrame], pd.DataFrame]`
+            Function which takes events of users sorted by `key` and `order_by` columns and returns resulting rows.
+        `schema` : `StructType`
+            Schema of rows returned by `kernel`.
+        `order_by` : `List[str]`
+            Columns to sort timeline of each user by, ascending.
+        `key` : `str`
+            Column with user identifier, by default 'user_id'.
+        `profile` : `SkewProfile`, optional
+            Skew profile of `key`. Each heavy user is processed as a separate group, so its timeline is not sent to Python worker together with other users ones.
+            Timeline of heavy user is passed to kernel at once.
+
+        ## Returns
+        `pyspark.sql.DataFrame` :
+            Rows returned by `kernel` for all buckets.
+        """
+        import pyspark.sql.functions as F  # type: ignore
+
+        self.logger.debug(
+            f"Applying '{kernel.__name__}' kernel to timelines by '{key}' in {self.buckets} buckets"
+        )
+
+        columns = [key, *order_by]
+
+        def _stream(batches):
+            return stream_timelines(batches=batches, kernel=kernel, key=key)
+
+        def _apply(pdf: pd.DataFrame) -> pd.DataFrame:
+            pdf = pdf.sort_values(columns, kind="mergesort")
+
+            return kernel(pdf.reset_index(drop=True))
+
+        def _sorted(sdf: pyspark.sql.DataFrame) -> pyspark.sql.DataFrame:
+            # nulls last as `sort_values` does for heavy users
+            return sdf.repartition(self.buckets, key).sortWithinPartitions(
+                key, *(F.asc_nulls_last(_) for _ in order_by)
+            )
+
+        if profile is None or not profile.heavy:
+            return _sorted(sdf).mapInPandas(_stream, schema=schema)
+
+        heavy_sdf, light_sdf = self._profiler.split(sdf=sdf, profile=profile)
+
+        return (
+            _sorted(light_sdf)
+            .mapInPandas(_stream, schema=schema)
+            .unionByName(heavy_sdf.groupby(key).applyInPandas(_apply, schema=schema))
+        )
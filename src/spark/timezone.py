@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from datetime import date
+    from typing import Iterable, List, Tuple
+
+# bounds of the first and the last periods, so they are open-ended
+MIN_TS = -(2**62)
+MAX_TS = 2**62
+
+# all real zones change offset on a 15 minutes boundary of UTC time
+STEP = "15min"
+
+
+def get_utc_offsets(
+    timezones: Iterable[str], start: date, end: date
+) -> List[Tuple[str, int, int, int]]:
+    """Returns periods of constant UTC offset of each timezone within range of dates.
+
+    Offsets are sampled every 15 minutes from the day before `start` to the day after `end`
+    and each change of offset starts a new period. The first and the last periods of timezone
+    are open-ended, so any timestamp gets offset.
+
+    ## Parameters
+    `timezones` : Names of timezones, for example 'Australia/Sydney'\n
+    `start` : First date of range\n
+    `end` : Last date of range
+
+    ## Returns
+    `List[Tuple[str, int, int, int]]` : Timezone, start and end of period as UTC epoch seconds and offset in seconds. Start is inclusive, end is exclusive
+
+    ## Examples
+    >>> get_utc_offsets(timezones=["Australia/Sydney"], start=date(2022, 3, 30), end=date(2022, 4, 5))
+    [('Australia/Sydney', -4611686018427387904, 1648915200, 39600), ('Australia/Sydney', 1648915200, 4611686018427387904, 36000)]
+    """
+    import numpy as np  # type: ignore
+    import pandas as pd  # type: ignore
+
+    utc = pd.date_range(
+        start=start - timedelta(days=1),
+        end=end + timedelta(days=2),
+        freq=STEP,
+        tz="UTC",
+    )
+    seconds = utc.asi8 // 10**9
+
+    periods = []
+
+    for timezone in sorted(set(timezones)):
+        offsets = (
+            (utc.tz_convert(timezone).tz_localize(None) - utc.tz_localize(None))
+            .total_seconds()
+            .to_numpy(dtype=np.int64)
+        )
+
+        changes = np.flatnonzero(np.diff(offsets)) + 1
+        bounds = [MIN_TS, *seconds[changes].tolist(), MAX_TS]
+
+        periods.extend(
+            (timezone, bounds[i], bounds[i + 1], int(offset))
+            for i, offset in enumerate(offsets[np.r_[0, changes]])
+        )
+
+    return periods
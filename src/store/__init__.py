@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+from src.store.store import JSONStateStore
+from src.store.exceptions import UnableToAccessStore
+
+__all__ = ["JSONStateStore", "UnableToAccessStore"]
@@ -0,0 +1,8 @@
+class UnableToAccessStore(Exception):
+    def __init__(self, msg: str) -> None:
+        """Can be raised if unable to read, write or lock state file.
+
+        ## Parameters
+        `msg` : Error message
+        """
+        super().__init__(msg)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from os import PathLike
+    from typing import Any, Dict, Iterator
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.store.exceptions import UnableToAccessStore
+
+
+class JSONStateStore:
+    """Small JSON file with state shared between processes.
+
+    ## Notes
+    Each read-modify-write cycle should be done inside `transaction` context manager. It holds exclusive `flock` on sidecar `.lock` file, so parallel Airflow tasks on the same host never overwrite each other's changes.
+
+    File itself is replaced atomically and readable only by the owner, so it can keep credentials.
+
+    Broken or missing file is treated as an empty state.
+
+    ## Examples
+    Initialize Class instance:
+    >>> store = JSONStateStore(path="/opt/airflow/.cache/state.json")
+
+    Change state:
+    >>> with store.transaction() as state:
+    ...     state["key"] = "value"
+
+    Read current state:
+    >>> store.read()
+    {'key': 'value'}
+    """
+
+    __slots__ = ("_path", "_lock_path")
+
+    def __init__(self, path: PathLike[str] | Path | str) -> None:
+        """
+
+        ## Parameters
+        `path` : Path to state file. Parent dirs will be created if not exist
+        """
+        self._path = Path(path)
+        self._lock_path = self._path.with_name(f".{self._path.name}.lock")
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @contextmanager
+    def lock(self, shared: bool = False) -> Iterator[None]:
+        """Holds lock on state file while inside context.
+
+        ## Parameters
+        `shared` : If True shared lock will be acquired, by default False
+
+        ## Raises
+        `UnableToAccessStore` : If unable to create or lock file
+        """
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            lock_file = open(self._lock_path, "a")
+        except OSError as err:
+            raise UnableToAccessStore(str(err))
+
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self) -> Dict[str, Any]:
+        """Reads state from file.
+
+        ## Returns
+        `Dict[str, Any]` : Current state. Empty if file not exists or broken
+
+        ## Raises
+        `UnableToAccessStore` : If unable to read file
+        """
+        try:
+            with open(self._path) as f:
+                state = json.load(f)
+
+        except FileNotFoundError:
+            return {}
+
+        except json.JSONDecodeError:
+            return {}
+
+        except OSError as err:
+            raise UnableToAccessStore(str(err))
+
+        return state if isinstance(state, dict) else {}
+
+    def write(self, state: Dict[str, Any]) -> None:
+        """Atomically replaces file with given state.
+
+        ## Parameters
+        `state` : JSON serializable state
+
+        ## Raises
+        `UnableToAccessStore` : If unable to write file
+        """
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self._path.parent, prefix=f".{self._path.name}."
+            )
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self._path)
+
+        except OSError as err:
+            raise UnableToAccessStore(str(err))
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """Locks file, yields current state and writes it back on exit.
+
+        ## Raises
+        `UnableToAccessStore` : If unable to lock, read or write file
+        """
+        with self.lock():
+            state = self.read()
+            yield state
+            self.write(state)
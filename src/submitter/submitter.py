@@ -20,6 +20,7 @@ from requests.exceptions import (
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.base import BaseRequestHandler
 from src.logger import SparkLogger
+from src.registry import JobRegistry
 from src.submitter.exceptions import (
     UnableToGetResponse,
     UnableToSendRequest,
@@ -27,8 +28,6 @@ from src.submitter.exceptions import (
 )
 
 if TYPE_CHECKING:
-    from typing import Literal
-
     from src.keeper import ArgsKeeper
 
 
@@ -56,18 +55,21 @@ class SparkSubmitter(BaseRequestHandler):
         max_retries: int = 3,
         retry_delay: int = 10,
         session_timeout: int = 60 * 60,
+        cluster_api_base_url: str | None = None,
     ) -> None:
         """
 
         ## Parameters
         `max_retries` : Max retries to send request, by default 3\n
         `retry_delay` : Delay between retries in seconds, by default 10\n
-        `session_timeout` : Session timeout in seconds, by default 60*60
+        `session_timeout` : Session timeout in seconds, by default 60*60\n
+        `cluster_api_base_url` : Base URL of Cluster Rest API, by default taken from `CLUSTER_API_BASE_URL` environ variable
         """
         super().__init__(
             max_retries=max_retries,
             retry_delay=retry_delay,
             session_timeout=session_timeout,
+            cluster_api_base_url=cluster_api_base_url,
         )
 
         self.logger = (
@@ -78,12 +80,12 @@ class SparkSubmitter(BaseRequestHandler):
             )
         )
 
-    def submit_job(self, job: Literal["collect_users_demographic_dm_job", "collect_events_total_cnt_agg_wk_mnth_dm_job", "collect_add_to_friends_recommendations_dm_job"], keeper: ArgsKeeper) -> bool:  # type: ignore
+    def submit_job(self, job: str, keeper: ArgsKeeper) -> bool:
         """Sends request to API to submit Spark job in Hadoop Cluster.
 
         ## Parameters
-        `job` : `Literal[str]`
-            Name of submitting job
+        `job` : `str`
+            Name of submitting job. Must be declared in `spark.jobs` section of config
         `keeper` : `ArgsKeeper`
             Instance with Job arguments
 
@@ -97,8 +99,13 @@ class SparkSubmitter(BaseRequestHandler):
         `UnableToGetResponse` :
             If unable to get or decode response
         `UnableToSubmitJob` :
-            If operation failed while execution in Cluster
+            If job not declared in config or operation failed while execution in Cluster
         """
+        if job not in JobRegistry(config=self.config):
+            raise UnableToSubmitJob(
+                f"Unknown '{job}' job. Job must be declared in 'spark.jobs' section of config"
+            )
+
         self.logger.info(f"Submiting '{job}' job")
 
         self.logger.info(f"Spark job args:\n{keeper}")
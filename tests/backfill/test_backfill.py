@@ -0,0 +1,62 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.backfill import BackfillPlanner, BackfillRun
+from src.registry import UnknownJob
+
+
+class TestBackfillPlanner:
+    def test_splits_range_into_chunks(self, config, test_job_name):
+        runs = BackfillPlanner(chunk_days=7, config=config).plan(
+            start=date(2022, 4, 1), end=date(2022, 4, 10), jobs=[test_job_name]
+        )
+
+        assert [(_.date, _.end_date, _.days) for _ in runs] == [
+            ("2022-04-01", "2022-04-07", 7),
+            ("2022-04-08", "2022-04-10", 3),
+        ]
+
+    def test_chunk_reads_shared_input_once(self, config, test_job_name):
+        (run,) = BackfillPlanner(chunk_days=7, config=config).plan(
+            start=date(2022, 4, 1), end=date(2022, 4, 7), jobs=[test_job_name]
+        )
+
+        depth = config.get_job_config[test_job_name]["depth"]
+        assert run.scanned_days == depth + 6
+        assert run.scanned_days < depth * run.days
+
+    def test_plans_all_jobs_by_default(self, config):
+        runs = BackfillPlanner(config=config).plan(
+            start=date(2022, 4, 1), end=date(2022, 4, 1)
+        )
+
+        assert {_.job for _ in runs} == set(config.get_job_config)
+        assert all(isinstance(_, BackfillRun) for _ in runs)
+
+    def test_plans_nothing_if_no_jobs(self, config):
+        runs = BackfillPlanner(config=config).plan(
+            start=date(2022, 4, 1), end=date(2022, 4, 1), jobs=[]
+        )
+
+        assert runs == []
+
+    def test_takes_chunk_days_from_config(self, config):
+        planner = BackfillPlanner(config=config)
+
+        assert planner._chunk_days == config.get_backfill_config["chunk_days"]
+
+    def test_raises_if_end_earlier_than_start(self, config, test_job_name):
+        with pytest.raises(ValueError):
+            BackfillPlanner(config=config).plan(
+                start=date(2022, 4, 2), end=date(2022, 4, 1), jobs=[test_job_name]
+            )
+
+    def test_raises_if_unknown_job(self, config):
+        with pytest.raises(UnknownJob):
+            BackfillPlanner(config=config).plan(
+                start=date(2022, 4, 1), end=date(2022, 4, 1), jobs=["unknown_job"]
+            )
@@ -1,6 +1,9 @@
+import asyncio
 import os
 import random
 import sys
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -18,6 +21,9 @@ from requests.exceptions import (
 # package
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.cluster import YandexAPIError
+from src.cluster.iam import IAMToken, IAMTokenProvider
+from src.cluster.poller import BackoffPolicy, StatusPoller, TransitionHistory
+from src.store import JSONStateStore
 
 
 class TestGetIAMToken:
@@ -353,20 +359,37 @@ class TestCheckStatus:
         )
 
         with pytest.raises(YandexAPIError) as e:
-            cluster.max_retries = 3
-
-            cluster.check_status(target_status="running")
+            cluster.check_status(target_status="running", deadline=0)
 
         assert e.type is YandexAPIError
-        assert "No more retries left to check Cluster status!" in str(e.value)
+        assert "Deadline exceeded while waiting for Cluster status!" in str(e.value)
         assert "Last received status was: 'STARTING'" in str(e.value)
+        assert mock_get.call_count == 1
 
+    @patch("src.cluster.cluster.time.sleep")
     @patch("src.cluster.cluster.requests.get")
-    def test_raises_if_not_target_status_and_no_status(self, mock_get, cluster):
+    def test_not_target_status_not_counted_as_failure(
+        self, mock_get, mock_sleep, cluster
+    ):
         mock_get.side_effect = (
             MagicMock(status_code=200, json=lambda: {"status": "STARTING"}),
+            MagicMock(status_code=200, json=lambda: {"status": "STARTING"}),
+            MagicMock(status_code=200, json=lambda: {"status": "STARTING"}),
+            MagicMock(status_code=200, json=lambda: {"status": "RUNNING"}),
+        )
+
+        cluster.max_retries = 2
+
+        assert cluster.check_status(target_status="running") is True
+        assert mock_sleep.call_count == 3
+
+    @patch("src.cluster.cluster.requests.get")
+    def test_raises_if_not_target_status_and_no_status(self, mock_get, cluster):
+        mock_get.side_effect = (
             MagicMock(status_code=200, json=lambda: {"status": "STARTING"}),
             MagicMock(status_code=200, json=lambda: {"test": "test"}),
+            MagicMock(status_code=200, json=lambda: {"test": "test"}),
+            MagicMock(status_code=200, json=lambda: {"test": "test"}),
         )
 
         with pytest.raises(YandexAPIError) as e:
@@ -438,3 +461,243 @@ class TestCheckStatus:
         result = cluster.check_status("running")
 
         assert result == True
+
+    @patch("src.cluster.cluster.requests.post")
+    @patch("src.cluster.cluster.requests.get")
+    def test_refreshes_token_once_if_rejected(self, mock_get, mock_post, cluster):
+        mock_get.side_effect = (
+            MagicMock(status_code=401),
+            MagicMock(status_code=200, json=lambda: {"status": "RUNNING"}),
+        )
+        mock_post.return_value = MagicMock(
+            status_code=200, json=lambda: {"iamToken": "refreshed_token"}
+        )
+
+        result = cluster.check_status(target_status="running")
+
+        assert result is True
+        assert mock_post.call_count == 1
+        assert os.environ["YC_IAM_TOKEN"] == "refreshed_token"
+        assert (
+            mock_get.call_args.kwargs["headers"]["Authorization"]
+            == "Bearer refreshed_token"
+        )
+
+
+class TestAsyncDataProcCluster:
+    @patch("src.cluster.cluster.requests.post")
+    def test_exec_command_success(self, mock_post, async_cluster):
+        mock_post.side_effect = (MagicMock(status_code=200),)
+
+        result = asyncio.run(async_cluster.exec_command(command="start"))
+        assert result is True
+
+    @patch("src.cluster.aio.asyncio.sleep")
+    @patch("src.cluster.cluster.requests.post")
+    def test_exec_command_if_errors_but_finally_success(
+        self, mock_post, mock_sleep, async_cluster
+    ):
+        mock_post.side_effect = (
+            Timeout("Timeout error"),
+            MagicMock(status_code=500),
+            MagicMock(status_code=200),
+        )
+
+        async_cluster.max_retries = 3
+        result = asyncio.run(async_cluster.exec_command(command="stop"))
+
+        assert result is True
+        assert mock_sleep.await_count == 2
+
+    @patch("src.cluster.aio.asyncio.sleep")
+    @patch("src.cluster.cluster.requests.get")
+    def test_check_status_success_as_real(self, mock_get, mock_sleep, async_cluster):
+        mock_get.side_effect = (
+            MagicMock(status_code=200, json=lambda: {"status": "STARTING"}),
+            MagicMock(status_code=200, json=lambda: {"status": "STARTING"}),
+            MagicMock(status_code=200, json=lambda: {"status": "RUNNING"}),
+        )
+
+        result = asyncio.run(async_cluster.check_status(target_status="running"))
+
+        assert result is True
+        assert mock_sleep.await_count == 2
+
+    @patch("src.cluster.cluster.requests.get")
+    def test_check_status_raises_if_deadline_exceeded(self, mock_get, async_cluster):
+        mock_get.side_effect = (
+            MagicMock(status_code=200, json=lambda: {"status": "STARTING"}),
+        )
+
+        with pytest.raises(YandexAPIError) as e:
+            asyncio.run(async_cluster.check_status(target_status="running", deadline=0))
+
+        assert "Deadline exceeded" in str(e.value)
+        assert "STARTING" in str(e.value)
+
+    @patch("src.cluster.cluster.requests.get")
+    def test_check_status_many_clusters_in_one_loop(self, mock_get, async_cluster):
+        mock_get.return_value = MagicMock(
+            status_code=200, json=lambda: {"status": "STOPPED"}
+        )
+
+        async def wait_all():
+            return await asyncio.gather(
+                *(async_cluster.check_status(target_status="stopped") for _ in range(3))
+            )
+
+        assert asyncio.run(wait_all()) == [True, True, True]
+
+
+class TestIAMTokenProvider:
+    @staticmethod
+    def _make_fetch(*values: str, ttl: int = 3600) -> MagicMock:
+        return MagicMock(
+            side_effect=[
+                IAMToken(
+                    value=value,
+                    expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl),
+                )
+                for value in values
+            ]
+        )
+
+    def test_token_shared_through_cache(self, tmp_path):
+        fetch = self._make_fetch("token")
+
+        first = IAMTokenProvider(store=JSONStateStore(tmp_path / "t.json"), fetch=fetch)
+        second = IAMTokenProvider(
+            store=JSONStateStore(tmp_path / "t.json"), fetch=fetch
+        )
+
+        assert first.get_token() == "token"
+        assert second.get_token() == "token"
+        assert fetch.call_count == 1
+
+    def test_refreshes_before_expiration(self, tmp_path):
+        fetch = self._make_fetch("old_token", "new_token", ttl=60)
+        provider = IAMTokenProvider(
+            store=JSONStateStore(tmp_path / "t.json"), fetch=fetch, refresh_margin=600
+        )
+
+        assert provider.get_token() == "old_token"
+        assert provider.get_token() == "new_token"
+
+    def test_refresh_reuses_token_refreshed_by_another_process(self, tmp_path):
+        fetch = self._make_fetch("old_token", "new_token")
+
+        first = IAMTokenProvider(store=JSONStateStore(tmp_path / "t.json"), fetch=fetch)
+        second = IAMTokenProvider(
+            store=JSONStateStore(tmp_path / "t.json"), fetch=fetch
+        )
+
+        assert first.get_token() == "old_token"
+        assert second.get_token() == "old_token"
+
+        assert first.refresh(rejected="old_token") == "new_token"
+        assert second.refresh(rejected="old_token") == "new_token"
+        assert fetch.call_count == 2
+
+    def test_parse_expires_at_with_nanoseconds(self):
+        expires_at = IAMToken.parse_expires_at(
+            value="2023-05-26T22:51:21.123456789Z", default_ttl=3600
+        )
+
+        assert expires_at == datetime(2023, 5, 26, 22, 51, 21, tzinfo=timezone.utc)
+
+
+class TestBackoffPolicy:
+    def test_delay_grows_exponentially(self):
+        policy = BackoffPolicy(initial_delay=5, max_delay=60, multiplier=2, jitter=0)
+
+        assert [policy.get_delay(attempt=i) for i in range(1, 6)] == [
+            5.0,
+            10.0,
+            20.0,
+            40.0,
+            60.0,
+        ]
+
+    def test_delay_with_jitter_not_greater_than_max(self):
+        policy = BackoffPolicy(initial_delay=5, max_delay=60, multiplier=2, jitter=0.5)
+
+        for attempt in range(1, 20):
+            assert 0 <= policy.get_delay(attempt=attempt) <= 60
+
+
+class TestStatusPoller:
+    def test_never_sleeps_past_deadline(self):
+        poller = StatusPoller(
+            policy=BackoffPolicy(initial_delay=100, max_delay=100, jitter=0),
+            deadline=10,
+        )
+
+        assert poller.get_next_delay() <= 10
+
+    def test_sparse_before_expected_time(self):
+        poller = StatusPoller(
+            policy=BackoffPolicy(initial_delay=5, max_delay=60, jitter=0),
+            deadline=1800,
+            expected_duration=480,
+            expected_window=60,
+        )
+
+        assert poller.get_next_delay() == 60
+
+    def test_tight_near_expected_time(self):
+        poller = StatusPoller(
+            policy=BackoffPolicy(initial_delay=5, max_delay=60, jitter=0),
+            deadline=1800,
+            expected_duration=480,
+            expected_window=60,
+            started_at=time.time() - 450,
+        )
+
+        assert poller.get_next_delay() == 5
+        assert poller.get_next_delay() == 5
+
+    def test_backoff_after_expected_time(self):
+        poller = StatusPoller(
+            policy=BackoffPolicy(initial_delay=5, max_delay=60, jitter=0),
+            deadline=1800,
+            expected_duration=480,
+            expected_window=60,
+            started_at=time.time() - 600,
+        )
+
+        assert [poller.get_next_delay() for _ in range(3)] == [5, 10, 20]
+
+
+class TestTransitionHistory:
+    def test_records_transition_duration(self, tmp_path):
+        history = TransitionHistory(
+            store=JSONStateStore(path=tmp_path / "history.json")
+        )
+
+        history.mark_started(target_status="running")
+
+        assert history.get_started_at(target_status="running") is not None
+        assert history.record(target_status="running") is not None
+        assert history.get_started_at(target_status="running") is None
+        assert history.get_expected_duration(target_status="running") is not None
+
+    def test_not_records_if_start_unknown(self, tmp_path):
+        history = TransitionHistory(
+            store=JSONStateStore(path=tmp_path / "history.json")
+        )
+
+        assert history.record(target_status="stopped") is None
+        assert history.get_expected_duration(target_status="stopped") is None
+
+    def test_keeps_only_last_transitions(self, tmp_path):
+        history = TransitionHistory(
+            store=JSONStateStore(path=tmp_path / "history.json"), size=2
+        )
+
+        for _ in range(5):
+            history.mark_started(target_status="running")
+            history.record(target_status="running")
+
+        state = JSONStateStore(path=tmp_path / "history.json").read()
+
+        assert len(state["running"]["durations"]) == 2
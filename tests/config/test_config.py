@@ -1,3 +1,4 @@
+import os
 import sys
 from os import getenv
 from pathlib import Path
@@ -72,3 +73,51 @@ class TestConfig:
 
     def test_get_spark_app_name_value_upper(self, config):
         assert config.get_spark_app_name == "DATAMART-COLLECTOR-APP"
+
+    def test_get_checkpoints_config_enabled_type(self, config):
+        assert isinstance(config.get_checkpoints_config["enabled"], bool)
+
+    def test_get_dictionaries_config_max_staleness_type(self, config):
+        assert isinstance(config.get_dictionaries_config["max_staleness"], int)
+
+    def test_get_tuning_profile_values_are_strings(self, config):
+        profile = config.get_tuning_profile(name="default")
+
+        assert all(isinstance(v, str) for v in profile.values())
+        assert profile["spark.sql.adaptive.enabled"] == "true"
+
+    def test_get_tuning_profile_extends(self, config):
+        default = config.get_tuning_profile(name="default")
+        profile = config.get_tuning_profile(name="geo-heavy")
+
+        assert "extends" not in profile
+        assert profile["spark.serializer"] == default["spark.serializer"]
+        assert (
+            profile["spark.sql.adaptive.skewJoin.skewedPartitionFactor"]
+            != default["spark.sql.adaptive.skewJoin.skewedPartitionFactor"]
+        )
+
+    def test_get_tuning_profile_raises_if_not_found(self, config):
+        with pytest.raises(UnableToGetConfig) as err:
+            config.get_tuning_profile(name="not-existing-profile")
+
+        assert "Tuning profile 'not-existing-profile' not found" in str(err.value)
+
+    def test_parsed_file_is_shared(self, config):
+        other = Config(config_name="config.yaml")
+
+        assert other._config is config._config
+
+    def test_rereads_modified_file(self, tmp_path):
+        path = Path(tmp_path, "config.yaml")
+        path.write_text("environ:\n  type: dev\n  is_prod: false\n")
+        config = Config(config_path=path)
+
+        path.write_text("environ:\n  type: prod\n  is_prod: true\n")
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+
+        assert Config(config_path=path).environ == "prod"
+        assert config.environ == "dev"
+
+        config.reload()
+        assert config.environ == "prod"
@@ -7,12 +7,16 @@ import pytest
 
 # package
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from src.cluster import DataProcCluster
+from src.cluster import AsyncDataProcCluster, DataProcCluster
 from src.config import Config
 from src.environ import EnvironManager
 from src.helper import SparkHelper
 from src.keeper import ArgsKeeper, SparkConfigKeeper
 from src.notifyer import TelegramNotifyer
+from src.pool import ClusterPool, ClusterSpec
+from src.reader import DatamartReader
+from src.sizer import ResourceSizer
+from src.store import JSONStateStore
 from src.submitter import SparkSubmitter
 
 
@@ -22,6 +26,12 @@ def cluster() -> DataProcCluster:
     return DataProcCluster(retry_delay=1)
 
 
+@pytest.fixture
+def async_cluster() -> AsyncDataProcCluster:
+    """Returns instance of `AsyncDataProcCluster` class"""
+    return AsyncDataProcCluster(retry_delay=1)
+
+
 @pytest.fixture
 def helper() -> SparkHelper:
     """Returns instance of `SparkHelper` class"""
@@ -69,6 +79,37 @@ def airflow_context():
     )
 
 
+@pytest.fixture
+def pool(tmp_path) -> ClusterPool:
+    """Returns instance of `ClusterPool` with two Clusters and empty state"""
+    pool = ClusterPool(retry_delay=0)
+    pool._specs = {
+        "main": ClusterSpec(name="main", capacity=2),
+        "extra": ClusterSpec(name="extra", capacity=2),
+    }
+    pool._store = JSONStateStore(path=tmp_path / "pool.json")
+
+    return pool
+
+
+@pytest.fixture
+def sizer(tmp_path) -> ResourceSizer:
+    """Returns instance of `ResourceSizer` with empty metrics history"""
+    sizer = ResourceSizer()
+    sizer._store = JSONStateStore(path=tmp_path / "metrics.json")
+
+    return sizer
+
+
+@pytest.fixture
+def reader(tmp_path) -> DatamartReader:
+    """Returns instance of `DatamartReader` with empty local cache"""
+    reader = DatamartReader()
+    reader._cache_path = tmp_path / "cache"
+
+    return reader
+
+
 @pytest.fixture
 def submitter() -> SparkSubmitter:
     os.environ["CLUSTER_API_BASE_URL"] = "http://example.com"
@@ -77,7 +118,7 @@ def submitter() -> SparkSubmitter:
 
 @pytest.fixture
 def test_job_name():
-    return "users_info_datamart_job"
+    return "collect_users_demographic_dm_job"
 
 
 @pytest.fixture
@@ -0,0 +1,43 @@
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.context import ProjectContext, get_context
+from src.environ import DotEnvError
+
+
+class TestGetContext:
+    def test_returns_same_instance(self):
+        assert get_context() is get_context()
+
+    def test_loads_dotenv_once(self):
+        get_context.cache_clear()
+
+        with patch("src.context.context.load_dotenv") as load_dotenv:
+            context = get_context()
+            get_context()
+
+        assert isinstance(context, ProjectContext)
+        assert load_dotenv.call_count == 1
+
+    def test_uses_global_environ_without_dotenv(self):
+        get_context.cache_clear()
+
+        with patch("src.context.context.find_dotenv", return_value=""):
+            context = get_context()
+
+        assert context.project_path == Path(os.environ["PROJECT_PATH"])
+
+    def test_raises_without_dotenv_and_project_path(self):
+        get_context.cache_clear()
+
+        with patch("src.context.context.find_dotenv", return_value=""):
+            with patch.dict(os.environ, clear=True):
+                with pytest.raises(DotEnvError):
+                    get_context()
+
+        get_context.cache_clear()
@@ -0,0 +1,73 @@
+import builtins
+import importlib.util
+import socket
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+airflow = pytest.importorskip("airflow")
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+DAG_PATH = Path(__file__).parent.parent.parent / "dags/datamart-collector-dag.py"
+
+
+def _import_dag():
+    spec = importlib.util.spec_from_file_location("datamart_collector_dag", DAG_PATH)
+    module = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(module)  # type: ignore
+
+    return module
+
+
+class TestDAGImport:
+    def test_does_no_network_or_file_io(self):
+        opened = []
+        _open = builtins.open
+
+        def _spy_open(file, *args, **kwargs):
+            opened.append(str(file))
+            return _open(file, *args, **kwargs)
+
+        def _connect(*args, **kwargs):
+            raise AssertionError(f"Network call while DAG import: {args}")
+
+        # project modules are imported beforehand, only DAG file itself is measured
+        import src.cluster.trigger  # noqa: F401
+        import src.pool  # noqa: F401
+
+        with patch.object(socket.socket, "connect", _connect):
+            with patch.object(builtins, "open", _spy_open):
+                module = _import_dag()
+
+        assert module.taskflow is not None
+        assert all(_.endswith("config.yaml") for _ in opened), opened
+
+    def test_builds_dag(self):
+        module = _import_dag()
+
+        dag = module.taskflow()
+
+        assert "start_cluster" in dag.task_ids
+        assert "stop_pool_clusters" in dag.task_ids
+
+    def test_generates_task_per_job(self, config):
+        from src.registry import JobRegistry
+
+        module = _import_dag()
+        dag = module.taskflow()
+
+        for spec in JobRegistry(config=config):
+            task = dag.get_task(spec.name)
+            upstream = set(spec.depends_on or ["wait_until_cluster_running"])
+            assert task.upstream_task_ids == upstream | {"check_inputs_changed"}
+
+    def test_checks_inputs_before_starting_cluster(self):
+        module = _import_dag()
+        dag = module.taskflow()
+
+        assert dag.get_task("start_cluster").upstream_task_ids == {
+            "check_inputs_changed"
+        }
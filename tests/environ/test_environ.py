@@ -60,3 +60,18 @@ class TestCheckEnviron:
 
         with pytest.raises(EnvironNotSet):
             environ.check_environ(var=_VARS)
+
+
+class TestLoadEnvironOnce:
+    def test_reads_file_once(self, environ, tmp_path):
+        path = Path(tmp_path, ".env")
+        path.write_text("TEST_ONCE_VAR=value\n")
+
+        with patch.object(environ, "_find_dotenv", return_value=str(path)):
+            with patch.object(environ, "_read_dotenv") as read_dotenv:
+                environ.load_environ()
+                environ.load_environ()
+                assert read_dotenv.call_count == 1
+
+                environ.load_environ(force=True)
+                assert read_dotenv.call_count == 2
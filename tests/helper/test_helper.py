@@ -1,11 +1,12 @@
 import sys
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 import pytest
 
 # package
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from src.helper import S3ServiceError
+from src.helper import S3ServiceError, SparkHelper
 
 
 class TestCheckS3ObjectExistence:
@@ -69,3 +70,96 @@ class TestGetSrcPath:
 
         assert err.type is S3ServiceError
         assert "No data on S3 for given arguments" in str(err.value)
+
+
+def _listing(*objects):
+    return [dict(Key=key, Size=size, ETag=etag) for key, size, etag in objects]
+
+
+class TestInputFingerprint:
+    @patch.object(SparkHelper, "_list_s3_objects")
+    @patch.object(SparkHelper, "_get_src_paths")
+    def test_stable_for_same_listing(self, get_paths, list_objects, helper, keeper):
+        get_paths.return_value = ("s3a://bucket/a", "s3a://bucket/b")
+        list_objects.side_effect = lambda key: _listing((key, 10, "etag"))
+
+        first = helper.get_input_fingerprint(event_types=("message",), keeper=keeper)
+        get_paths.return_value = ("s3a://bucket/b", "s3a://bucket/a")
+        second = helper.get_input_fingerprint(event_types=("message",), keeper=keeper)
+
+        assert first == second
+
+    @patch.object(SparkHelper, "_list_s3_objects")
+    @patch.object(SparkHelper, "_get_src_paths")
+    def test_changes_if_object_rewritten(self, get_paths, list_objects, helper, keeper):
+        get_paths.return_value = ("s3a://bucket/a",)
+
+        list_objects.return_value = _listing(("a/part-0", 10, "etag-1"))
+        first = helper.get_input_fingerprint(event_types=("message",), keeper=keeper)
+        list_objects.return_value = _listing(("a/part-0", 10, "etag-2"))
+        second = helper.get_input_fingerprint(event_types=("message",), keeper=keeper)
+
+        assert first != second
+
+    def test_read_returns_none_if_not_saved(self, helper, keeper):
+        from botocore.exceptions import ClientError
+
+        helper._s3 = MagicMock()
+        helper._s3.get_object.side_effect = ClientError(
+            {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+        )
+
+        assert helper.read_fingerprint(job="test_job", keeper=keeper) is None
+
+    def test_write_then_read(self, helper, keeper):
+        keeper.tgt_path = "s3a://bucket/datamarts"
+        helper._s3 = MagicMock()
+
+        helper.write_fingerprint(job="test_job", keeper=keeper, fingerprint="abc")
+        helper._s3.get_object.return_value = dict(Body=MagicMock(read=lambda: b"abc"))
+
+        assert helper.read_fingerprint(job="test_job", keeper=keeper) == "abc"
+        helper._s3.put_object.assert_called_once_with(
+            Bucket="bucket", Key="datamarts/_fingerprints/test_job", Body=b"abc"
+        )
+
+
+class TestS3ETag:
+    @patch.object(SparkHelper, "_list_s3_objects")
+    def test_same_for_unordered_listing(self, list_objects, helper):
+        list_objects.return_value = _listing(
+            ("a/part-0", 10, "e0"), ("a/part-1", 10, "e1")
+        )
+        first = helper.get_s3_etag(key="s3a://bucket/a")
+        list_objects.return_value = _listing(
+            ("a/part-1", 10, "e1"), ("a/part-0", 10, "e0")
+        )
+        second = helper.get_s3_etag(key="s3a://bucket/a")
+
+        assert first == second
+
+    @patch.object(SparkHelper, "_list_s3_objects")
+    def test_changes_if_object_rewritten(self, list_objects, helper):
+        list_objects.return_value = _listing(("a/part-0", 10, "etag-1"))
+        first = helper.get_s3_etag(key="s3a://bucket/a")
+        list_objects.return_value = _listing(("a/part-0", 10, "etag-2"))
+        second = helper.get_s3_etag(key="s3a://bucket/a")
+
+        assert first != second
+
+
+class TestDeleteS3Objects:
+    @patch.object(SparkHelper, "_list_s3_objects")
+    def test_deletes_by_batches(self, list_objects, helper):
+        list_objects.return_value = _listing(
+            *((f"prefix/part-{i}", 1, "etag") for i in range(2500))
+        )
+        helper._s3 = MagicMock()
+
+        deleted = helper._delete_s3_objects(key="s3a://bucket/prefix")
+
+        assert deleted == 2500
+        assert [
+            len(_.kwargs["Delete"]["Objects"])
+            for _ in helper._s3.delete_objects.call_args_list
+        ] == [1000, 1000, 500]
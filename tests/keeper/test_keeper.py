@@ -106,6 +106,44 @@ class TestArgsKeeper:
                 processed_dttm="2023-05-22",
             )
 
+    def test_argskeeper_end_date_not_set_by_default(self, keeper):
+        assert keeper.end_date is None
+        assert "End date" not in str(keeper)
+
+    def test_argskeeper_end_date_valid(self):
+        keeper = ArgsKeeper(
+            date="2022-04-03",
+            end_date="2022-04-10",
+            depth=10,
+            src_path="s3a://...",
+            tgt_path="s3a://...",
+            processed_dttm="2023-05-22T12:03:25",
+        )
+
+        assert keeper.end_date == "2022-04-10"
+
+    def test_argskeeper_end_date_raises_if_earlier_than_date(self):
+        with pytest.raises(ValueError):
+            ArgsKeeper(
+                date="2022-04-03",
+                end_date="2022-04-02",
+                depth=10,
+                src_path="s3a://...",
+                tgt_path="s3a://...",
+                processed_dttm="2023-05-22T12:03:25",
+            )
+
+    def test_argskeeper_end_date_raises_if_gt_today(self):
+        with pytest.raises(ValueError):
+            ArgsKeeper(
+                date="2022-04-03",
+                end_date=(date.today() + timedelta(days=2)).strftime("%Y-%m-%d"),
+                depth=10,
+                src_path="s3a://...",
+                tgt_path="s3a://...",
+                processed_dttm="2023-05-22T12:03:25",
+            )
+
 
 class TestSparkConfigKeeper:
     def test_spark_conf_keeper_exec_mem_valid(self, config_keeper):
@@ -140,3 +178,25 @@ class TestSparkConfigKeeper:
             SparkConfigKeeper(
                 executor_memory="2g", executor_cores=4, max_executors_num=66
             )
+
+    def test_spark_conf_keeper_tuning_not_set_by_default(self, config_keeper):
+        assert config_keeper.shuffle_partitions is None
+        assert config_keeper.broadcast_threshold is None
+
+    def test_spark_conf_keeper_shuffle_partitions_raises_if_not_valid(self):
+        with pytest.raises(ValueError):
+            SparkConfigKeeper(
+                executor_memory="2g",
+                executor_cores=1,
+                max_executors_num=24,
+                shuffle_partitions=0,
+            )
+
+    def test_spark_conf_keeper_broadcast_threshold_raises_if_wrong_pat(self):
+        with pytest.raises(ValueError):
+            SparkConfigKeeper(
+                executor_memory="2g",
+                executor_cores=1,
+                max_executors_num=24,
+                broadcast_threshold="10mb",
+            )
@@ -0,0 +1,116 @@
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.pool import ClusterPool, NoClusterAvailable
+from src.submitter import UnableToSubmitJob
+
+
+class TestAcquire:
+    def test_places_job_on_least_loaded_cluster(self, pool):
+        with patch.object(
+            ClusterPool,
+            "_get_statuses",
+            return_value={"main": "running", "extra": "running"},
+        ):
+            first = pool.acquire(job="first")
+            second = pool.acquire(job="second")
+
+        assert {first.cluster, second.cluster} == {"main", "extra"}
+        assert pool.get_loads() == {"main": 1, "extra": 1}
+
+    def test_skips_stopped_and_full_clusters(self, pool):
+        with pool._store.transaction() as state:
+            state["leases"] = {
+                _id: dict(cluster="main", job="job", since=time.time())
+                for _id in ("a", "b")
+            }
+
+        with patch.object(
+            ClusterPool,
+            "_get_statuses",
+            return_value={"main": "running", "extra": "running"},
+        ):
+            lease = pool.acquire(job="job")
+
+        assert lease.cluster == "extra"
+
+    def test_starts_cluster_if_none_running(self, pool):
+        statuses = iter(
+            (
+                {"main": "stopped", "extra": "stopped"},
+                {"main": "running", "extra": "stopped"},
+            )
+        )
+
+        with patch.object(
+            ClusterPool, "_get_statuses", side_effect=lambda: next(statuses)
+        ), patch.object(ClusterPool, "get_cluster") as mock_get_cluster:
+            lease = pool.acquire(job="job")
+
+        assert lease.cluster == "main"
+        mock_get_cluster.assert_called_once_with(name="main")
+        assert "main" in pool._store.read()["started"]
+
+    def test_raises_if_no_free_cluster_before_deadline(self, pool):
+        with pool._store.transaction() as state:
+            state["leases"] = {
+                _id: dict(cluster="main", job="job", since=time.time())
+                for _id in ("a", "b")
+            }
+
+        with patch.object(
+            ClusterPool,
+            "_get_statuses",
+            return_value={"main": "running", "extra": "starting"},
+        ):
+            with pytest.raises(NoClusterAvailable):
+                pool.acquire(job="job", deadline=0)
+
+        assert pool._store.read()["queue"] == {}
+
+    def test_outdated_leases_dropped(self, pool):
+        with pool._store.transaction() as state:
+            state["leases"] = {
+                "dead": dict(cluster="main", job="job", since=time.time() - 10**6)
+            }
+
+        assert pool.get_loads() == {"main": 0, "extra": 0}
+
+
+class TestSubmitJob:
+    def test_releases_slot_if_failed(self, pool, keeper):
+        mock_submitter = MagicMock()
+        mock_submitter.submit_job.side_effect = UnableToSubmitJob("Failed")
+
+        with patch.object(
+            ClusterPool,
+            "_get_statuses",
+            return_value={"main": "running", "extra": "stopped"},
+        ), patch.object(ClusterPool, "get_submitter", return_value=mock_submitter):
+            with pytest.raises(UnableToSubmitJob):
+                pool.submit_job(job="job", keeper=keeper)
+
+        assert pool.get_loads() == {"main": 0, "extra": 0}
+
+
+class TestStopStarted:
+    def test_stops_only_idle_started_clusters(self, pool):
+        with pool._store.transaction() as state:
+            state["started"] = {"main": dict(since=0), "extra": dict(since=0)}
+            state["leases"] = {"a": dict(cluster="extra", job="job", since=time.time())}
+
+        mock_cluster = MagicMock()
+        mock_cluster.get_status.return_value = "running"
+
+        with patch.object(ClusterPool, "get_cluster", return_value=mock_cluster):
+            stopped = pool.stop_started()
+
+        assert stopped == ["main"]
+        mock_cluster.exec_command.assert_called_once_with(command="stop")
+        assert list(pool._store.read()["started"]) == ["extra"]
@@ -0,0 +1,174 @@
+import json
+import shutil
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.reader import DatamartNotFound, DatamartReader
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+_PATH = "s3a://bucket/cdm/users-demographic-dm"
+_KEY = "cdm/users-demographic-dm/date=2022-04-26"
+
+
+@pytest.fixture
+def files(tmp_path) -> Path:
+    """Writes two files of users from 0 to 499 and from 500 to 999, 100 users per row group"""
+    path = tmp_path / "s3"
+    path.mkdir()
+
+    for i, name in enumerate(("part-00000.parquet", "part-00001.parquet")):
+        users = list(range(i * 500, (i + 1) * 500))
+        pq.write_table(
+            pa.table(dict(user_id=users, act_city=[f"city-{_ % 7}" for _ in users])),
+            path / name,
+            row_group_size=100,
+        )
+
+    (path / "_index.json").write_text(
+        json.dumps(
+            dict(
+                keys=["user_id"],
+                files=[
+                    dict(path="part-00000.parquet", rows=500, min=[0], max=[499]),
+                    dict(path="part-00001.parquet", rows=500, min=[500], max=[999]),
+                ],
+            )
+        )
+    )
+
+    return path
+
+
+def _objects(files: Path, date: str = "2022-04-26"):
+    return [
+        dict(Key=f"cdm/users-demographic-dm/date={date}/{_.name}", ETag=f'"{_.name}"')
+        for _ in sorted(files.iterdir())
+    ]
+
+
+@pytest.fixture
+def s3(reader, files) -> MagicMock:
+    """Fake S3 serving local files"""
+    reader._s3 = MagicMock()
+    reader._s3.download_file.side_effect = lambda Bucket, Key, Filename: shutil.copy(
+        files / Key.split("/")[-1], Filename
+    )
+    reader._s3.get_object.side_effect = lambda Bucket, Key: dict(
+        Body=MagicMock(read=(files / Key.split("/")[-1]).read_bytes)
+    )
+
+    return reader._s3
+
+
+@patch.object(DatamartReader, "_list_s3_objects")
+class TestLookup:
+    def test_reads_only_file_in_range(self, mock_list, reader, files, s3):
+        mock_list.return_value = _objects(files)
+
+        rows = reader.lookup(
+            datamart="users-demographic-dm",
+            filters=dict(user_id=742),
+            tgt_path="s3a://bucket/cdm",
+        )
+
+        assert rows == [dict(user_id=742, act_city="city-0")]
+        s3.download_file.assert_called_once()
+        assert s3.download_file.call_args.kwargs["Key"] == f"{_KEY}/part-00001.parquet"
+
+    def test_reads_all_files_without_index(self, mock_list, reader, files, s3):
+        mock_list.return_value = [
+            _ for _ in _objects(files) if not _["Key"].endswith("_index.json")
+        ]
+
+        rows = reader.lookup(
+            datamart="users-demographic-dm",
+            filters=dict(act_city="city-3"),
+            columns=["user_id"],
+            tgt_path="s3a://bucket/cdm",
+        )
+
+        assert rows == [dict(user_id=_) for _ in range(1000) if _ % 7 == 3]
+        assert s3.download_file.call_count == 2
+
+    def test_row_groups_skipped_by_statistics(self, mock_list, reader, files, s3):
+        mock_list.return_value = _objects(files)
+
+        reader.lookup(
+            datamart="users-demographic-dm",
+            filters=dict(user_id=142),
+            tgt_path="s3a://bucket/cdm",
+        )
+        reader.lookup(
+            datamart="users-demographic-dm",
+            filters=dict(user_id=143),
+            tgt_path="s3a://bucket/cdm",
+        )
+
+        # the second lookup is served from cached row group
+        assert len(reader._row_groups) == 1
+        assert mock_list.call_count == 1
+
+    def test_latest_partition_by_default(self, mock_list, reader, files, s3):
+        mock_list.return_value = _objects(files, date="2022-04-25") + _objects(files)
+
+        reader.lookup(
+            datamart="users-demographic-dm",
+            filters=dict(user_id=1),
+            tgt_path="s3a://bucket/cdm",
+        )
+
+        assert s3.download_file.call_args.kwargs["Key"] == f"{_KEY}/part-00000.parquet"
+        assert reader.get_dates(
+            datamart="users-demographic-dm", tgt_path="s3a://bucket/cdm"
+        ) == ["2022-04-25", "2022-04-26"]
+
+    def test_raises_if_no_partition(self, mock_list, reader, files, s3):
+        mock_list.return_value = _objects(files)
+
+        with pytest.raises(DatamartNotFound):
+            reader.lookup(
+                datamart="users-demographic-dm",
+                filters=dict(user_id=1),
+                date="2022-04-01",
+                tgt_path="s3a://bucket/cdm",
+            )
+
+    def test_least_recently_used_files_evicted(self, mock_list, reader, files, s3):
+        mock_list.return_value = _objects(files)
+        reader._READER = dict(reader._READER, max_cache_bytes=1)
+
+        for user_id in (1, 742):
+            reader.lookup(
+                datamart="users-demographic-dm",
+                filters=dict(user_id=user_id),
+                tgt_path="s3a://bucket/cdm",
+            )
+
+        assert len(list(reader._cache_path.glob("*.parquet"))) == 1
+        assert all(_[0].exists() for _ in reader._row_groups)
+
+    def test_opened_file_readable_after_eviction(self, mock_list, reader, files, s3):
+        mock_list.return_value = _objects(files)
+        reader._READER = dict(reader._READER, max_cache_bytes=1)
+
+        obj = dict(_objects(files)[1], Bucket="bucket")
+        path, file = reader._open_local_file(obj=obj)
+
+        # another request evicts the file before this one reads it
+        reader.lookup(
+            datamart="users-demographic-dm",
+            filters=dict(user_id=742),
+            tgt_path="s3a://bucket/cdm",
+        )
+
+        assert not path.exists()
+        assert reader._lookup_file(
+            path=path, file=file, filters=dict(user_id=1), columns=None
+        ) == [dict(user_id=1, act_city="city-1")]
@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.config import Config
+from src.registry import JobGraphError, JobRegistry, UnknownJob
+
+
+def _make_config(tmp_path, jobs: str) -> Config:
+    path = Path(tmp_path, "config.yaml")
+    path.write_text("environ:\n  type: dev\n  is_prod: false\nspark:\n  jobs:\n" + jobs)
+
+    return Config(config_path=path)
+
+
+def _job(name: str, depends_on: str = "[]") -> str:
+    return (
+        f"    {name}:\n"
+        f"      method: collect_{name}\n"
+        f"      event_types: [message]\n"
+        f"      depends_on: {depends_on}\n"
+        f"      date: 2022-04-26\n"
+        f"      depth: 10\n"
+    )
+
+
+class TestJobRegistry:
+    def test_reads_project_config(self, config):
+        registry = JobRegistry(config=config)
+
+        assert "collect_users_demographic_dm_job" in registry
+        assert registry.get("collect_users_demographic_dm_job").event_types == (
+            "message",
+        )
+
+    def test_splits_args(self, tmp_path):
+        spec = JobRegistry(config=_make_config(tmp_path, _job("a"))).get("a")
+
+        assert spec.method == "collect_a"
+        assert spec.profile == "default"
+        assert set(spec.args) == {"date", "depth"}
+
+    def test_raises_if_unknown_job(self, tmp_path):
+        registry = JobRegistry(config=_make_config(tmp_path, _job("a")))
+
+        with pytest.raises(UnknownJob):
+            registry.get("b")
+
+    def test_get_stages(self, tmp_path):
+        registry = JobRegistry(
+            config=_make_config(
+                tmp_path,
+                _job("a") + _job("b", "[a]") + _job("c") + _job("d", "[b, c]"),
+            )
+        )
+
+        assert registry.get_stages() == [("a", "c"), ("b",), ("d",)]
+
+    def test_raises_if_loop(self, tmp_path):
+        with pytest.raises(JobGraphError):
+            JobRegistry(
+                config=_make_config(tmp_path, _job("a", "[b]") + _job("b", "[a]"))
+            )
+
+    def test_raises_if_unknown_dependency(self, tmp_path):
+        with pytest.raises(JobGraphError):
+            JobRegistry(config=_make_config(tmp_path, _job("a", "[z]")))
@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.sizer import RunMetrics
+
+_GB = 1024**3
+
+
+class TestEstimate:
+    def test_without_history(self, sizer):
+        conf = sizer.estimate(job="job", input_bytes=2 * _GB)
+
+        # 2 GB * 3 / 128 MB = 48 partitions, 2 waves on 1 core executors
+        assert conf.shuffle_partitions == 48
+        assert conf.max_executors_num == 24
+        assert conf.executor_cores == 1
+        assert conf.executor_memory == "3000m"
+        assert conf.broadcast_threshold == "150m"
+
+    def test_small_input_bounded_by_min(self, sizer):
+        conf = sizer.estimate(job="job", input_bytes=1024)
+
+        assert conf.shuffle_partitions == 8
+        assert conf.max_executors_num == 4
+
+    def test_executors_scaled_by_past_throughput(self, sizer):
+        # 1 GB processed by 2 cores in 1800 secs
+        sizer.record(
+            job="job",
+            metrics=RunMetrics(
+                input_bytes=_GB, duration=1800, executors=2, executor_cores=1
+            ),
+        )
+
+        conf = sizer.estimate(job="job", input_bytes=4 * _GB)
+
+        assert conf.max_executors_num == 8
+        assert conf.shuffle_partitions % conf.max_executors_num == 0
+
+    def test_memory_grows_if_spilled(self, sizer):
+        sizer.record(
+            job="job",
+            metrics=RunMetrics(
+                input_bytes=_GB,
+                duration=600,
+                executors=2,
+                executor_cores=1,
+                spilled_bytes=_GB // 2,
+            ),
+        )
+
+        conf = sizer.estimate(job="job", input_bytes=_GB)
+
+        assert conf.executor_memory == "4500m"
+
+    def test_history_separated_by_job(self, sizer):
+        sizer.record(
+            job="other_job",
+            metrics=RunMetrics(
+                input_bytes=_GB, duration=60, executors=1, executor_cores=1
+            ),
+        )
+
+        assert sizer.get_history(job="job") == []
+        assert len(sizer.get_history(job="other_job")) == 1
+
+
+class TestRecord:
+    def test_keeps_only_last_runs(self, sizer):
+        for i in range(sizer._SIZING["history_size"] + 5):
+            sizer.record(
+                job="job",
+                metrics=RunMetrics(
+                    input_bytes=i, duration=1, executors=1, executor_cores=1
+                ),
+            )
+
+        history = sizer.get_history(job="job")
+
+        assert len(history) == sizer._SIZING["history_size"]
+        assert history[-1].input_bytes == sizer._SIZING["history_size"] + 4
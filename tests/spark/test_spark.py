@@ -0,0 +1,1408 @@
+#
+# Golden-output tests of `DatamartCollector`. Datamarts collected by the
+# current implementation are compared row by row with ones collected by
+# `ReferenceCollector` on the same synthetic data.
+#
+# `ReferenceCollector` keeps frozen copies of collector methods which
+# compute datamarts. Optimized implementation must give exactly the same
+# rows, so copies are changed only together with intended changes of
+# datamarts contents.
+#
+# Tests require `pyspark` and Java and are skipped without them.
+#
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+if TYPE_CHECKING:
+    from typing import Dict, Literal, Tuple
+
+    import pyspark.sql  # type: ignore
+
+    from src.keeper import ArgsKeeper
+
+pytest.importorskip("pyspark")
+
+# package
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from benchmarks.spark.generator import END_DATE, generate
+from benchmarks.spark.local import LocalDatamartCollector, get_local_keeper
+from src.keeper import SparkConfigKeeper
+from src.spark.bloom import PairBloomFilter, get_bloom_size
+from src.spark.collector import DatamartCollector
+from src.spark.skew import SkewProfiler
+from src.spark.timeline import (
+    first_value,
+    group_bounds,
+    keep_first,
+    last_value,
+    run_starts,
+    stream_timelines,
+)
+from src.spark.timezone import MAX_TS, MIN_TS, get_utc_offsets
+
+USERS = 100
+DAYS = 35
+DEPTH = 28
+
+
+class ReferenceCollector(LocalDatamartCollector):
+    """Collector with frozen implementation of datamarts computation"""
+
+    __slots__ = ()
+
+    def _compute_distances(
+        self, df: pyspark.sql.DataFrame, coord_cols_prefix: Tuple[str, str]
+    ) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._compute_distances`"
+        self.logger.debug("Computing distances")
+
+        import pyspark.sql.functions as F  # type: ignore
+
+        self.logger.debug(f"Given 'coord_cols_prefix': {coord_cols_prefix}")
+
+        if len(coord_cols_prefix) > 2:
+            raise IndexError(
+                "Only two values are allowed for 'coord_cols_prefix' argument"
+            )
+
+        cols = ((col + "_lat", col + "_lon") for col in coord_cols_prefix)
+
+        lat_1, lon_1 = next(cols)  # latitude and longitude of first point
+        lat_2, lon_2 = next(cols)  # same for second point
+
+        self.logger.debug("Checking coordinates columns existance in dataframe")
+
+        if not all(col in df.columns for col in (lat_1, lon_1, lat_2, lon_2)):
+            raise KeyError(
+                "DataFrame should contains coordinates columns with names listed in 'coord_cols_prefix' argument"
+            )
+        self.logger.debug("OK")
+
+        self.logger.debug("Processing computations")
+
+        # Computations itself splitted into parts
+        distance_lat = F.radians(F.col(lat_2)) - F.radians(F.col(lat_1))
+        distance_lon = F.radians(F.col(lon_2)) - F.radians(F.col(lon_1))
+
+        part_one = (
+            F.sin(distance_lat / 2) ** 2
+            + F.cos(F.radians(F.col(lat_1)))
+            * F.cos(F.radians(F.col(lat_2)))
+            * F.sin(distance_lon / 2) ** 2
+        )
+        part_two = F.sin(F.sqrt(part_one))  # type: ignore
+        distance = 2 * 6371 * part_two  # type: ignore
+
+        return df.withColumn("distance", F.round(distance, 0))
+
+    def _get_cities_coords_df(self, keeper: ArgsKeeper) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._get_cities_coords_df`"
+        self.logger.debug(
+            f"Getting cities coordinates dataframe from S3 paths -> {keeper.coords_path}"
+        )
+        return self.spark.read.parquet(keeper.coords_path)  # type: ignore
+
+    def _add_event_location_to_df(
+        self,
+        df: pyspark.sql.DataFrame,
+        cities_coord_df: pyspark.sql.DataFrame,
+        event: Literal["message", "reaction", "subscription", "registration"],
+    ) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._add_event_location_to_df`"
+        self.logger.debug(f"Adding event location for '{event}' event type")
+
+        import pyspark.sql.functions as F  # type: ignore
+        from pyspark.sql import Window as W  # type: ignore
+
+        _PARTITION_BY = (
+            ["user_id", "subscription_channel"]
+            if event == "subscription"
+            else "message_id"
+        )
+
+        self.logger.debug("Joining given dataframe with cities coordinates")
+
+        sdf = df.crossJoin(
+            cities_coord_df.select("city_id", "city_name", "city_lat", "city_lon")
+        )
+        sdf = self._compute_distances(
+            df=sdf,
+            coord_cols_prefix=("event", "city"),
+        )
+
+        self.logger.debug(f"Will partition by: {_PARTITION_BY}")
+
+        w = W().partitionBy(_PARTITION_BY).orderBy(F.asc("distance"))  # type: ignore
+
+        self.logger.debug("Collecting resulting dataframe")
+
+        sdf = (
+            sdf.withColumn(
+                "city_dist_rnk",
+                F.row_number().over(w),
+            )
+            .where(F.col("city_dist_rnk") == 1)
+            .drop(
+                "city_lat",
+                "city_lon",
+                "distance",
+                "city_dist_rnk",
+            )
+        )
+
+        return sdf
+
+    def _get_users_actual_data_df(self, keeper: ArgsKeeper) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._get_users_actual_data_df`"
+        self.logger.debug("Collecting dataframe of users actual data")
+
+        import pyspark.sql.functions as F  # type: ignore
+        from pyspark.sql import Window as W  # type: ignore
+
+        events_sdf = self._read_events_df(event_type="message", keeper=keeper)
+
+        self.logger.debug("Processing messages data")
+
+        sdf = (
+            events_sdf.where(events_sdf.message_from.isNotNull())
+            .select(
+                events_sdf.message_from.alias("user_id"),
+                events_sdf.message_id,
+                events_sdf.message_ts,
+                events_sdf.datetime,
+                events_sdf.lat.alias("event_lat"),
+                events_sdf.lon.alias("event_lon"),
+            )
+            .withColumn(
+                "msg_ts",
+                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
+                    F.col("datetime")
+                ),
+            )
+            .drop("message_ts", "datetime")
+        )
+        cities_coords_sdf = self._get_cities_coords_df(keeper=keeper)
+
+        sdf = self._add_event_location_to_df(
+            df=sdf,
+            cities_coord_df=cities_coords_sdf,
+            event="message",
+        )
+
+        self.logger.debug("Preparing users actual data results")
+
+        w = W().partitionBy("user_id").orderBy(F.desc("msg_ts"))
+
+        sdf = (
+            sdf.withColumn(
+                "act_city",
+                F.first(col="city_name", ignorenulls=True).over(w),
+            )
+            .withColumn(
+                "act_city_id",
+                F.first(col="city_id", ignorenulls=True).over(w),
+            )
+            .withColumn(
+                "last_msg_ts",
+                F.first(col="msg_ts", ignorenulls=True).over(w),
+            )
+            .drop("city_id")
+        )
+
+        return (
+            sdf.join(
+                cities_coords_sdf.select("city_id", "timezone"),
+                on=F.col("act_city_id") == cities_coords_sdf.city_id,
+                how="left",
+            )
+            .withColumn(
+                "local_time",
+                F.from_utc_timestamp(
+                    timestamp=F.col("last_msg_ts"), tz=F.col("timezone")
+                ),
+            )
+            .select(
+                "user_id",
+                "message_id",
+                "msg_ts",
+                "city_name",
+                "act_city",
+                "act_city_id",
+                "local_time",
+            )
+        )
+
+    def _get_travels_df(self, df: pyspark.sql.DataFrame) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._get_travels_df`"
+        import pyspark.sql.functions as F  # type: ignore
+        from pyspark.sql import Window as W  # type: ignore
+
+        self.logger.debug("Collecting travels data")
+
+        w = W().partitionBy("user_id").orderBy(F.asc("msg_ts"))
+
+        return (
+            df.withColumn(
+                "prev_city",
+                F.lag("city_name").over(w),
+            )
+            .withColumn(
+                "visit_flg",
+                F.when(
+                    (F.col("city_name") != F.col("prev_city"))
+                    | (F.col("prev_city").isNull()),
+                    F.lit(1),
+                ).otherwise(F.lit(0)),
+            )
+            .where(F.col("visit_flg") == 1)
+            .groupby("user_id")
+            .agg(
+                F.collect_list("city_name").alias("travel_array"),
+                F.collect_list("msg_ts").alias("travel_ts_array"),
+            )
+            .select(
+                "user_id",
+                "travel_array",
+                F.size("travel_array").alias("travel_count"),
+                "travel_ts_array",
+            )
+        )
+
+    def _get_home_city_df(
+        self, travels_df: pyspark.sql.DataFrame
+    ) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._get_home_city_df`"
+        import pyspark.sql.functions as F  # type: ignore
+        from pyspark.sql import Window as W  # type: ignore
+
+        self.logger.debug("Collecting users home city")
+
+        w = W().partitionBy("user_id").orderBy(F.asc("travel_ts"))
+
+        return (
+            travels_df.withColumn(
+                "zipped_array", F.arrays_zip("travel_array", "travel_ts_array")
+            )
+            .withColumn("upzipped_array", F.explode("zipped_array"))
+            .withColumn("travel_city", F.col("upzipped_array").getItem("travel_array"))
+            .withColumn("travel_ts", F.col("upzipped_array").getItem("travel_ts_array"))
+            .withColumn(
+                "prev_travel_ts",
+                F.lag("travel_ts").over(w),
+            )
+            .withColumn(
+                "prev_travel_city",
+                F.lag("travel_city").over(w),
+            )
+            .withColumn("diff", F.datediff("travel_ts", "prev_travel_ts"))
+            .where(F.col("diff") > 27)
+            .withColumn(
+                "rnk",
+                F.row_number().over(w),
+            )
+            .where(F.col("rnk") == 1)
+            .select("user_id", F.col("prev_travel_city").alias("home_city"))
+        )
+
+    def _build_users_demographic_df(
+        self, keeper: ArgsKeeper, datamart: str
+    ) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._build_users_demographic_df`"
+        from pyspark.sql.types import (
+            ArrayType,
+            IntegerType,
+            LongType,
+            StringType,
+            StructField,
+            StructType,
+            TimestampType,
+        )
+
+        sdf = self._checkpoint(
+            build=lambda: self._get_users_actual_data_df(keeper=keeper),
+            datamart=datamart,
+            stage="users-actual-data",
+            keeper=keeper,
+        )
+
+        travels_sdf = self._checkpoint(
+            build=lambda: self._get_travels_df(df=sdf),
+            datamart=datamart,
+            stage="travels",
+            keeper=keeper,
+        )
+        home_city_sdf = self._get_home_city_df(travels_df=travels_sdf)
+
+        self.logger.debug("Preparing results")
+
+        sdf = (
+            sdf.drop_duplicates(subset=["user_id"])
+            .join(travels_sdf, how="left", on="user_id")
+            .join(home_city_sdf, how="left", on="user_id")
+            .select(
+                "user_id",
+                "act_city",
+                "home_city",
+                "local_time",
+                "travel_count",
+                "travel_array",
+            )
+        )
+
+        sdf = sdf.fillna(value="Couldn't determine", subset="home_city")
+
+        _SCHEMA = StructType(
+            [
+                StructField("user_id", LongType(), nullable=False),
+                StructField("act_city", StringType(), nullable=False),
+                StructField("home_city", StringType(), nullable=False),
+                StructField("local_time", TimestampType(), nullable=False),
+                StructField("travel_count", IntegerType(), nullable=False),
+                StructField("travel_array", ArrayType(StringType()), nullable=False),
+            ]
+        )
+
+        return self.spark.createDataFrame(sdf.rdd, schema=_SCHEMA)
+
+    def _build_events_total_cnt_agg_wk_mnth_df(
+        self, keeper: ArgsKeeper, datamart: str
+    ) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._build_events_total_cnt_agg_wk_mnth_df`"
+        import pyspark.sql.functions as F
+        from pyspark.sql import Window as W
+        from pyspark.sql.types import (
+            DateType,
+            IntegerType,
+            LongType,
+            StructField,
+            StructType,
+        )
+        from pyspark.storagelevel import StorageLevel
+
+        cities_coords_sdf = self._get_cities_coords_df(keeper=keeper).persist(
+            storageLevel=StorageLevel.MEMORY_ONLY
+        )
+
+        _W = W().partitionBy(F.col("zone_id"), F.col("month"))
+
+        self.logger.debug("Collecing messages data")
+
+        messages_sdf = self._read_events_df(event_type="message", keeper=keeper)
+
+        messages_sdf = (
+            messages_sdf.where(F.col("message_from").isNotNull())
+            .select(
+                F.col("message_from").alias("user_id"),
+                F.col("message_id"),
+                F.col("message_ts"),
+                F.col("datetime"),
+                F.col("lat").alias("event_lat"),
+                F.col("lon").alias("event_lon"),
+            )
+            .withColumn(
+                "msg_ts",
+                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
+                    F.col("datetime")
+                ),
+            )
+            .drop_duplicates(subset=["user_id", "message_id", "msg_ts"])
+            .drop("datetime", "message_ts")
+        )
+
+        messages_sdf = self._add_event_location_to_df(
+            df=messages_sdf,
+            cities_coord_df=cities_coords_sdf,
+            event="message",
+        )
+
+        messages_sdf = (
+            messages_sdf.withColumnRenamed("city_id", "zone_id")
+            .withColumn("week", F.trunc(F.col("msg_ts"), "week"))
+            .withColumn("month", F.trunc(F.col("msg_ts"), "month"))
+            .groupby("month", "week", "zone_id")
+            .agg(F.count("message_id").alias("week_message"))
+            .withColumn(
+                "month_message",
+                F.sum(F.col("week_message")).over(_W),
+            )
+        )
+        messages_sdf = self._checkpoint(
+            build=lambda: messages_sdf,
+            datamart=datamart,
+            stage="zoned-messages",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
+
+        self.logger.debug("Collecing reacitons data")
+
+        reaction_sdf = self._read_events_df(event_type="reaction", keeper=keeper)
+
+        reaction_sdf = (
+            reaction_sdf.select(
+                F.col("datetime"),
+                F.col("message_id"),
+                F.col("reaction_from").alias("user_id"),
+                F.col("lat").alias("event_lat"),
+                F.col("lon").alias("event_lon"),
+            )
+            .drop_duplicates(subset=["user_id", "message_id", "datetime"])
+            .where(F.col("event_lat").isNotNull())
+        )
+        reaction_sdf = self._add_event_location_to_df(
+            df=reaction_sdf,
+            cities_coord_df=cities_coords_sdf,
+            event="reaction",
+        )
+
+        reaction_sdf = (
+            reaction_sdf.withColumnRenamed("city_id", "zone_id")
+            .where(F.col("event_lat").isNotNull())
+            .withColumn("week", F.trunc(F.col("datetime"), "week"))
+            .withColumn("month", F.trunc(F.col("datetime"), "month"))
+            .groupby("month", "week", "zone_id")
+            .agg(F.count("message_id").alias("week_reaction"))
+            .withColumn(
+                "month_reaction",
+                F.sum(F.col("week_reaction")).over(_W),
+            )
+        )
+        reaction_sdf = self._checkpoint(
+            build=lambda: reaction_sdf,
+            datamart=datamart,
+            stage="zoned-reactions",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
+
+        self.logger.debug("Collecing registrations data")
+
+        registrations_sdf = self._read_events_df(event_type="message", keeper=keeper)
+        w = W().partitionBy("user_id").orderBy(F.asc("msg_ts"))
+
+        registrations_sdf = (
+            registrations_sdf.where(F.col("message_from").isNotNull())
+            .select(
+                F.col("message_from").alias("user_id"),
+                F.col("message_id"),
+                F.col("message_ts"),
+                F.col("datetime"),
+                F.col("lat").alias("event_lat"),
+                F.col("lon").alias("event_lon"),
+            )
+            .withColumn(
+                "msg_ts",
+                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
+                    F.col("datetime")
+                ),
+            )
+            .drop_duplicates(subset=["user_id", "message_id", "msg_ts"])
+            .drop("datetime", "message_ts")
+            .withColumn(
+                "registration_ts", F.first(col="msg_ts", ignorenulls=True).over(w)
+            )
+            .withColumn(
+                "is_reg",
+                F.when(F.col("registration_ts") == F.col("msg_ts"), F.lit(1)).otherwise(
+                    F.lit(0)
+                ),
+            )
+            .where(F.col("is_reg") == F.lit(1))
+            .drop("is_reg", "registration_ts")
+        )
+        registrations_sdf = self._add_event_location_to_df(
+            df=registrations_sdf,
+            cities_coord_df=cities_coords_sdf,
+            event="registration",
+        )
+
+        registrations_sdf = (
+            registrations_sdf.withColumnRenamed("city_id", "zone_id")
+            .where(F.col("event_lat").isNotNull())
+            .withColumn("week", F.trunc(F.col("msg_ts"), "week"))
+            .withColumn("month", F.trunc(F.col("msg_ts"), "month"))
+            .groupby("month", "week", "zone_id")
+            .agg(F.count("user_id").alias("week_user"))
+            .withColumn(
+                "month_user",
+                F.sum(F.col("week_user")).over(_W),
+            )
+        )
+        registrations_sdf = self._checkpoint(
+            build=lambda: registrations_sdf,
+            datamart=datamart,
+            stage="zoned-registrations",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
+
+        self.logger.debug("Collecing subscriptions data")
+
+        subscriptions_sdf = self._read_events_df(
+            event_type="subscription", keeper=keeper
+        )
+
+        subscriptions_sdf = (
+            subscriptions_sdf.select(
+                F.col("datetime"),
+                F.col("subscription_channel"),
+                F.col("user").alias("user_id"),
+                F.col("lat").alias("event_lat"),
+                F.col("lon").alias("event_lon"),
+            )
+            .drop_duplicates(subset=["user_id", "subscription_channel", "datetime"])
+            .where(F.col("event_lat").isNotNull())
+        )
+
+        subscriptions_sdf = self._add_event_location_to_df(
+            df=subscriptions_sdf,
+            cities_coord_df=cities_coords_sdf,
+            event="subscription",
+        )
+        subscriptions_sdf = (
+            subscriptions_sdf.withColumnRenamed("city_id", "zone_id")
+            .where(F.col("event_lat").isNotNull())
+            .withColumn("week", F.trunc(F.col("datetime"), "week"))
+            .withColumn("month", F.trunc(F.col("datetime"), "month"))
+            .groupby("month", "week", "zone_id")
+            .agg(F.count("user_id").alias("week_subscription"))
+            .withColumn(
+                "month_subscription", F.sum(F.col("week_subscription")).over(_W)
+            )
+        )
+        subscriptions_sdf = self._checkpoint(
+            build=lambda: subscriptions_sdf,
+            datamart=datamart,
+            stage="zoned-subscriptions",
+            keeper=keeper,
+        ).persist(storageLevel=StorageLevel.MEMORY_ONLY)
+
+        self.logger.debug("Joining dataframes")
+
+        _COLS = ["zone_id", "week", "month"]
+        sdf = (
+            messages_sdf.join(other=reaction_sdf, on=_COLS)
+            .join(other=registrations_sdf, on=_COLS)
+            .join(other=subscriptions_sdf, on=_COLS)
+            .orderBy(_COLS)  # type: ignore
+            .select(
+                "zone_id",
+                "week",
+                "month",
+                "week_message",
+                "week_reaction",
+                "week_subscription",
+                "week_user",
+                "month_message",
+                "month_reaction",
+                "month_subscription",
+                "month_user",
+            )
+            .dropna()
+        )
+
+        for frame in (
+            messages_sdf,
+            reaction_sdf,
+            registrations_sdf,
+            subscriptions_sdf,
+            cities_coords_sdf,
+        ):
+            frame.unpersist()
+
+        _SCHEMA = StructType(
+            [
+                StructField("zone_id", IntegerType(), nullable=False),
+                StructField("week", DateType(), nullable=False),
+                StructField("month", DateType(), nullable=False),
+                StructField("week_message", LongType(), nullable=False),
+                StructField("week_reaction", LongType(), nullable=False),
+                StructField("week_subscription", LongType(), nullable=False),
+                StructField("week_user", LongType(), nullable=False),
+                StructField("month_message", LongType(), nullable=False),
+                StructField("month_reaction", LongType(), nullable=False),
+                StructField("month_subscription", LongType(), nullable=False),
+                StructField("month_user", LongType(), nullable=False),
+            ]
+        )
+        return self.spark.createDataFrame(data=sdf.rdd, schema=_SCHEMA)
+
+    def _get_candidate_pairs_df(self, keeper: ArgsKeeper) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._get_candidate_pairs_df`"
+        import pyspark.sql.functions as F  # type: ignore
+        from pyspark.sql import Window as W  # type: ignore
+
+        real_contacts_sdf = self._read_events_df(event_type="message", keeper=keeper)
+
+        self.logger.debug("Collecting dataframe with real contacts")
+
+        # реальные контакты
+        real_contacts_sdf = (
+            real_contacts_sdf.where(F.col("message_to").isNotNull())
+            .select(
+                F.col("message_from"),
+                F.col("message_to"),
+            )
+            .withColumn(
+                "user_id",
+                F.explode(F.array(F.col("message_from"), F.col("message_to"))),
+            )
+            .withColumn(
+                "contact_id",
+                F.when(
+                    F.col("user_id") == F.col("message_from"), F.col("message_to")
+                ).otherwise(F.col("message_from")),
+            )
+            .select("user_id", "contact_id")
+            .distinct()
+        )
+
+        self.logger.debug("Collecting all users with subscriptions")
+        #  все пользователи подписавшиеся на один из каналов (любой)
+        subs_sdf = self._read_events_df(event_type="subscription", keeper=keeper)
+
+        subs_sdf = (
+            subs_sdf.where(F.col("subscription_channel").isNotNull())
+            .where(F.col("user").isNotNull())
+            .select(
+                F.col("subscription_channel"),
+                F.col("user").alias("user_id"),
+            )
+            .drop_duplicates(subset=["user_id", "subscription_channel"])
+        )
+
+        self.logger.debug("Collecting users with the same subsctiptions only")
+        # пользователи подписанные на один и тот же канал
+        subs_sdf = (
+            subs_sdf.withColumnRenamed("user_id", "left_user")
+            .join(
+                subs_sdf.withColumnRenamed("user_id", "right_user"),
+                on="subscription_channel",
+                how="cross",
+            )
+            .where(F.col("left_user") != F.col("right_user"))
+        )
+
+        self.logger.debug("Excluding real contacts")
+        #  убрать пользователей которые переписывались
+        users_for_rec = subs_sdf.join(
+            real_contacts_sdf,
+            on=[
+                subs_sdf.left_user == real_contacts_sdf.user_id,
+                subs_sdf.right_user == real_contacts_sdf.contact_id,
+            ],
+            how="left_anti",
+        )
+
+        self.logger.debug("Collecting last message coordinates dataframe")
+        # все пользователи которые писали сообщения -> координаты последнего отправленого сообщения
+        messages_sdf = self._read_events_df(event_type="message", keeper=keeper)
+        w = W().partitionBy("user_id").orderBy(F.asc("msg_ts"))
+
+        messages_sdf = (
+            messages_sdf.where(F.col("message_from").isNotNull())
+            .select(
+                F.col("message_from").alias("user_id"),
+                F.col("message_ts"),
+                F.col("datetime"),
+                F.col("lat").alias("event_lat"),
+                F.col("lon").alias("event_lon"),
+            )
+            .withColumn(
+                "msg_ts",
+                F.when(F.col("message_ts").isNotNull(), F.col("message_ts")).otherwise(
+                    F.col("datetime")
+                ),
+            )
+            .withColumn(
+                "last_msg_ts",
+                F.first(col="msg_ts", ignorenulls=True).over(w),
+            )
+            .where(F.col("msg_ts") == F.col("last_msg_ts"))
+            .select("user_id", "event_lat", "event_lon")
+            .distinct()
+        )
+
+        self.logger.debug("Collecting coordinates for potential recomendations users")
+        #  коорнинаты пользователей
+        users_for_rec = (
+            users_for_rec.join(
+                messages_sdf.select(
+                    F.col("user_id"),
+                    F.col("event_lat").alias("left_user_lat"),
+                    F.col("event_lon").alias("left_user_lon"),
+                ),
+                how="left",
+                on=[users_for_rec.left_user == messages_sdf.user_id],
+            )
+            .drop("user_id")
+            .join(
+                messages_sdf.select(
+                    F.col("user_id"),
+                    F.col("event_lat").alias("right_user_lat"),
+                    F.col("event_lon").alias("right_user_lon"),
+                ),
+                how="left",
+                on=[users_for_rec.right_user == messages_sdf.user_id],
+            )
+            .drop("user_id")
+            .where(F.col("left_user_lat").isNotNull())
+            .where(F.col("right_user_lat").isNotNull())
+        )
+
+        sdf = self._compute_distances(
+            df=users_for_rec, coord_cols_prefix=("left_user", "right_user")
+        )
+
+        return sdf.where(sdf.distance <= 1).select("left_user", "right_user").distinct()
+
+    def _build_add_to_friends_recommendations_df(
+        self, keeper: ArgsKeeper, datamart: str
+    ) -> pyspark.sql.DataFrame:
+        "Frozen `DatamartCollector._build_add_to_friends_recommendations_df`"
+        import pyspark.sql.functions as F
+        from pyspark.sql.types import (
+            IntegerType,
+            LongType,
+            StructField,
+            StructType,
+            TimestampType,
+        )
+
+        sdf = self._checkpoint(
+            build=lambda: self._get_candidate_pairs_df(keeper=keeper),
+            datamart=datamart,
+            stage="candidate-pairs",
+            keeper=keeper,
+        )
+
+        users_info_sdf = self._checkpoint(
+            build=lambda: self._get_users_actual_data_df(keeper=keeper),
+            datamart=datamart,
+            stage="users-actual-data",
+            keeper=keeper,
+        )
+
+        self.logger.debug("Collecting resulting dataframe")
+
+        # сборка итога
+        sdf = (
+            sdf.join(
+                users_info_sdf.select(
+                    "user_id", "act_city_id", "local_time"
+                ).distinct(),
+                on=[sdf.left_user == users_info_sdf.user_id],
+                how="left",
+            )
+            .withColumn("processed_dttm", F.lit(keeper.processed_dttm.replace("T", " ")))  # type: ignore
+            .select(
+                F.col("left_user").cast(LongType()).alias("user_id"),
+                F.col("right_user").cast(LongType()).alias("rec_to_add_user_id"),
+                F.col("processed_dttm").cast(TimestampType()),
+                F.col("act_city_id").alias("zone_id"),
+                F.col("local_time").cast(TimestampType()),
+            )
+        )
+
+        _SCHEMA = StructType(
+            [
+                StructField("user_id", LongType(), nullable=False),
+                StructField("rec_to_add_user_id", LongType(), nullable=False),
+                StructField("processed_dttm", TimestampType(), nullable=False),
+                StructField("zone_id", IntegerType(), nullable=False),
+                StructField("local_time", TimestampType(), nullable=False),
+            ]
+        )
+        return self.spark.createDataFrame(data=sdf.rdd, schema=_SCHEMA)
+
+
+@pytest.fixture(scope="module")
+def paths(tmp_path_factory) -> Dict[str, str]:
+    """Generates synthetic data once for all tests of module"""
+    from pyspark.sql import SparkSession  # type: ignore
+
+    spark = SparkSession.builder.master("local[2]").appName("generator").getOrCreate()
+
+    try:
+        return generate(
+            spark=spark,
+            path=tmp_path_factory.mktemp("data"),
+            users=USERS,
+            days=DAYS,
+            seed=0,
+        )
+    finally:
+        spark.stop()
+
+
+@pytest.fixture(scope="module")
+def collectors(paths) -> Tuple[LocalDatamartCollector, ReferenceCollector]:
+    """Returns current and reference collectors sharing one local Spark session"""
+    current = LocalDatamartCollector()
+    current.init_session(
+        app_name="test-golden-output",
+        spark_conf=SparkConfigKeeper(
+            executor_memory="1g",
+            executor_cores=1,
+            max_executors_num=1,
+            shuffle_partitions=4,
+        ),
+        log4j_level="ERROR",
+        master="local[2]",
+    )
+
+    reference = ReferenceCollector()
+    reference.spark = current.spark
+
+    yield current, reference
+
+    current.stop_session()
+
+
+@pytest.fixture(scope="module")
+def golden_keeper(paths, tmp_path_factory) -> ArgsKeeper:
+    """Returns job arguments for generated data"""
+    return get_local_keeper(
+        paths=paths,
+        tgt_path=str(tmp_path_factory.mktemp("output")),
+        date=str(END_DATE),
+        depth=DEPTH,
+    )
+
+
+def assert_same_rows(
+    result: pyspark.sql.DataFrame, expected: pyspark.sql.DataFrame
+) -> ...:
+    """Asserts both dataframes have the same schema and the same multiset of rows"""
+    assert result.schema == expected.schema
+
+    missing = expected.exceptAll(result).collect()
+    unexpected = result.exceptAll(expected).collect()
+
+    assert not missing and not unexpected, (
+        f"Missing rows: {missing[:10]}\n" f"Unexpected rows: {unexpected[:10]}"
+    )
+
+
+BUILDS = (
+    "_build_users_demographic_df",
+    "_build_events_total_cnt_agg_wk_mnth_df",
+    "_build_add_to_friends_recommendations_df",
+)
+
+
+class TestGoldenOutput:
+    @pytest.mark.parametrize("build", BUILDS)
+    def test_reference_output_not_empty(self, collectors, golden_keeper, build):
+        _, reference = collectors
+
+        sdf = getattr(reference, build)(keeper=golden_keeper, datamart="golden")
+
+        assert sdf.count() > 0
+
+    @pytest.mark.parametrize("build", BUILDS)
+    def test_same_output_as_reference(self, collectors, golden_keeper, build):
+        current, reference = collectors
+
+        assert_same_rows(
+            result=getattr(current, build)(keeper=golden_keeper, datamart="golden"),
+            expected=getattr(reference, build)(keeper=golden_keeper, datamart="golden"),
+        )
+
+
+class TestTimelineKernels:
+    KEYS = [1, 1, 1, 2, 2, 3]
+    CITIES = ["Perth", "Perth", "Darwin", None, "Cairns", None]
+
+    def test_group_bounds(self):
+        import numpy as np
+
+        starts, lengths = group_bounds(np.array(self.KEYS))
+
+        assert starts.tolist() == [0, 3, 5]
+        assert lengths.tolist() == [3, 2, 1]
+
+    def test_run_starts(self):
+        import numpy as np
+
+        mask = run_starts(np.array(self.KEYS), np.array(self.CITIES, dtype=object))
+
+        assert mask.tolist() == [True, False, True, True, True, True]
+
+    def test_first_and_last_value_skip_nulls(self):
+        import numpy as np
+
+        keys, values = np.array(self.KEYS), np.array(self.CITIES, dtype=object)
+
+        assert first_value(keys, values).tolist() == [
+            "Perth",
+            "Perth",
+            "Perth",
+            "Cairns",
+            "Cairns",
+            None,
+        ]
+        assert last_value(keys, values).tolist() == [
+            "Darwin",
+            "Darwin",
+            "Darwin",
+            "Cairns",
+            "Cairns",
+            None,
+        ]
+
+    def test_keep_first_keeps_ties(self):
+        import pandas as pd
+
+        pdf = pd.DataFrame(
+            dict(
+                user_id=[1, 1, 1, 2],
+                msg_ts=pd.to_datetime(
+                    ["2022-04-01", "2022-04-01", "2022-04-02", "2022-04-03"]
+                ),
+            )
+        )
+
+        assert keep_first(pdf).index.tolist() == [0, 1, 3]
+
+    def test_stream_timelines_keeps_user_across_batches(self):
+        import pandas as pd
+
+        pdf = pd.DataFrame(dict(user_id=self.KEYS, city_name=self.CITIES))
+
+        def kernel(pdf):
+            return pdf.assign(
+                act_city=last_value(
+                    pdf["user_id"].to_numpy(), pdf["city_name"].to_numpy()
+                ),
+                rows=len(pdf),
+            )
+
+        result = pd.concat(
+            stream_timelines(
+                batches=[pdf.iloc[:2], pdf.iloc[2:4], pdf.iloc[4:4], pdf.iloc[4:]],
+                kernel=kernel,
+            ),
+            ignore_index=True,
+        )
+
+        expected = kernel(pdf).drop(columns="rows")
+        assert result.drop(columns="rows").equals(expected)
+        assert result["rows"].max() <= 4
+
+
+class TestUtcOffsets:
+    def test_period_changes_on_dst_end(self):
+        from datetime import date
+
+        periods = get_utc_offsets(
+            timezones=["Australia/Sydney"],
+            start=date(2022, 3, 30),
+            end=date(2022, 4, 5),
+        )
+
+        # 2022-04-03 03:00 AEDT
+        assert periods == [
+            ("Australia/Sydney", MIN_TS, 1648915200, 39600),
+            ("Australia/Sydney", 1648915200, MAX_TS, 36000),
+        ]
+
+    def test_one_period_without_dst(self):
+        from datetime import date
+
+        periods = get_utc_offsets(
+            timezones=["Australia/Brisbane", "Australia/Brisbane"],
+            start=date(2022, 3, 30),
+            end=date(2022, 4, 5),
+        )
+
+        assert periods == [("Australia/Brisbane", MIN_TS, MAX_TS, 36000)]
+
+
+class TestSkewProfiler:
+    SKEW = dict(
+        enabled=True,
+        sample_fraction=1.0,
+        top_k=3,
+        ratio_threshold=5,
+        min_key_rows=100,
+        salt_buckets=4,
+    )
+
+    @pytest.fixture
+    def profiler(self, config) -> SkewProfiler:
+        profiler = SkewProfiler(config=config)
+        profiler._SKEW = self.SKEW
+
+        return profiler
+
+    @pytest.fixture
+    def subs_sdf(self, collectors) -> pyspark.sql.DataFrame:
+        "Channel 0 has 1000 subscribers, channels from 1 to 100 have one"
+        spark = collectors[0].spark
+
+        return spark.createDataFrame(
+            [(0, user) for user in range(1000)]
+            + [(channel, channel) for channel in range(1, 101)],
+            schema="subscription_channel long, user_id long",
+        )
+
+    def test_finds_heavy_key(self, profiler, subs_sdf):
+        profile = profiler.profile(
+            sdf=subs_sdf, key="subscription_channel", stage="test"
+        )
+
+        assert profile.heavy == (0,)
+        assert profile.top[0] == (0, 1000)
+        assert profile.sampled_rows == 1100
+
+    def test_no_heavy_keys_when_disabled(self, profiler, subs_sdf):
+        profiler._SKEW = dict(self.SKEW, enabled=False)
+
+        profile = profiler.profile(
+            sdf=subs_sdf, key="subscription_channel", stage="test"
+        )
+
+        assert profile.heavy == ()
+
+    def test_salted_join_gives_same_pairs(self, profiler, subs_sdf):
+        profile = profiler.profile(
+            sdf=subs_sdf, key="subscription_channel", stage="test"
+        )
+
+        salted = (
+            profiler.salt(sdf=subs_sdf, profile=profile, by="user_id")
+            .withColumnRenamed("user_id", "left_user")
+            .join(
+                profiler.replicate(sdf=subs_sdf, profile=profile).withColumnRenamed(
+                    "user_id", "right_user"
+                ),
+                on=["subscription_channel", "_salt"],
+            )
+            .drop("_salt")
+        )
+        plain = subs_sdf.withColumnRenamed("user_id", "left_user").join(
+            subs_sdf.withColumnRenamed("user_id", "right_user"),
+            on="subscription_channel",
+        )
+
+        assert_same_rows(result=salted, expected=plain)
+
+
+class TestPairBloomFilter:
+    @pytest.fixture
+    def contacts_sdf(self, collectors) -> pyspark.sql.DataFrame:
+        "Users from 0 to 999 wrote to the next user"
+        spark = collectors[0].spark
+
+        return spark.createDataFrame(
+            [(user, user + 1) for user in range(1000)],
+            schema="user_id long, contact_id long",
+        )
+
+    @pytest.fixture
+    def pairs_sdf(self, collectors) -> pyspark.sql.DataFrame:
+        spark = collectors[0].spark
+
+        return spark.createDataFrame(
+            [(left, right) for left in range(0, 1000, 7) for right in range(1000)],
+            schema="left_user string, right_user string",
+        )
+
+    def test_size(self):
+        assert get_bloom_size(items=1_000_000, fpp=0.01) == (9585059, 7)
+        assert get_bloom_size(items=0, fpp=0.01) == (8, 6)
+
+    def test_no_false_negatives(self, collectors, contacts_sdf):
+        import pyspark.sql.functions as F  # type: ignore
+
+        bloom = PairBloomFilter.build(
+            spark=collectors[0].spark,
+            sdf=contacts_sdf,
+            cols=("user_id", "contact_id"),
+            items=1000,
+            fpp=0.01,
+        )
+
+        # pairs are unordered, so contacts are found in both directions
+        sdf = bloom.might_contain(
+            sdf=contacts_sdf.unionByName(
+                contacts_sdf.select(
+                    F.col("contact_id").alias("user_id"),
+                    F.col("user_id").alias("contact_id"),
+                )
+            ),
+            cols=("user_id", "contact_id"),
+            alias="found",
+        )
+
+        assert sdf.where(~F.col("found")).count() == 0
+
+        bloom.destroy()
+
+    def test_drops_most_pairs(self, collectors, contacts_sdf, pairs_sdf):
+        import pyspark.sql.functions as F  # type: ignore
+
+        bloom = PairBloomFilter.build(
+            spark=collectors[0].spark,
+            sdf=contacts_sdf,
+            cols=("user_id", "contact_id"),
+            items=1000,
+            fpp=0.01,
+        )
+
+        sdf = bloom.might_contain(
+            sdf=pairs_sdf, cols=("left_user", "right_user"), alias="found"
+        )
+
+        assert sdf.columns == ["left_user", "right_user", "found"]
+        # 286 real contacts in both directions and about 1% of false positives out of 143000 pairs
+        assert sdf.where(F.col("found")).count() < 286 + 143000 * 0.02
+
+        bloom.destroy()
+
+    def test_excludes_same_pairs_as_anti_join(
+        self, collectors, contacts_sdf, pairs_sdf
+    ):
+        import pyspark.sql.functions as F  # type: ignore
+
+        contacts_sdf = contacts_sdf.unionByName(
+            contacts_sdf.select(
+                F.col("contact_id").alias("user_id"),
+                F.col("user_id").alias("contact_id"),
+            )
+        )
+        result = collectors[0]._exclude_real_contacts(
+            pairs_sdf=pairs_sdf, contacts_sdf=contacts_sdf
+        )
+        expected = pairs_sdf.join(
+            contacts_sdf,
+            on=[
+                pairs_sdf.left_user == contacts_sdf.user_id,
+                pairs_sdf.right_user == contacts_sdf.contact_id,
+            ],
+            how="left_anti",
+        )
+
+        assert_same_rows(result=result, expected=expected)
+
+    def test_releases_filter_and_persisted_frames(
+        self, collectors, contacts_sdf, pairs_sdf
+    ):
+        current = collectors[0]
+
+        current._exclude_real_contacts(pairs_sdf=pairs_sdf, contacts_sdf=contacts_sdf)
+
+        # contacts, filter and probed pairs
+        assert len(current._releases) == 3
+
+        current._release()
+
+        assert current._releases == []
+
+    @pytest.fixture(scope="class")
+    def graph_keeper(self, collectors, golden_keeper, tmp_path_factory) -> ArgsKeeper:
+        """Returns arguments of golden tests with graph in separate folder.
+
+        Graph is built from events of the previous days and updated with the last one.
+        """
+        from datetime import timedelta
+
+        current, _ = collectors
+        keeper = golden_keeper.copy(
+            update=dict(tgt_path=str(tmp_path_factory.mktemp("graph")))
+        )
+
+        current.update_social_graph(
+            keeper=keeper.copy(update=dict(date=str(END_DATE - timedelta(days=1))))
+        )
+        current.update_social_graph(keeper=keeper)
+
+        return keeper
+
+    @pytest.mark.parametrize("graph", ("contacts", "subscriptions"))
+    def test_update_same_as_build(self, collectors, graph_keeper, tmp_path, graph):
+        current, _ = collectors
+
+        rebuilt_keeper = graph_keeper.copy(
+            update=dict(tgt_path=str(tmp_path), depth=DEPTH + 1)
+        )
+        current.update_social_graph(keeper=rebuilt_keeper)
+
+        assert_same_rows(
+            result=current._get_graph_store(keeper=graph_keeper).read(
+                graph=graph, date=END_DATE
+            ),
+            expected=current._get_graph_store(keeper=rebuilt_keeper).read(
+                graph=graph, date=END_DATE
+            ),
+        )
+
+    def test_candidate_pairs_same_as_reference(self, collectors, graph_keeper):
+        current, reference = collectors
+
+        assert current._read_graph_df(graph="contacts", keeper=graph_keeper) is not None
+
+        assert_same_rows(
+            result=current._get_candidate_pairs_df(keeper=graph_keeper),
+            expected=reference._get_candidate_pairs_df(keeper=graph_keeper),
+        )
+
+    def test_self_join_not_shuffled(self, collectors, graph_keeper):
+        current, _ = collectors
+        spark = current.spark
+
+        sdf = current._read_graph_df(graph="subscriptions", keeper=graph_keeper)
+
+        threshold = spark.conf.get("spark.sql.autoBroadcastJoinThreshold")
+        spark.conf.set("spark.sql.autoBroadcastJoinThreshold", "-1")
+        try:
+            plan = (
+                sdf.withColumnRenamed("user_id", "left_user")
+                .join(
+                    sdf.withColumnRenamed("user_id", "right_user"),
+                    on="subscription_channel",
+                )
+                ._jdf.queryExecution()
+                .executedPlan()
+                .toString()
+            )
+        finally:
+            spark.conf.set("spark.sql.autoBroadcastJoinThreshold", threshold)
+
+        assert "SortMergeJoin" in plan
+        assert "Exchange hashpartitioning" not in plan
+
+
+class TestDatamartLayout:
+    DATAMART = "events-total-cnt-agg-wk-mnth-dm"
+
+    def test_sorted_files_with_index(self, collectors, golden_keeper, tmp_path):
+        import json
+
+        current, reference = collectors
+        keeper = golden_keeper.copy(update=dict(tgt_path=str(tmp_path)))
+
+        sdf = reference._build_events_total_cnt_agg_wk_mnth_df(
+            keeper=keeper, datamart=self.DATAMART
+        )
+        current._write_datamart(sdf=sdf, datamart=self.DATAMART, keeper=keeper)
+
+        path = tmp_path / self.DATAMART / f"date={END_DATE}"
+        index = json.loads((path / "_index.json").read_text())
+
+        assert index["keys"] == ["zone_id", "week"]
+        assert len(index["files"]) > 1
+        assert sum(_["rows"] for _ in index["files"]) == sdf.count()
+        assert all((path / _["path"]).exists() for _ in index["files"])
+
+        # key ranges of files don't overlap
+        for left, right in zip(index["files"], index["files"][1:]):
+            assert left["max"] < right["min"]
+
+        assert_same_rows(result=current.spark.read.parquet(str(path)), expected=sdf)
+
+    def test_one_file_without_layout(self, collectors, golden_keeper, tmp_path):
+        current, reference = collectors
+        keeper = golden_keeper.copy(update=dict(tgt_path=str(tmp_path)))
+
+        sdf = reference._build_events_total_cnt_agg_wk_mnth_df(
+            keeper=keeper, datamart=self.DATAMART
+        )
+        current._write_datamart(sdf=sdf, datamart="unknown-dm", keeper=keeper)
+
+        path = tmp_path / "unknown-dm" / f"date={END_DATE}"
+
+        assert len(list(path.glob("*.parquet"))) == 1
+        assert not (path / "_index.json").exists()
+
+    def test_backfilled_days_written_to_own_partitions(
+        self, collectors, golden_keeper, tmp_path
+    ):
+        from datetime import timedelta
+
+        current, _ = collectors
+        days = [str(END_DATE - timedelta(days=1)), str(END_DATE)]
+
+        # all days of backfill run share processed_dttm of submission
+        for day in days:
+            current.collect_events_total_cnt_agg_wk_mnth_dm(
+                keeper=golden_keeper.copy(
+                    update=dict(date=day, tgt_path=str(tmp_path))
+                ),
+                partition_date=day,
+            )
+
+        assert sorted(_.name for _ in (tmp_path / self.DATAMART).iterdir()) == [
+            f"date={_}" for _ in days
+        ]
+        assert all(
+            list((tmp_path / self.DATAMART / f"date={_}").glob("*.parquet"))
+            for _ in days
+        )
+
+
+class TestCheckpoint:
+    def test_completed_stage_is_not_built(self, collectors, golden_keeper, tmp_path):
+        current, _ = collectors
+        keeper = golden_keeper.copy(update=dict(tgt_path=str(tmp_path)))
+        sdf = current.spark.range(10)
+
+        def _build():
+            raise AssertionError("completed stage is built again")
+
+        # local collector skips checkpoints, so base implementation is called
+        for build in (lambda: sdf, _build):
+            result = DatamartCollector._checkpoint(
+                current, build=build, datamart="test-dm", stage="range", keeper=keeper
+            )
+
+        assert_same_rows(result=result, expected=sdf)
+
+    def test_days_of_run_do_not_share_checkpoints(
+        self, collectors, golden_keeper, tmp_path
+    ):
+        current, _ = collectors
+        keeper = golden_keeper.copy(update=dict(tgt_path=str(tmp_path)))
+
+        for date, rows in (("2022-04-25", 10), ("2022-04-26", 5)):
+            result = DatamartCollector._checkpoint(
+                current,
+                build=lambda: current.spark.range(rows),
+                datamart="test-dm",
+                stage="range",
+                keeper=keeper.copy(update=dict(date=date)),
+            )
+
+        assert result.count() == 5
+
+
+class TestPeakExecutors:
+    EXECUTORS = [
+        dict(id="driver", addTime="2023-05-22T12:00:00.000GMT"),
+        dict(
+            id="1",
+            addTime="2023-05-22T12:00:01.000GMT",
+            removeTime="2023-05-22T12:10:00.000GMT",
+        ),
+        dict(id="2", addTime="2023-05-22T12:00:02.000GMT"),
+        # replaces the first one at the same time
+        dict(id="3", addTime="2023-05-22T12:10:00.000GMT"),
+    ]
+
+    @patch("requests.get")
+    def test_counts_running_at_the_same_time(self, mock_get, collectors):
+        mock_get.return_value = MagicMock(json=lambda: self.EXECUTORS)
+
+        assert collectors[0].get_peak_executors() == 2
+
+    @patch("requests.get")
+    def test_zero_if_api_unavailable(self, mock_get, collectors):
+        import requests
+
+        mock_get.side_effect = requests.exceptions.ConnectionError("refused")
+
+        assert collectors[0].get_peak_executors() == 0
@@ -0,0 +1,33 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from src.store import JSONStateStore
+
+
+class TestJSONStateStore:
+    def test_read_empty_if_not_exists(self, tmp_path):
+        store = JSONStateStore(path=tmp_path / "state.json")
+
+        assert store.read() == {}
+
+    def test_read_empty_if_broken(self, tmp_path):
+        path = tmp_path / "state.json"
+        path.write_text("{not a json")
+
+        assert JSONStateStore(path=path).read() == {}
+
+    def test_transaction_writes_state(self, tmp_path):
+        store = JSONStateStore(path=tmp_path / "nested" / "state.json")
+
+        with store.transaction() as state:
+            state["key"] = "value"
+
+        assert store.read() == {"key": "value"}
+
+    def test_file_readable_only_by_owner(self, tmp_path):
+        store = JSONStateStore(path=tmp_path / "state.json")
+        store.write({"key": "value"})
+
+        assert os.stat(store.path).st_mode & 0o777 == 0o600
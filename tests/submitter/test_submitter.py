@@ -18,7 +18,12 @@ from requests.exceptions import (
 
 # package
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from src.submitter import UnableToGetResponse, UnableToSendRequest, UnableToSubmitJob
+from src.submitter import (
+    SparkSubmitter,
+    UnableToGetResponse,
+    UnableToSendRequest,
+    UnableToSubmitJob,
+)
 
 
 class TestSubmitJob:
@@ -33,6 +38,28 @@ class TestSubmitJob:
 
         assert submitter.submit_job(job=test_job_name, keeper=keeper) is True
 
+    @patch("src.submitter.submitter.requests.post")
+    def test_sends_to_given_cluster(self, mock_post, keeper, test_job_name):
+        mock_post.return_value = MagicMock(
+            status_code=200, json=lambda: dict(returncode=2)
+        )
+
+        submitter = SparkSubmitter(cluster_api_base_url="http://extra-cluster.com")
+        submitter.submit_job(job=test_job_name, keeper=keeper)
+
+        assert (
+            mock_post.call_args.kwargs["url"]
+            == f"http://extra-cluster.com/submit_{test_job_name}"
+        )
+
+    @patch("src.submitter.submitter.requests.post")
+    def test_raises_if_unknown_job(self, mock_post, submitter, keeper):
+        with pytest.raises(UnableToSubmitJob) as err:
+            submitter.submit_job(job="not_declared_job", keeper=keeper)
+
+        assert "Unknown 'not_declared_job' job" in str(err.value)
+        mock_post.assert_not_called()
+
     @patch("src.submitter.submitter.requests.post")
     def test_raises_if_timeout_error(self, mock_post, submitter, keeper, test_job_name):
         err_msg = "Timeout error"